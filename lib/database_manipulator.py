@@ -1,33 +1,298 @@
+import re
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import chain
 from sqlite3 import connect, Connection, Cursor
-from typing import Optional, Any
+from threading import local, Lock
+from time import perf_counter
+from typing import Optional, Any, Iterator, ContextManager, Union, Callable, TYPE_CHECKING
 
-from pandas import DataFrame
+from lib.metrics import get_metrics
+from settings import DB_PATH, DB_PERSISTENT, db_pragmas
 
-from settings import DB_PATH
+if TYPE_CHECKING:
+    from pandas import DataFrame  # imported on first use, pandas takes most of the import time of the module
+
+
+CONDITION_OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'LIKE', 'IN', 'NOT IN', 'BETWEEN')
+IDENTIFIER_REGEXP = re.compile(r'^\w+$')
+ORDER_REGEXP = re.compile(r'^\w+( (ASC|DESC))?$', re.IGNORECASE)
+DDL_REGEXP = re.compile(r'^\s*(CREATE|ALTER|DROP)\b', re.IGNORECASE)
+
+
+def build_condition(search_condition: dict) -> tuple[str, list]:
+    """Build a WHERE clause from a search condition.
+
+    Values are compared for equality, other comparisons are passed as (operator, value) tuples, e.g.
+    {'age': ('>=', 18), 'name': ('IN', ('Bob', 'Alex')), 'ts': ('BETWEEN', (0, 100)), 'cookies': ('!=', '')}.
+    A list value is the same as ('IN', list), None is the same as IS NULL.
+
+    Args:
+        search_condition: record search condition.
+
+    Returns:
+        Clause and its parameters.
+    """
+    clauses, params = [], []
+    for column, value in search_condition.items():
+        if not IDENTIFIER_REGEXP.match(str(column)):
+            raise SearchConditionException(search_condition)
+
+        operator = '='
+        if isinstance(value, tuple) and len(value) == 2 and str(value[0]).upper() in CONDITION_OPERATORS:
+            operator, value = str(value[0]).upper(), value[1]
+        elif isinstance(value, list):
+            operator = 'IN'
+
+        if value is None and operator in ('=', '!='):
+            clauses.append(f'{column} IS {"NOT " if operator == "!=" else ""}NULL')
+        elif operator in ('IN', 'NOT IN'):
+            if not isinstance(value, (list, tuple, set)):
+                raise SearchConditionException(search_condition)
+            clauses.append(f'{column} {operator} ({", ".join("?" * len(value))})')
+            params += list(value)
+        elif operator == 'BETWEEN':
+            if not isinstance(value, (list, tuple)) or len(value) != 2:
+                raise SearchConditionException(search_condition)
+            clauses.append(f'{column} BETWEEN ? AND ?')
+            params += list(value)
+        else:
+            clauses.append(f'{column} {operator} ?')
+            params.append(value)
+    return ' AND '.join(clauses), params
+
+
+@dataclass
+class SchemaRegistry:
+    """In-process cache of the database schema and of the SQL text built for it.
+
+    The catalog is read once on first use and then kept up to date by the DDL executed through the manager,
+    so checks for tables, columns and indexes do not touch the database. Schema changes made by other
+    processes are not seen until `clear` is called.
+    """
+    max_statements: int = 256
+    tables: Optional[dict[str, list[str]]] = None  # table name - column names, None - the catalog is not read yet
+    indexes: dict[str, str] = field(default_factory=dict)  # index name - table name
+    statements: dict[tuple, str] = field(default_factory=dict)
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False, compare=False)
+
+    @property
+    def loaded(self) -> bool:
+        return self.tables is not None
+
+    def load(self, tables: dict[str, list[str]], indexes: dict[str, str]) -> None:
+        with self._lock:
+            self.tables, self.indexes = tables, indexes
+
+    def add_table(self, table_name: str, columns: list[str]) -> None:
+        with self._lock:
+            if self.tables is not None:
+                self.tables[table_name] = columns
+
+    def discard_table(self, table_name: str) -> None:
+        with self._lock:
+            if self.tables is not None:
+                self.tables.pop(table_name, None)
+            self.indexes = {k: v for k, v in self.indexes.items() if v != table_name}
+            self.statements = {k: v for k, v in self.statements.items() if k[1] != table_name}
+
+    def add_index(self, index_name: str, table_name: str) -> None:
+        with self._lock:
+            self.indexes[index_name] = table_name
+
+    def get_statement(self, key: tuple, build: Callable[[], str]) -> str:
+        """Get the SQL text of a statement, built only the first time its shape is used.
+
+        Reusing the same text also lets sqlite3 reuse the compiled statement from its own cache.
+
+        Args:
+            key: statement shape, (kind, table name, columns...).
+            build: function building the SQL text.
+
+        Returns:
+            SQL text.
+        """
+        if (statement := self.statements.get(key)) is None:
+            statement = build()
+            with self._lock:
+                if len(self.statements) >= self.max_statements:
+                    self.statements.pop(next(iter(self.statements)))
+                self.statements[key] = statement
+        return statement
+
+    def clear(self) -> None:
+        """Forget the schema, the catalog is read again on next use."""
+        with self._lock:
+            self.tables = None
+            self.indexes = {}
+            self.statements = {}
+
+
+class InstrumentedCursor(Cursor):
+    """Cursor reporting every statement to the metrics.
+
+    SQLite produces the rows of a query while they are fetched, so the duration of a statement includes its
+    fetches and is recorded once the rows are exhausted (or right away for statements without rows). A statement
+    whose rows are not read to the end, e.g. a single `fetchone`, is recorded by the next statement of the
+    cursor or when the cursor is closed.
+    """
+    _query: Optional[str] = None
+    _elapsed: float = 0.0
+
+    def _finish(self) -> None:
+        if self._query is not None:
+            get_metrics().record_query(self._query, self._elapsed)
+        self._query, self._elapsed = None, 0.0
+
+    def _run(self, method: Callable, query: str, params: Any) -> 'InstrumentedCursor':
+        self._finish()
+        self._query = query
+        start = perf_counter()
+        try:
+            method(query, params)
+        except BaseException:
+            self._elapsed += perf_counter() - start
+            self._finish()
+            raise
+        self._elapsed += perf_counter() - start
+        if self.description is None:
+            self._finish()
+        return self
+
+    def _fetch(self, method: Callable, *args, last: bool = True) -> Any:
+        start = perf_counter()
+        result = None
+        try:
+            result = method(*args)
+        finally:
+            self._elapsed += perf_counter() - start
+            if last or not result:
+                self._finish()
+        return result
+
+    def execute(self, query: str, params: Any = ()) -> 'InstrumentedCursor':
+        return self._run(super().execute, query, params)
+
+    def executemany(self, query: str, params: Any) -> 'InstrumentedCursor':
+        return self._run(super().executemany, query, params)
+
+    def fetchone(self) -> Any:
+        return self._fetch(super().fetchone, last=False)
+
+    def fetchmany(self, *args) -> list:
+        return self._fetch(super().fetchmany, *args, last=False)
+
+    def fetchall(self) -> list:
+        return self._fetch(super().fetchall)
+
+    def __next__(self) -> Any:
+        if (row := self.fetchone()) is None:
+            raise StopIteration
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
 
 
 @dataclass
 class DatabaseManagerBase(ABC):
-    """Base class for interacting with the database and executing SQL queries."""
+    """Base class for interacting with the database and executing SQL queries.
+
+    By default every call opens and closes its own connection. In persistent mode each thread keeps one
+    long-lived connection configured with `pragmas` (WAL journal, synchronous, cache size).
+    """
 
     db_name: str = DB_PATH
-    conn: Optional[Connection] = None
-    cursor: Optional[Cursor] = None
+    persistent: bool = False
+    pragmas: dict[str, Any] = field(default_factory=lambda: dict(db_pragmas))
+    _local: local = field(default_factory=local, init=False, repr=False, compare=False)
+    schema: SchemaRegistry = field(default_factory=SchemaRegistry, init=False, repr=False, compare=False)
+
+    @property
+    def conn(self) -> Optional[Connection]:
+        """Connection of the current thread."""
+        return getattr(self._local, 'conn', None)
+
+    @property
+    def cursor(self) -> Optional[Cursor]:
+        """Cursor of the current thread."""
+        return getattr(self._local, 'cursor', None)
+
+    @property
+    def in_transaction(self) -> bool:
+        """Whether the current thread is inside `transaction()`."""
+        return getattr(self._local, 'transaction_depth', 0) > 0
 
     def connect(self) -> None:
-        """Create connection."""
-        self.conn: Connection = connect(self.db_name)
-        if not self.conn:
+        """Create connection or reuse the connection already opened by the current thread."""
+        self._local.depth = getattr(self._local, 'depth', 0) + 1
+        if self.conn is not None:
+            return
+
+        conn: Connection = connect(self.db_name)
+        if not conn:
             raise Exception('No connection')
 
-        self.cursor: Cursor = self.conn.cursor()
+        if self.persistent:
+            for pragma, value in self.pragmas.items():
+                conn.execute(f'PRAGMA {pragma}={value}')
+
+        self._local.conn = conn
+        self._local.cursor = conn.cursor(InstrumentedCursor)
+
+    def commit(self) -> None:
+        """Commit changes unless a transaction is open, in which case it is committed on exit."""
+        if not self.in_transaction:
+            self.conn.commit()
 
     def close_connect(self) -> None:
-        """Close connection."""
-        if self.conn:
-            self.conn.close()
+        """Close connection.
+
+        The connection is kept open while it is still used by an outer call or a transaction,
+        and is never closed by this method in persistent mode (see `disconnect`).
+        """
+        self._local.depth = max(getattr(self._local, 'depth', 0) - 1, 0)
+        if self.persistent or self._local.depth:
+            return
+        self.disconnect()
+
+    def disconnect(self) -> None:
+        """Close the connection of the current thread regardless of the mode."""
+        if cursor := self.cursor:
+            cursor.close()  # records the statement whose rows were not exhausted
+        if conn := self.conn:
+            conn.close()
+        self._local.conn = None
+        self._local.cursor = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group all statements executed inside the block into one commit.
+
+        Nested blocks join the outermost transaction. Changes are rolled back if the block raises.
+        The transaction is opened explicitly, so DDL executed inside the block is part of it as well.
+        ``dataframe_to_table`` is not allowed inside the block: pandas commits on the shared connection.
+        """
+        self.connect()
+        if not self.in_transaction and not self.conn.in_transaction:
+            self.conn.execute('BEGIN')
+        self._local.transaction_depth = getattr(self._local, 'transaction_depth', 0) + 1
+        try:
+            yield
+        except BaseException:
+            self._local.transaction_depth -= 1
+            if not self.in_transaction:
+                self.conn.rollback()
+                self.schema.clear()  # DDL of the block is rolled back too
+            raise
+        else:
+            self._local.transaction_depth -= 1
+            if not self.in_transaction:
+                self.conn.commit()
+        finally:
+            self.close_connect()
 
 
 class DatabaseManager(DatabaseManagerBase):
@@ -42,34 +307,132 @@ class DatabaseManager(DatabaseManagerBase):
         Returns:
             True - table exists, False - table not exists.
         """
+        return table_name in self.load_schema().tables
+
+    def load_schema(self) -> SchemaRegistry:
+        """Read tables, their columns and indexes from the catalog with one query, if not read yet.
+
+        Returns:
+            Schema registry.
+        """
+        if not self.schema.loaded:
+            self.connect()
+            self.cursor.execute('''
+                SELECT m.type, m.name, m.tbl_name, p.name
+                FROM sqlite_master m LEFT JOIN pragma_table_info(m.name) p
+                WHERE m.type IN ('table', 'index')
+                ORDER BY m.name, p.cid
+            ''')
+            tables, indexes = {}, {}
+            for kind, name, table_name, column in self.cursor.fetchall():
+                if kind == 'index':
+                    indexes[name] = table_name
+                else:
+                    tables.setdefault(name, []).append(column)
+            self.close_connect()
+            self.schema.load(tables, indexes)
+        return self.schema
+
+    def refresh_table(self, table_name: str) -> None:
+        """Read the columns of a table created or replaced by the current call into the schema registry.
+
+        Args:
+            table_name: table name.
+        """
         self.connect()
-        self.cursor.execute(f'''
-            SELECT name
-            FROM sqlite_master
-            WHERE type='table' AND name='{table_name}'
-        ''')
-        result = self.cursor.fetchone()
+        self.cursor.execute(f'PRAGMA table_info({table_name})')
+        if columns := [i[1] for i in self.cursor.fetchall()]:  # i[1] - column name
+            self.schema.add_table(table_name, columns)
+        else:
+            self.schema.discard_table(table_name)
         self.close_connect()
-        return bool(result)
 
-    def create_table(self, table_name: str, fields: dict[str, str]) -> None:
+    def create_table(self, table_name: str, fields: dict[str, str],
+                     unique_keys: Optional[tuple[str, ...]] = None,
+                     primary_key: Optional[tuple[str, ...]] = None, without_rowid: bool = False) -> None:
         """Table creation method.
 
         Args:
             table_name: table name.
             fields: fields to create (e.g. firstname TEXT or age INTEGER).
+            unique_keys: columns of the table UNIQUE constraint (e.g. ('item_id', 'date')).
+            primary_key: columns of the table PRIMARY KEY, an `id INTEGER PRIMARY KEY` column is added if not passed.
+            without_rowid: create a WITHOUT ROWID table, requires `primary_key`.
         """
+        if self.check_table_exist(table_name):
+            return
+
         self.connect()
         fields = ','.join(f'{k} {v}' for k, v in fields.items())
+        if primary_key:
+            fields += f', PRIMARY KEY ({", ".join(primary_key)})'
+        else:
+            fields = f'id INTEGER PRIMARY KEY, {fields}'
+        if unique_keys:
+            fields += f', UNIQUE ({", ".join(unique_keys)})'
         self.cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS {table_name} (
-            id INTEGER PRIMARY KEY,
             {fields}
-            )
+            ){' WITHOUT ROWID' if without_rowid else ''}
+        ''')
+        self.refresh_table(table_name)
+        self.commit()
+        self.close_connect()
+
+    def create_index(self, table_name: str, columns: list[str], unique: bool = False,
+                     index_name: Optional[str] = None) -> None:
+        """Index creation method.
+
+        Args:
+            table_name: table name.
+            columns: indexed columns, optionally with sort order (e.g. ['item_id', 'ts DESC']).
+            unique: create a UNIQUE index.
+            index_name: index name, generated from the table and column names if not passed.
+        """
+        if index_name is None:
+            index_name = '_'.join(['idx', table_name] + [i.split()[0] for i in columns])
+        if index_name in self.load_schema().indexes:
+            return
+
+        self.connect()
+        self.cursor.execute(f'''
+            CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index_name}
+            ON {table_name} ({', '.join(columns)})
         ''')
-        self.conn.commit()
+        self.schema.add_index(index_name, table_name)
+        self.commit()
         self.close_connect()
 
+    def get_table_columns(self, table_name: str) -> list[str]:
+        """Method to get the column names of a table.
+
+        Args:
+            table_name: table name.
+
+        Returns:
+            Column names in table order, empty if the table does not exist.
+        """
+        return list(self.load_schema().tables.get(table_name, []))
+
+    def execute(self, query: str, params: Any = ()) -> list:
+        """Method to execute an arbitrary statement, e.g. for schema migrations.
+
+        Args:
+            query: SQL statement.
+            params: statement parameters.
+
+        Returns:
+            List with arrays of data.
+        """
+        self.connect()
+        self.cursor.execute(query, params)
+        result = self.cursor.fetchall()
+        if DDL_REGEXP.match(query):
+            self.schema.clear()
+        self.commit()
+        self.close_connect()
+        return result
+
     def delete_table(self, table_name: str) -> None:
         """Table drop method.
 
@@ -80,7 +443,8 @@ class DatabaseManager(DatabaseManagerBase):
         self.cursor.execute(f'''
             DROP TABLE IF EXISTS {table_name}
         ''')
-        self.conn.commit()
+        self.schema.discard_table(table_name)
+        self.commit()
         self.close_connect()
 
     def check_table_data_exist(self, table_name: str, data: dict) -> bool:
@@ -93,13 +457,13 @@ class DatabaseManager(DatabaseManagerBase):
         Returns:
             True - data in table, False - data not in table.
         """
-        self.connect()
-        clause = ' AND '.join([f'{key} = :{key}' for key in data.keys()])
-        self.cursor.execute(f'''
-            SELECT *
+        statement = self.schema.get_statement(('exists', table_name, *data), lambda: f'''
+            SELECT 1
             FROM {table_name}
-            WHERE {clause}
-        ''', data)
+            WHERE {' AND '.join(f'{key} = :{key}' for key in data)}
+        ''')
+        self.connect()
+        self.cursor.execute(statement, data)
         result = self.cursor.fetchone()
         self.close_connect()
         return result is not None
@@ -112,24 +476,59 @@ class DatabaseManager(DatabaseManagerBase):
             data: data dict.
         """
         if not self.check_table_data_exist(table_name, data):
+            statement = self.schema.get_statement(('insert', table_name, *data), lambda: f'''
+                INSERT INTO {table_name} ({', '.join(data)})
+                VALUES ({', '.join(f':{key}' for key in data)})
+            ''')
             self.connect()
-            columns = ', '.join(data.keys())
-            values = ', '.join([f':{key}' for key in data.keys()])
-            self.cursor.execute(f'''
-                INSERT INTO {table_name} ({columns})
-                VALUES ({values})
-            ''', data)
-            self.conn.commit()
+            self.cursor.execute(statement, data)
+            self.commit()
             self.close_connect()
 
+    def upsert_records_at_table(self, table_name: str, rows: list[dict], conflict_columns: tuple[str, ...],
+                                update_columns: Optional[tuple[str, ...]] = None) -> None:
+        """Method for inserting new records and updating the conflicting ones with a single statement.
+
+        Args:
+            table_name: table name.
+            rows: data dicts, all with the same keys.
+            conflict_columns: columns of the PRIMARY KEY or UNIQUE constraint that identify a record.
+            update_columns: columns to overwrite on conflict, by default all columns except conflict ones.
+        """
+        columns = tuple(rows[0].keys())
+        if update_columns is None:
+            update_columns = tuple(i for i in columns if i not in conflict_columns)
+
+        def build() -> str:
+            if update_columns:
+                on_conflict = 'DO UPDATE SET ' + ', '.join(f'{i} = excluded.{i}' for i in update_columns)
+            else:
+                on_conflict = 'DO NOTHING'
+            return f'''
+                INSERT INTO {table_name} ({', '.join(columns)})
+                VALUES ({', '.join(f':{i}' for i in columns)})
+                ON CONFLICT ({', '.join(conflict_columns)}) {on_conflict}
+            '''
+
+        key = ('upsert', table_name, columns, tuple(conflict_columns), tuple(update_columns))
+        statement = self.schema.get_statement(key, build)
+        self.connect()
+        self.cursor.executemany(statement, rows)
+        self.commit()
+        self.close_connect()
+
     def get_record_from_table(self, table_name: str, search_condition: Optional[dict] = None,
-                              limit: Optional[int] = None) -> list:
+                              limit: Optional[int] = None, columns: Optional[list[str]] = None,
+                              order_by: Optional[list[str]] = None, offset: Optional[int] = None) -> list:
         """Method to get data from table.
 
         Args:
             table_name: table name.
-            search_condition: record search condition.
-            limit: limit on receiving rows in the table.
+            search_condition: record search condition (see `build_condition`).
+            limit: limit on receiving rows in the table, 50 by default, -1 - no limit.
+            columns: columns to select, all if not passed.
+            order_by: sort order (e.g. ['ts DESC', 'id']).
+            offset: number of rows to skip.
 
         Returns:
             List with arrays of data.
@@ -137,19 +536,73 @@ class DatabaseManager(DatabaseManagerBase):
         if limit is None:
             limit = 50
 
+        query, params = self.build_select_query(table_name, search_condition, limit, columns, order_by, offset)
         self.connect()
-        if search_condition is None:
-            query = f"SELECT * FROM {table_name} LIMIT {limit}"
-            self.cursor.execute(query)
-        else:
-            condition = ' AND '.join(f'{k} = ?' for k in search_condition.keys())
-            query = f"SELECT * FROM {table_name} WHERE {condition} LIMIT {limit}"
-            self.cursor.execute(query, tuple(search_condition.values()))
-
+        self.cursor.execute(query, params)
         result = self.cursor.fetchall()
         self.close_connect()
         return result
 
+    def iter_records_from_table(self, table_name: str, search_condition: Optional[dict] = None,
+                                columns: Optional[list[str]] = None, order_by: Optional[list[str]] = None,
+                                arraysize: int = 1000) -> Iterator[list[tuple]]:
+        """Method to read data from table in batches.
+
+        The rows are read with a dedicated cursor, so only one batch is kept in memory and other queries
+        can be executed while the generator is consumed. The connection is held until the generator is
+        exhausted or closed.
+
+        Args:
+            table_name: table name.
+            search_condition: record search condition (see `build_condition`).
+            columns: columns to select, all if not passed.
+            order_by: sort order (e.g. ['ts DESC', 'id']).
+            arraysize: number of rows in a batch.
+
+        Returns:
+            Generator of row batches.
+        """
+        query, params = self.build_select_query(table_name, search_condition, -1, columns, order_by)
+        self.connect()
+        cursor = self.conn.cursor(InstrumentedCursor)
+        cursor.arraysize = arraysize
+        try:
+            cursor.execute(query, params)
+            while batch := cursor.fetchmany():
+                yield batch
+        finally:
+            cursor.close()
+            self.close_connect()
+
+    @staticmethod
+    def build_select_query(table_name: str, search_condition: Optional[dict] = None, limit: int = -1,
+                           columns: Optional[list[str]] = None, order_by: Optional[list[str]] = None,
+                           offset: Optional[int] = None) -> tuple[str, list]:
+        """Build a SELECT query.
+
+        Args:
+            table_name: table name.
+            search_condition: record search condition (see `build_condition`).
+            limit: limit on receiving rows in the table, -1 - no limit.
+            columns: columns to select, all if not passed.
+            order_by: sort order (e.g. ['ts DESC', 'id']).
+            offset: number of rows to skip.
+
+        Returns:
+            Query and its parameters.
+        """
+        query = f"SELECT {', '.join(columns) if columns else '*'} FROM {table_name}"
+        params = []
+        if search_condition:
+            condition, params = build_condition(search_condition)
+            query += f' WHERE {condition}'
+        if order_by:
+            query += f" ORDER BY {', '.join(order_by)}"
+        query += f' LIMIT {int(limit)}'
+        if offset:
+            query += f' OFFSET {int(offset)}'
+        return query, params
+
     def update_record_at_table(self, table_name: str, data: dict, search_condition: dict) -> None:
         """Method to clear records in a table.
 
@@ -158,33 +611,65 @@ class DatabaseManager(DatabaseManagerBase):
             data: new data to replace.
             search_condition: record search condition.
         """
-        data = ','.join(f'{k}=\'{v}\'' if isinstance(v, str) else f'{k}={v}' for k, v in data.items())
-        condition = ' AND '.join(f'{k} = ?' for k in search_condition.keys())
+        condition, params = build_condition(search_condition)
         self.connect()
         self.cursor.execute(f'''
             UPDATE {table_name}
-            SET {data}
+            SET {', '.join(f'{k} = ?' for k in data.keys())}
             WHERE {condition}
-        ''', tuple(search_condition.values()))
-        self.conn.commit()
+        ''', [*data.values(), *params])
+        self.commit()
         self.close_connect()
 
-    def delete_table_data(self, table_name: str) -> None:
+    def get_max_value_from_table(self, table_name: str, column: str, search_condition: Optional[dict] = None) -> Any:
+        """Method to get the maximum value of a column.
+
+        Args:
+            table_name: table name.
+            column: column name.
+            search_condition: record search condition.
+
+        Returns:
+            Maximum value or None if there are no records.
+        """
+        self.connect()
+        if search_condition is None:
+            self.cursor.execute(f'SELECT MAX({column}) FROM {table_name}')
+        else:
+            condition, params = build_condition(search_condition)
+            self.cursor.execute(f'SELECT MAX({column}) FROM {table_name} WHERE {condition}', params)
+
+        result = self.cursor.fetchone()[0]
+        self.close_connect()
+        return result
+
+    def delete_table_data(self, table_name: str, search_condition: Optional[dict] = None) -> None:
         """Method to clear records in a table.
 
         Args:
             table_name: table name.
+            search_condition: record search condition, all records are deleted if not passed.
         """
         self.connect()
-        self.cursor.execute(f'''
-            DELETE FROM {table_name}
-        ''')
-        self.conn.commit()
+        if search_condition is None:
+            self.cursor.execute(f'''
+                DELETE FROM {table_name}
+            ''')
+        else:
+            condition, params = build_condition(search_condition)
+            self.cursor.execute(f'''
+                DELETE FROM {table_name}
+                WHERE {condition}
+            ''', params)
+        self.commit()
         self.close_connect()
 
-    def dataframe_to_table(self, df: DataFrame, table_name: str, params: dict) -> None:
+    def dataframe_to_table(self, df: 'DataFrame', table_name: str, params: dict) -> None:
+        if self.in_transaction:
+            raise TransactionException('dataframe_to_table')  # to_sql commits the open transaction
         self.connect()
         df.to_sql(table_name, self.conn, **params)
+        self.refresh_table(table_name)
         self.close_connect()
 
 
@@ -192,7 +677,7 @@ class DatabaseManager(DatabaseManagerBase):
 class DataBaseManipulatorBase(ABC):
     """Base class for data manipulation."""
     _instance = None
-    db_manager: DatabaseManager = DatabaseManager(DB_PATH)
+    db_manager: DatabaseManager = DatabaseManager(DB_PATH, persistent=DB_PERSISTENT)
 
     def __new__(cls, *args, **kwargs):
         """There is always one instance of the class.
@@ -219,10 +704,25 @@ class DataBaseManipulatorBase(ABC):
         pass
 
     @abstractmethod
-    def create_table(self, table_name: str, db_fields: list) -> None:
+    def create_table(self, table_name: str, db_fields: dict, unique_keys: Optional[tuple[str, ...]]) -> None:
         """Method to create a table in a database."""
         pass
 
+    @abstractmethod
+    def create_tables(self, tables: dict[str, dict[str, Any]]) -> None:
+        """Method to create several tables at once."""
+        pass
+
+    @abstractmethod
+    def get_table_columns(self, table_name: str) -> list[str]:
+        """Method for obtaining the column names of a table."""
+        pass
+
+    @abstractmethod
+    def create_index(self, table_name: str, columns: list[str], unique: bool, index_name: Optional[str]) -> None:
+        """Method to create an index on a table."""
+        pass
+
     @abstractmethod
     def delete_table(self, table_name: str) -> None:
         """Method for removing a table from a database."""
@@ -239,18 +739,30 @@ class DataBaseManipulatorBase(ABC):
         pass
 
     @abstractmethod
-    def get_table_data(self, table_name: str, search_condition: Optional[str], table_limit: Optional[int]
+    def get_table_data(self, table_name: str, search_condition: Optional[dict], limit: Optional[int],
+                       columns: Optional[list[str]], order_by: Optional[list[str]], offset: Optional[int]
                        ) -> list[tuple]:
         """Method for obtaining data in a table."""
         pass
 
+    @abstractmethod
+    def iter_table_data(self, table_name: str, search_condition: Optional[dict], columns: Optional[list[str]],
+                        order_by: Optional[list[str]], arraysize: int) -> Iterator[tuple]:
+        """Method for reading data in a table row by row."""
+        pass
+
     @abstractmethod
     def update_table_data(self, table_name: str, data: dict, search_condition: str) -> None:
         """Method for updating data in a table."""
         pass
 
     @abstractmethod
-    def delete_table_data(self, table_name: str) -> None:
+    def get_table_max_value(self, table_name: str, column: str, search_condition: Optional[dict]) -> Any:
+        """Method for obtaining the maximum value of a column."""
+        pass
+
+    @abstractmethod
+    def delete_table_data(self, table_name: str, search_condition: Optional[dict]) -> None:
         """Method for deleting data in a table."""
         pass
 
@@ -259,9 +771,23 @@ class DataBaseManipulatorBase(ABC):
         """A method for creating or updating data in a table."""
 
     @abstractmethod
-    def dataframe_to_table(self, df: DataFrame, table_name: str, params: dict) -> None:
+    def bulk_upsert(self, table_name: str, rows: list[dict], conflict_columns: tuple[str, ...]) -> None:
+        """A method for creating or updating many records in a table."""
+
+    @abstractmethod
+    def dataframe_to_table(self, df: 'DataFrame', table_name: str, params: dict) -> None:
         """Method for adding a dataframe to a table."""
 
+    @abstractmethod
+    def table_to_dataframe(self, table_name: str, search_condition: Optional[dict], columns: Optional[list[str]],
+                           order_by: Optional[list[str]], chunksize: Optional[int]
+                           ) -> Union['DataFrame', Iterator['DataFrame']]:
+        """Method for reading a table into a dataframe."""
+
+    @abstractmethod
+    def transaction(self):
+        """Method for grouping several operations into one commit."""
+
 
 @dataclass
 class DataBaseManipulator(DataBaseManipulatorBase):
@@ -281,12 +807,17 @@ class DataBaseManipulator(DataBaseManipulatorBase):
 
         return bool(self.db_manager.check_table_exist(table_name))
 
-    def create_table(self, table_name: str, field: dict[str, str]) -> None:
+    def create_table(self, table_name: str, field: dict[str, str],
+                     unique_keys: Optional[tuple[str, ...]] = None,
+                     primary_key: Optional[tuple[str, ...]] = None, without_rowid: bool = False) -> None:
         """Method to create a table in a database.
 
         Args:
             table_name: table name.
             field: fields to create (e.g. {'firstname': 'TEXT', 'age': 'INTEGER').
+            unique_keys: columns that identify a record (e.g. ('firstname', 'age')), required by `bulk_upsert`.
+            primary_key: columns of the PRIMARY KEY instead of the `id` column (e.g. ('item_id', 'ts')).
+            without_rowid: store the table clustered by `primary_key` (WITHOUT ROWID table).
         """
         if not table_name or not isinstance(table_name, str):
             raise TableNameException(table_name)
@@ -294,7 +825,76 @@ class DataBaseManipulator(DataBaseManipulatorBase):
         if not field or not isinstance(field, dict):
             raise DataCreateTableException(field)
 
-        self.db_manager.create_table(table_name, field)
+        if unique_keys is not None and (not unique_keys or not set(unique_keys) <= set(field) | {'id'}):
+            raise UniqueKeysException(unique_keys)
+
+        if primary_key is not None and (not primary_key or not set(primary_key) <= set(field)):
+            raise UniqueKeysException(primary_key)
+
+        if without_rowid and not primary_key:
+            raise UniqueKeysException(primary_key)
+
+        self.db_manager.create_table(table_name, field, unique_keys, primary_key, without_rowid)
+
+    def create_tables(self, tables: dict[str, dict[str, Any]]) -> None:
+        """Method to create several tables at once, e.g. on startup.
+
+        The catalog is read once and only missing tables are created, all in one transaction.
+        Later `create_table` calls for these tables are answered from the schema registry.
+
+        Example:
+            DataBaseManipulator().create_tables({
+                'auth': {'field': {'user_agent': 'TEXT', 'cookies': 'TEXT'}},
+                'history': {'field': {'item_id': 'INTEGER', 'ts': 'INTEGER'}, 'primary_key': ('item_id', 'ts')},
+            })
+
+        Args:
+            tables: table name - `create_table` keyword arguments.
+        """
+        if not isinstance(tables, dict):
+            raise DataCreateTableException(tables)
+
+        with self.transaction():
+            for table_name, params in tables.items():
+                if not self.check_table_exist(table_name):
+                    self.create_table(table_name, **params)
+
+    def get_table_columns(self, table_name: str) -> list[str]:
+        """Method for obtaining the column names of a table.
+
+        Args:
+            table_name: table name.
+
+        Returns:
+            Column names in table order, empty if the table does not exist.
+        """
+        if not table_name or not isinstance(table_name, str):
+            raise TableNameException(table_name)
+
+        return self.db_manager.get_table_columns(table_name)
+
+    def create_index(self, table_name: str, columns: Union[str, list[str]], unique: bool = False,
+                     index_name: Optional[str] = None) -> None:
+        """Method to create an index on a table.
+
+        Args:
+            table_name: table name.
+            columns: indexed columns, optionally with sort order (e.g. ['item_id', 'ts DESC']).
+            unique: create a UNIQUE index.
+            index_name: index name, generated from the table and column names if not passed.
+        """
+        if not table_name or not isinstance(table_name, str):
+            raise TableNameException(table_name)
+
+        if isinstance(columns, str):
+            columns = [columns]
+        if not columns or not all(ORDER_REGEXP.match(str(i)) for i in columns):
+            raise ColumnsException(columns)
+
+        if index_name is not None and not IDENTIFIER_REGEXP.match(str(index_name)):
+            raise TableNameException(index_name)
+
+        self.db_manager.create_index(table_name, columns, unique, index_name)
 
     def delete_table(self, table_name: str) -> None:
         """Method for removing a table from a database.
@@ -341,21 +941,110 @@ class DataBaseManipulator(DataBaseManipulatorBase):
         self.db_manager.insert_record_at_table_data(table_name, data)
 
     def get_table_data(self, table_name: str, search_condition: Optional[dict] = None,
-                       limit: Optional[int] = None) -> list[tuple]:
+                       limit: Optional[int] = None, columns: Optional[list[str]] = None,
+                       order_by: Optional[Union[str, list[str]]] = None, offset: Optional[int] = None
+                       ) -> list[tuple]:
         """Method for obtaining data in a table.
 
         Args:
             table_name: table name.
-            search_condition: record search condition.
-            limit: limit on receiving rows in the table.
+            search_condition: record search condition, equality by default, other comparisons are passed as
+                (operator, value) tuples (e.g. {'item_id': 1, 'ts': ('>=', 1704067200)}).
+            limit: limit on receiving rows in the table, 50 by default, -1 - no limit.
+            columns: columns to select, all if not passed.
+            order_by: sort order (e.g. 'ts DESC' or ['category', 'name']).
+            offset: number of rows to skip, for pagination together with `limit` and `order_by`.
 
         Returns:
             List with arrays of data.
         """
+        order_by = self.check_query_args(table_name, search_condition, columns, order_by)
+
+        if offset is not None and (not isinstance(offset, int) or offset < 0):
+            raise DataTableException(offset)
+
+        return self.db_manager.get_record_from_table(table_name, search_condition, limit, columns, order_by, offset)
+
+    def iter_table_data(self, table_name: str, search_condition: Optional[dict] = None,
+                        columns: Optional[list[str]] = None, order_by: Optional[Union[str, list[str]]] = None,
+                        arraysize: int = 1000) -> Iterator[tuple]:
+        """Method for reading data in a table row by row without loading the whole result into memory.
+
+        Args:
+            table_name: table name.
+            search_condition: record search condition (see `get_table_data`).
+            columns: columns to select, all if not passed.
+            order_by: sort order (e.g. 'ts DESC' or ['category', 'name']).
+            arraysize: number of rows fetched from the database at once.
+
+        Returns:
+            Generator of rows.
+        """
+        order_by = self.check_query_args(table_name, search_condition, columns, order_by)
+
+        if not isinstance(arraysize, int) or arraysize < 1:
+            raise DataTableException(arraysize)
+
+        return chain.from_iterable(
+            self.db_manager.iter_records_from_table(table_name, search_condition, columns, order_by, arraysize))
+
+    def table_to_dataframe(self, table_name: str, search_condition: Optional[dict] = None,
+                           columns: Optional[list[str]] = None, order_by: Optional[Union[str, list[str]]] = None,
+                           chunksize: Optional[int] = None) -> Union['DataFrame', Iterator['DataFrame']]:
+        """Method for reading a table into a dataframe.
+
+        Args:
+            table_name: table name.
+            search_condition: record search condition (see `get_table_data`).
+            columns: columns to select, all if not passed.
+            order_by: sort order (e.g. 'ts DESC' or ['category', 'name']).
+            chunksize: number of rows in a dataframe, if passed a generator of dataframes is returned.
+
+        Returns:
+            Dataframe or generator of dataframes.
+        """
+        from pandas import DataFrame
+
+        order_by = self.check_query_args(table_name, search_condition, columns, order_by)
+
+        if chunksize is not None and (not isinstance(chunksize, int) or chunksize < 1):
+            raise DataTableException(chunksize)
+
+        columns = columns or self.db_manager.get_table_columns(table_name)
+        batches = self.db_manager.iter_records_from_table(table_name, search_condition, columns, order_by,
+                                                          chunksize or 1000)
+        if chunksize is not None:
+            return (DataFrame.from_records(batch, columns=columns) for batch in batches)
+        return DataFrame.from_records([i for batch in batches for i in batch], columns=columns)
+
+    @staticmethod
+    def check_query_args(table_name: str, search_condition: Optional[dict], columns: Optional[list[str]],
+                         order_by: Optional[Union[str, list[str]]]) -> Optional[list[str]]:
+        """Validate the arguments of a select query.
+
+        Args:
+            table_name: table name.
+            search_condition: record search condition.
+            columns: columns to select.
+            order_by: sort order.
+
+        Returns:
+            Sort order as a list.
+        """
         if not table_name or not isinstance(table_name, str):
             raise TableNameException(table_name)
 
-        return self.db_manager.get_record_from_table(table_name, search_condition, limit)
+        if search_condition is not None and not isinstance(search_condition, dict):
+            raise SearchConditionException(search_condition)
+
+        if columns is not None and (not columns or not all(IDENTIFIER_REGEXP.match(str(i)) for i in columns)):
+            raise ColumnsException(columns)
+
+        if isinstance(order_by, str):
+            order_by = [order_by]
+        if order_by is not None and not all(ORDER_REGEXP.match(str(i)) for i in order_by):
+            raise ColumnsException(order_by)
+        return order_by
 
     def update_table_data(self, table_name: str, data: dict, search_condition: dict) -> None:
         """Method for updating data in a table.
@@ -376,16 +1065,42 @@ class DataBaseManipulator(DataBaseManipulatorBase):
 
         self.db_manager.update_record_at_table(table_name, data, search_condition)
 
-    def delete_table_data(self, table_name: str) -> None:
+    def get_table_max_value(self, table_name: str, column: str, search_condition: Optional[dict] = None) -> Any:
+        """Method for obtaining the maximum value of a column.
+
+        Args:
+            table_name: table name.
+            column: column name.
+            search_condition: record search condition.
+
+        Returns:
+            Maximum value or None if there are no records.
+        """
+        if not table_name or not isinstance(table_name, str):
+            raise TableNameException(table_name)
+
+        if not column or not isinstance(column, str):
+            raise DataTableException(column)
+
+        if search_condition is not None and not search_condition:
+            raise SearchConditionException(search_condition)
+
+        return self.db_manager.get_max_value_from_table(table_name, column, search_condition)
+
+    def delete_table_data(self, table_name: str, search_condition: Optional[dict] = None) -> None:
         """Method for deleting data in a table.
 
         Args:
             table_name: table name.
+            search_condition: record search condition, all records are deleted if not passed.
         """
         if not isinstance(table_name, str):
             raise TableNameException(table_name)
 
-        self.db_manager.delete_table_data(table_name)
+        if search_condition is not None and not search_condition:
+            raise SearchConditionException(search_condition)
+
+        self.db_manager.delete_table_data(table_name, search_condition)
 
     def create_or_update_table_data(self, table_name: str, data: dict, search_condition: dict,
                                     additional_columns: Optional[dict] = None) -> None:
@@ -417,9 +1132,57 @@ class DataBaseManipulator(DataBaseManipulatorBase):
                 data |= additional_columns
             self.create_table_data(table_name, data)
 
-    def dataframe_to_table(self, df: DataFrame, table_name: str, params: dict) -> None:
+    def bulk_upsert(self, table_name: str, rows: list[dict], conflict_columns: tuple[str, ...],
+                    update_columns: Optional[tuple[str, ...]] = None, batch_size: int = 1000) -> None:
+        """Method for creating or updating many records, one statement per batch.
+
+        Args:
+            table_name: table name.
+            rows: data dicts, all with the same keys.
+            conflict_columns: columns of the PRIMARY KEY or UNIQUE constraint that identify a record.
+            update_columns: columns to overwrite on conflict, by default all columns except conflict ones.
+            batch_size: number of records passed to one statement.
+        """
+        if not table_name or not isinstance(table_name, str):
+            raise TableNameException(table_name)
+
+        if not isinstance(rows, list) or not all(i and isinstance(i, dict) for i in rows):
+            raise DataTableException(rows)
+
+        if not rows:
+            return
+
+        if any(i.keys() != rows[0].keys() for i in rows):
+            raise DataTableException(rows)
+
+        if not conflict_columns or not set(conflict_columns) <= rows[0].keys():
+            raise UniqueKeysException(conflict_columns)
+
+        with self.transaction():
+            for i in range(0, len(rows), batch_size):
+                self.db_manager.upsert_records_at_table(
+                    table_name, rows[i:i + batch_size], tuple(conflict_columns), update_columns
+                )
+
+    def dataframe_to_table(self, df: 'DataFrame', table_name: str, params: dict) -> None:
         self.db_manager.dataframe_to_table(df, table_name, params)
 
+    def transaction(self) -> ContextManager[None]:
+        """Method for grouping several operations into one commit.
+
+        Example:
+            with DataBaseManipulator().transaction():
+                ...
+
+        Note:
+            ``dataframe_to_table`` raises TransactionException inside the block, since pandas commits
+            on the shared connection and would break the grouping.
+
+        Returns:
+            Context manager that commits on exit and rolls back on error.
+        """
+        return self.db_manager.transaction()
+
 
 @dataclass
 class DataBaseManipulatorException(Exception):
@@ -448,3 +1211,20 @@ class SearchConditionException(DataBaseManipulatorException):
 
     def __str__(self):
         return f'Invalid search argument - {self.field}'
+
+
+class UniqueKeysException(DataBaseManipulatorException):
+    def __str__(self):
+        return f'Invalid unique key columns - {self.field}'
+
+
+class ColumnsException(DataBaseManipulatorException):
+
+    def __str__(self):
+        return f'Invalid columns - {self.field}'
+
+
+class TransactionException(DataBaseManipulatorException):
+
+    def __str__(self):
+        return f'Operation is not allowed inside a transaction - {self.field}'
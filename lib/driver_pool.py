@@ -0,0 +1,237 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from queue import Queue, Empty
+from threading import Lock
+from time import monotonic
+from typing import Callable, Iterator, Optional
+
+from selenium.common import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from lib.webdriver import Driver
+from settings import driver_pool_settings
+
+
+def create_driver() -> WebDriver:
+    return Driver().get_driver
+
+
+@dataclass
+class PooledDriver:
+    driver: WebDriver
+    uses: int = 0
+    created: float = field(default_factory=monotonic)
+
+
+@dataclass
+class DriverPoolBase(ABC):
+    """Base class for a pool of browser drivers."""
+    size: int = driver_pool_settings['size']
+
+    @abstractmethod
+    def lease(self):
+        pass
+
+
+@dataclass
+class DriverPool(DriverPoolBase):
+    """Pool of warm browser drivers.
+
+    Drivers are launched and prepared (e.g. authenticated) by `factory` ahead of time, so a task only waits for a
+    free driver instead of a browser cold start. A leased driver is health-checked first and is replaced in the
+    background after `max_uses` leases, when its JS heap exceeds `max_memory` or when it fails.
+
+    Example:
+        with DriverPool(size=2, factory=AuthorizationManager().exec) as pool:
+            with pool.lease() as driver:
+                driver.get(STEAM_MAIN)
+    """
+    max_uses: int = driver_pool_settings['max_uses']
+    max_memory: Optional[int] = driver_pool_settings['max_memory']  # JS heap bytes, None - not checked
+    lease_timeout: float = driver_pool_settings['lease_timeout']
+    factory: Callable[[], WebDriver] = create_driver
+
+    def __post_init__(self) -> None:
+        self._idle: Queue[PooledDriver] = Queue()
+        self._lock = Lock()
+        self._count = 0  # drivers launched and not yet quit, including the ones being launched
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='driver-pool')
+
+    def __enter__(self) -> 'DriverPool':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
+
+    def start(self, wait: bool = True) -> 'DriverPool':
+        """Launch drivers until the pool is full.
+
+        Args:
+            wait: wait until all drivers are launched, otherwise they are launched in the background.
+
+        Returns:
+            Pool instance.
+        """
+        futures = [self._executor.submit(self.add_driver) for _ in range(self.size - self._reserve(self.size))]
+        if wait:
+            _ = [i.result() for i in futures]
+        return self
+
+    def _reserve(self, count: int) -> int:
+        """Reserve slots for new drivers.
+
+        Args:
+            count: number of slots required.
+
+        Returns:
+            Number of slots that could not be reserved.
+        """
+        with self._lock:
+            reserved = min(count, self.size - self._count)
+            self._count += reserved
+        return count - reserved
+
+    def add_driver(self) -> None:
+        """Launch a driver into a reserved slot."""
+        try:
+            driver = self.factory()
+        except BaseException:
+            with self._lock:
+                self._count -= 1
+            raise
+        self._idle.put(PooledDriver(driver))
+
+    def quit_driver(self, pooled: PooledDriver) -> None:
+        """Quit a driver and free its slot."""
+        try:
+            pooled.driver.quit()
+        except WebDriverException:
+            pass
+        with self._lock:
+            self._count -= 1
+
+    def replace_driver(self, pooled: PooledDriver) -> None:
+        """Quit a driver and launch a new one in the background."""
+        self.quit_driver(pooled)
+        if not self._closed and not self._reserve(1):
+            self._executor.submit(self.add_driver)
+
+    def is_healthy(self, pooled: PooledDriver) -> bool:
+        """Check that the browser still responds.
+
+        Args:
+            pooled: pooled driver.
+
+        Returns:
+            True - driver can be used, False - driver must be replaced.
+        """
+        try:
+            return pooled.driver.execute_script('return 1;') == 1
+        except WebDriverException:
+            return False
+
+    def get_memory(self, pooled: PooledDriver) -> Optional[int]:
+        """Get the JS heap size of the current page, None if the browser does not report it."""
+        try:
+            return pooled.driver.execute_script(
+                'return window.performance && performance.memory ? performance.memory.usedJSHeapSize : null;')
+        except WebDriverException:
+            return None
+
+    def is_worn_out(self, pooled: PooledDriver) -> bool:
+        """Check whether a driver has to be recycled after use.
+
+        Args:
+            pooled: pooled driver.
+
+        Returns:
+            True - driver reached `max_uses` or `max_memory`.
+        """
+        if self.max_uses and pooled.uses >= self.max_uses:
+            return True
+        if self.max_memory and (memory := self.get_memory(pooled)) is not None:
+            return memory > self.max_memory
+        return False
+
+    def acquire(self) -> PooledDriver:
+        """Take a healthy driver from the pool, launching one if the pool is not full.
+
+        Returns:
+            Pooled driver.
+        """
+        if self._closed:
+            raise DriverPoolException('Pool is closed')
+
+        deadline = monotonic() + self.lease_timeout
+        while True:
+            if self.idle == 0 and not self._reserve(1):
+                self.add_driver()
+
+            try:
+                pooled = self._idle.get(timeout=max(deadline - monotonic(), 0))
+            except Empty:
+                raise DriverPoolException(f'No driver is available within {self.lease_timeout} s')
+
+            if self.is_healthy(pooled):
+                return pooled
+            self.quit_driver(pooled)
+            if monotonic() > deadline:
+                raise DriverPoolException(f'No healthy driver is available within {self.lease_timeout} s')
+
+    def release(self, pooled: PooledDriver, failed: bool = False) -> None:
+        """Return a driver to the pool.
+
+        Args:
+            pooled: pooled driver.
+            failed: the task failed with a browser error, the driver is replaced.
+        """
+        pooled.uses += 1
+        if self._closed:
+            self.quit_driver(pooled)
+        elif failed or self.is_worn_out(pooled):
+            self.replace_driver(pooled)
+        else:
+            self._idle.put(pooled)
+
+    @contextmanager
+    def lease(self) -> Iterator[WebDriver]:
+        """Lease a driver for the duration of the block.
+
+        Returns:
+            Context manager with the driver.
+        """
+        pooled = self.acquire()
+        try:
+            yield pooled.driver
+        except WebDriverException:
+            self.release(pooled, failed=True)
+            raise
+        except BaseException:
+            self.release(pooled)
+            raise
+        else:
+            self.release(pooled)
+
+    def close(self) -> None:
+        """Quit idle drivers, leased drivers are quit when they are returned."""
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                self.quit_driver(self._idle.get_nowait())
+            except Empty:
+                break
+
+
+class DriverPoolException(Exception):
+    pass
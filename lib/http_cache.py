@@ -0,0 +1,267 @@
+import json
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import lru_cache
+from threading import RLock
+from time import time
+from typing import Optional
+
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from lib.database_manipulator import DatabaseManager
+from lib.metrics import get_metrics
+from settings import http_cache_settings
+
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')  # the body is stored decoded
+ONLY_IF_CACHED = 'only-if-cached'
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    expires: float  # epoch seconds
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @classmethod
+    def from_response(cls, response: Response, ttl: float) -> 'CacheEntry':
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS}
+        return cls(response.url, response.status_code, headers, response.content, time() + ttl,
+                   response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.expires > time()
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """Headers of a conditional request revalidating the entry."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_response(self, request: PreparedRequest) -> Response:
+        response = Response()
+        response.status_code = self.status
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = self.url
+        response.request = request
+        response._content = self.body
+        response._content_consumed = True  # `iter_content` reads the stored body
+        response.from_cache = True
+        return response
+
+
+@dataclass
+class ResponseCacheBase(ABC):
+    db_name: str = http_cache_settings['path']
+    table_name: str = 'http_cache'
+
+    @abstractmethod
+    def get(self, url: str):
+        pass
+
+    @abstractmethod
+    def put(self, entry: CacheEntry):
+        pass
+
+
+@dataclass
+class ResponseCache(ResponseCacheBase):
+    """On-disk cache of HTTP responses with per-endpoint TTLs and LRU eviction.
+
+    Only GET responses of the urls matching `ttls` are cached. A fresh entry is returned without a request,
+    a stale one is revalidated with its ETag / Last-Modified and reused if the server answers 304. The entries
+    are kept in a separate SQLite file, the least recently used ones are evicted when their total size exceeds
+    `max_size`. Use it through `get_session(cache=...)`.
+    """
+    max_size: int = http_cache_settings['max_size']  # bytes of the stored bodies
+    ttls: dict[str, float] = field(default_factory=lambda: dict(http_cache_settings['ttls']))  # url regexp - TTL
+    stats: dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.db_manager = DatabaseManager(self.db_name, persistent=True)
+        self._patterns = [(re.compile(k), v) for k, v in self.ttls.items()]
+        self._size: Optional[int] = None  # total size of the bodies, read on first use
+        self._lock = RLock()
+
+    def create_cache_table(self) -> None:
+        db_fields = {
+            'url': 'TEXT', 'status': 'INTEGER', 'headers': 'TEXT', 'body': 'BLOB', 'size': 'INTEGER',
+            'expires': 'REAL', 'accessed': 'REAL', 'etag': 'TEXT', 'last_modified': 'TEXT',
+        }
+        self.db_manager.create_table(self.table_name, db_fields, primary_key=('url',), without_rowid=True)
+        self.db_manager.create_index(self.table_name, ['accessed'])
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            self.create_cache_table()
+            self._size = self.db_manager.execute(f'SELECT COALESCE(SUM(size), 0) FROM {self.table_name}')[0][0]
+        return self._size
+
+    def count(self, result: str) -> None:
+        with self._lock:
+            self.stats[result] = self.stats.get(result, 0) + 1
+        get_metrics().inc('http_cache_total', result=result)
+
+    def get_ttl(self, url: str) -> Optional[float]:
+        """TTL of the responses of the url, None if they are not cached."""
+        for pattern, ttl in self._patterns:
+            if pattern.search(url):
+                return ttl
+        return None
+
+    def is_fresh(self, url: str) -> bool:
+        """Whether the url has a fresh entry, the body is not read and the entry is not marked as used."""
+        self.create_cache_table()
+        records = self.db_manager.get_record_from_table(self.table_name, {'url': url}, limit=1, columns=['expires'])
+        return bool(records) and records[0][0] > time()
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Get an entry and mark it as recently used.
+
+        Args:
+            url: request url.
+
+        Returns:
+            Entry, fresh or stale, None if the url is not cached.
+        """
+        self.create_cache_table()
+        records = self.db_manager.get_record_from_table(
+            self.table_name, {'url': url}, limit=1,
+            columns=['url', 'status', 'headers', 'body', 'expires', 'etag', 'last_modified'],
+        )
+        if not records:
+            return None
+
+        url, status, headers, body, expires, etag, last_modified = records[0]
+        self.db_manager.update_record_at_table(self.table_name, {'accessed': time()}, {'url': url})
+        return CacheEntry(url, status, json.loads(headers), body, expires, etag, last_modified)
+
+    def put(self, entry: CacheEntry) -> None:
+        """Store an entry, evicting the least recently used ones if the cache is full.
+
+        Args:
+            entry: cache entry.
+        """
+        if len(entry.body) > self.max_size:
+            return
+
+        with self._lock:
+            size = self.size
+            if previous := self.db_manager.get_record_from_table(self.table_name, {'url': entry.url}, limit=1,
+                                                                 columns=['size']):
+                size -= previous[0][0]
+            row = {
+                'url': entry.url, 'status': entry.status, 'headers': json.dumps(entry.headers), 'body': entry.body,
+                'size': len(entry.body), 'expires': entry.expires, 'accessed': time(), 'etag': entry.etag,
+                'last_modified': entry.last_modified,
+            }
+            self.db_manager.upsert_records_at_table(self.table_name, [row], ('url',))
+            self._size = size + len(entry.body)
+            self.evict()
+        self.count('store')
+
+    def refresh(self, entry: CacheEntry, ttl: float) -> None:
+        """Extend the freshness of an entry the server confirmed to be unchanged."""
+        entry.expires = time() + ttl
+        self.db_manager.update_record_at_table(self.table_name, {'expires': entry.expires, 'accessed': time()},
+                                               {'url': entry.url})
+
+    def evict(self) -> None:
+        """Delete the least recently used entries until the cache fits `max_size`."""
+        while self._size > self.max_size:
+            records = self.db_manager.get_record_from_table(self.table_name, limit=100, columns=['url', 'size'],
+                                                            order_by=['accessed'])
+            if not records:
+                self._size = 0
+                break
+
+            urls = []
+            for url, size in records:
+                urls.append(url)
+                self._size -= size
+                if self._size <= self.max_size:
+                    break
+            self.db_manager.delete_table_data(self.table_name, {'url': ('IN', urls)})
+            for _ in urls:
+                self.count('eviction')
+
+    def clear(self) -> None:
+        with self._lock:
+            self.db_manager.delete_table(self.table_name)
+            self._size = None
+
+
+class CachingAdapter(HTTPAdapter):
+    """Transport adapter answering GET requests from a `ResponseCache` when possible.
+
+    A request with the `Cache-Control: only-if-cached` header never goes to the network, it is answered with
+    504 if there is no fresh entry. Streamed responses (`stream=True`) are answered from the cache but never
+    stored: the caller may stop reading early, and storing would download the whole body.
+    """
+
+    def __init__(self, cache: ResponseCache, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    @staticmethod
+    def get_not_cached_response(request: PreparedRequest) -> Response:
+        response = Response()
+        response.status_code, response.reason = 504, 'Not Cached'
+        response.url, response.request = request.url, request
+        response._content, response._content_consumed = b'', True
+        return response
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        only_if_cached = ONLY_IF_CACHED in request.headers.get('Cache-Control', '')
+        if request.method != 'GET' or (ttl := self.cache.get_ttl(request.url)) is None:
+            return self.get_not_cached_response(request) if only_if_cached else super().send(request, **kwargs)
+
+        if (entry := self.cache.get(request.url)) is not None:
+            if entry.is_fresh:
+                self.cache.count('hit')
+                return entry.to_response(request)
+            request.headers.update(entry.validators)
+
+        if only_if_cached:
+            return self.get_not_cached_response(request)
+
+        response = super().send(request, **kwargs)
+        if entry is not None and response.status_code == 304:
+            response.close()
+            self.cache.refresh(entry, ttl)
+            self.cache.count('revalidated')
+            return entry.to_response(request)
+
+        self.cache.count('miss')
+        if kwargs.get('stream'):
+            return response
+        if response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', ''):
+            self.cache.put(CacheEntry.from_response(response, ttl))  # the session reads the whole body anyway
+        return response
+
+
+@lru_cache(maxsize=None)
+def get_response_cache(db_name: str = http_cache_settings['path']) -> ResponseCache:
+    """Response cache shared by all sessions of the process.
+
+    Args:
+        db_name: cache database file.
+
+    Returns:
+        Cache instance.
+    """
+    return ResponseCache(db_name=db_name)
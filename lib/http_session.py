@@ -0,0 +1,109 @@
+from typing import Optional, Type, TYPE_CHECKING
+from urllib.parse import urlparse
+
+from requests import Session, Response
+from requests.adapters import HTTPAdapter
+from requests.cookies import create_cookie
+from urllib3.util.retry import Retry
+
+from lib.metrics import get_metrics
+from settings import http_settings, STEAM_MAIN
+
+if TYPE_CHECKING:
+    from lib.http_cache import ResponseCache
+
+SESSION_ID_COOKIE = 'sessionid'
+
+
+class AuthorizedSession(Session):
+    """Session of an authorized user.
+
+    State-changing requests to the market are only accepted with the `sessionid` cookie value repeated in the
+    request body, so it is added to the data of every non-GET request that does not pass it explicitly.
+    """
+
+    def get_session_id(self, url: str) -> Optional[str]:
+        """Get the `sessionid` cookie sent to the host of the url, the cookie is set separately for every domain."""
+        host = urlparse(url).hostname or ''
+        for cookie in self.cookies:
+            domain = cookie.domain.lstrip('.')
+            if cookie.name == SESSION_ID_COOKIE and (host == domain or host.endswith(f'.{domain}')):
+                return cookie.value
+
+    def request(self, method: str, url: str, *args, **kwargs):
+        if method.upper() not in ('GET', 'HEAD', 'OPTIONS') and (session_id := self.get_session_id(url)):
+            data = kwargs.get('data')
+            if data is None or isinstance(data, dict):
+                kwargs['data'] = {SESSION_ID_COOKIE: session_id, **(data or {})}
+        return super().request(method, url, *args, **kwargs)
+
+
+def record_response(response: Response, *args, **kwargs) -> None:
+    """Response hook observing the time until the response headers arrived, per host and status."""
+    labels = {'host': urlparse(response.url).hostname or '', 'status': response.status_code}
+    get_metrics().observe('http_request_seconds', response.elapsed.total_seconds(), **labels)
+
+
+def get_session(pool_size: int = http_settings['pool_size'], retries: int = http_settings['retries'],
+                backoff_factor: float = http_settings['backoff_factor'], session_class: Type[Session] = Session,
+                cache: Optional['ResponseCache'] = None) -> Session:
+    """Method for getting a keep-alive session with a connection pool.
+
+    Requests answered with 429 or 5xx are retried with exponential backoff, honoring the Retry-After header.
+    Response times are recorded in the `http_request_seconds` metric.
+
+    Args:
+        pool_size: maximum number of connections kept open per host, should match the number of workers.
+        retries: number of retries for a request.
+        backoff_factor: backoff factor between retries in seconds.
+        session_class: session class.
+        cache: response cache, GET requests to the cached endpoints are answered from it when possible.
+
+    Returns:
+        Session instance.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET', 'HEAD'),
+        respect_retry_after_header=True,
+    )
+    adapter_kwargs = {'pool_connections': pool_size, 'pool_maxsize': pool_size, 'max_retries': retry}
+    if cache is not None:
+        from lib.http_cache import CachingAdapter
+
+        adapter = CachingAdapter(cache, **adapter_kwargs)
+    else:
+        adapter = HTTPAdapter(**adapter_kwargs)
+
+    session = session_class()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.hooks['response'].append(record_response)
+    return session
+
+
+def get_authorized_session(cookies: list[dict], user_agent: str, **kwargs) -> AuthorizedSession:
+    """Method for getting a pooled session that continues a browser session.
+
+    Args:
+        cookies: browser cookies (e.g. `driver.get_cookies()`).
+        user_agent: user-agent of the browser, the session is bound to it.
+        kwargs: `get_session` arguments.
+
+    Returns:
+        Session instance with the cookies and headers of the browser.
+    """
+    session = get_session(session_class=AuthorizedSession, **kwargs)
+    session.headers.update({'User-Agent': user_agent, 'Referer': f'{STEAM_MAIN}/market/'})
+    for cookie in cookies:
+        session.cookies.set_cookie(create_cookie(
+            cookie['name'], cookie['value'],
+            domain=cookie.get('domain', ''),
+            path=cookie.get('path', '/'),
+            secure=cookie.get('secure', False),
+            expires=cookie.get('expiry'),
+            rest={'HttpOnly': None} if cookie.get('httpOnly') else {},
+        ))
+    return session
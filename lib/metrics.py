@@ -0,0 +1,280 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from functools import lru_cache, wraps
+from os import replace
+from threading import Lock, Thread
+from time import perf_counter, time
+from typing import Callable, Iterator, Optional, TYPE_CHECKING
+
+from settings import metrics_settings
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def to_labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def format_labels(labels: Labels, **extra) -> str:
+    """Labels in the Prometheus text format, e.g. `{statement="SELECT"}`."""
+    labels = labels + tuple(extra.items())
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+@dataclass
+class Histogram:
+    """Distribution of observed values over fixed buckets."""
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)  # per bucket, the last one is +Inf
+    sum: float = 0.0
+    count: int = 0
+    max: float = 0.0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate of the quantile, the upper bound of the bucket it falls into.
+
+        Args:
+            q: quantile from 0 to 1.
+
+        Returns:
+            Estimate or None if nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank, cumulative = q * self.count, 0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+@dataclass
+class SlowQuery:
+    query: str
+    duration: float  # seconds
+    ts: float  # epoch seconds
+
+
+@dataclass
+class MetricsBase(ABC):
+    enabled: bool = metrics_settings['enabled']
+
+    @abstractmethod
+    def to_prometheus(self):
+        pass
+
+
+@dataclass
+class Metrics(MetricsBase):
+    """Lightweight in-process metrics: counters, histograms and a log of slow database statements.
+
+    Metrics are identified by a name and labels. They can be written to a file for the Prometheus textfile
+    collector (`write_prometheus`) or served over HTTP in the Prometheus and JSON formats (`serve`).
+    Use `get_metrics` to share one instance per process.
+
+    Example:
+        metrics = get_metrics()
+        with metrics.timer('http_fetch_seconds', page='listing'):
+            response = session.get(url)
+        metrics.inc('http_responses_total', status=response.status_code)
+    """
+    buckets: tuple[float, ...] = metrics_settings['buckets']  # seconds
+    slow_query_threshold: float = metrics_settings['slow_query_threshold']  # seconds
+    slow_query_log_size: int = metrics_settings['slow_query_log_size']
+
+    def __post_init__(self) -> None:
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self.slow_queries: deque[SlowQuery] = deque(maxlen=self.slow_query_log_size)
+        self._lock = Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increase a counter.
+
+        Args:
+            name: metric name.
+            value: increment.
+            labels: metric labels.
+        """
+        if not self.enabled:
+            return
+        key = (name, to_labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Add a value to a histogram.
+
+        Args:
+            name: metric name.
+            value: observed value, seconds for timers.
+            labels: metric labels.
+        """
+        if not self.enabled:
+            return
+        key = (name, to_labels(labels))
+        with self._lock:
+            if (histogram := self.histograms.get(key)) is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the duration of the block, errors are counted in `<name>_errors_total`."""
+        start = perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f'{name.removesuffix("_seconds")}_errors_total', **labels)
+            raise
+        finally:
+            self.observe(name, perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels) -> Callable:
+        """Decorator observing the duration of every call of the function."""
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_query(self, query: str, duration: float) -> None:
+        """Observe a database statement and log it if it is slow.
+
+        Args:
+            query: SQL statement.
+            duration: execution time including fetching the rows, seconds.
+        """
+        if not self.enabled:
+            return
+        query = ' '.join(query.split())
+        self.observe('db_query_seconds', duration, statement=query.split(' ', 1)[0].upper())
+        if duration >= self.slow_query_threshold:
+            with self._lock:  # the log is read by the metrics server thread
+                self.slow_queries.append(SlowQuery(query, duration, time()))
+            logger.warning('Slow query (%.3f s): %s', duration, query)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.slow_queries.clear()
+
+    def get_stats(self) -> dict:
+        """Metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [
+                {'name': name, 'labels': dict(labels), 'count': i.count, 'sum': i.sum, 'max': i.max,
+                 'p50': i.quantile(0.5), 'p95': i.quantile(0.95), 'p99': i.quantile(0.99)}
+                for (name, labels), i in sorted(self.histograms.items())
+            ]
+            slow_queries = [asdict(i) for i in self.slow_queries]
+        return {'counters': counters, 'histograms': histograms, 'slow_queries': slow_queries}
+
+    def to_json(self) -> str:
+        return json.dumps(self.get_stats())
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted({i for i, _ in self.counters}):
+                lines.append(f'# TYPE {name} counter')
+                lines += [f'{name}{format_labels(labels)} {value}'
+                          for (i, labels), value in sorted(self.counters.items()) if i == name]
+
+            for name in sorted({i for i, _ in self.histograms}):
+                lines.append(f'# TYPE {name} histogram')
+                for (i, labels), histogram in sorted(self.histograms.items()):
+                    if i != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(float(bound))
+                        lines.append(f'{name}_bucket{format_labels(labels, le=le)} {cumulative}')
+                    lines.append(f'{name}_sum{format_labels(labels)} {histogram.sum}')
+                    lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, file_path: str) -> None:
+        """Write the metrics for the Prometheus textfile collector, the file is replaced atomically.
+
+        Args:
+            file_path: path of the `.prom` file.
+        """
+        temp_path = f'{file_path}.tmp'
+        with open(temp_path, 'w') as file:
+            file.write(self.to_prometheus())
+        replace(temp_path, file_path)
+
+    def serve(self, host: str = metrics_settings['host'], port: int = metrics_settings['port']
+              ) -> 'ThreadingHTTPServer':
+        """Serve the metrics in a background thread: `/metrics` - Prometheus format, `/stats` - JSON.
+
+        Args:
+            host: address to listen on.
+            port: port, 0 - any free port.
+
+        Returns:
+            Server instance, stop it with `shutdown()`.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == '/metrics':
+                    body, content_type = metrics.to_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/stats':
+                    body, content_type = metrics.to_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body.encode())))
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        Thread(target=server.serve_forever, daemon=True, name='metrics-server').start()
+        return server
+
+
+@lru_cache(maxsize=None)
+def get_metrics() -> Metrics:
+    """Metrics shared by the whole process."""
+    return Metrics()
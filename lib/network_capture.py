@@ -0,0 +1,147 @@
+import json
+import re
+from abc import ABC, abstractmethod
+from base64 import b64decode
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional, Union
+
+from selenium.common import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from lib.webdriver import Driver
+
+FETCH_SCRIPT = '''
+const [urls, done] = [arguments[0], arguments[arguments.length - 1]];
+Promise.all(urls.map(url => fetch(url, {credentials: 'include'})
+    .then(response => response.text().then(body => ({
+        url: url, status: response.status, mime_type: response.headers.get('content-type') || '', body: body,
+    })))
+    .catch(error => ({url: url, status: 0, mime_type: '', body: String(error)}))
+)).then(done);
+'''
+
+
+@dataclass
+class CapturedResponse:
+    url: str
+    status: int
+    mime_type: str
+    body: Optional[str] = None
+    request_id: Optional[str] = None  # id of the request in the DevTools protocol, None for `fetch_batch`
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+@dataclass
+class NetworkCaptureBase(ABC):
+    driver: Union[Driver, WebDriver]
+
+    @abstractmethod
+    def collect(self):
+        pass
+
+
+@dataclass
+class NetworkCapture(NetworkCaptureBase):
+    """Reading of the data loaded by the market pages directly from the network layer of the browser.
+
+    Responses are taken from the performance log of Chrome (the driver must be created with
+    `performance_log=True`) and their bodies from `Network.getResponseBody`, so the JSON the page requests
+    is read as is instead of being scraped from the rendered DOM. `fetch_batch` requests more urls
+    from inside the authorized page in one round trip, without navigations.
+
+    Example:
+        capture = NetworkCapture(driver, url_pattern='itemordershistogram').start()
+        driver.get(item_url)
+        histograms = [i.json() for i in capture.collect()]
+    """
+    url_pattern: str = ''  # regular expression, all urls if empty
+    resource_types: tuple[str, ...] = ('XHR', 'Fetch')
+    mime_types: tuple[str, ...] = ('application/json', 'text/json', 'text/javascript')
+    script_timeout: float = 30
+    _pending: dict[str, CapturedResponse] = field(default_factory=dict, init=False, repr=False)
+
+    def start(self) -> 'NetworkCapture':
+        """Enable the network domain and drop the events logged before.
+
+        Returns:
+            Capture instance.
+        """
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.get_log('performance')
+        self._pending.clear()
+        return self
+
+    def iter_events(self) -> Iterator[tuple[str, dict]]:
+        """Read DevTools events from the performance log, every entry is returned once.
+
+        Returns:
+            Generator of (method, params).
+        """
+        for entry in self.driver.get_log('performance'):
+            message = json.loads(entry['message'])['message']
+            yield message.get('method'), message.get('params', {})
+
+    def is_captured(self, params: dict) -> bool:
+        response = params['response']
+        return (
+            params.get('type') in self.resource_types
+            and response.get('mimeType', '').split(';')[0] in self.mime_types
+            and re.search(self.url_pattern, response['url']) is not None
+        )
+
+    def get_body(self, request_id: str) -> Optional[str]:
+        """Get the body of a response that is still kept by the browser.
+
+        Args:
+            request_id: DevTools request id.
+
+        Returns:
+            Body or None if the browser has already evicted it.
+        """
+        try:
+            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except WebDriverException:
+            return None
+        return b64decode(result['body']).decode() if result.get('base64Encoded') else result['body']
+
+    def collect(self) -> list[CapturedResponse]:
+        """Collect the matching responses that finished loading since the previous call.
+
+        Returns:
+            Responses in the order they were received.
+        """
+        finished = []
+        for method, params in self.iter_events():
+            if method == 'Network.responseReceived' and self.is_captured(params):
+                response = params['response']
+                self._pending[params['requestId']] = CapturedResponse(
+                    response['url'], response['status'], response.get('mimeType', ''),
+                    request_id=params['requestId'],
+                )
+            elif method == 'Network.loadingFinished' and params['requestId'] in self._pending:
+                finished.append(self._pending.pop(params['requestId']))
+            elif method == 'Network.loadingFailed':
+                self._pending.pop(params['requestId'], None)
+
+        for response in finished:
+            response.body = self.get_body(response.request_id)
+        return finished
+
+    def fetch_batch(self, urls: list[str], batch_size: int = 10) -> list[CapturedResponse]:
+        """Request urls with `fetch()` inside the current page, with its cookies and origin.
+
+        Args:
+            urls: urls, relative to the current page or absolute.
+            batch_size: number of requests made concurrently by the page.
+
+        Returns:
+            Responses in the order of the urls, failed requests have status 0.
+        """
+        self.driver.set_script_timeout(self.script_timeout)
+        responses = []
+        for i in range(0, len(urls), batch_size):
+            results = self.driver.execute_async_script(FETCH_SCRIPT, urls[i:i + batch_size])
+            responses += [CapturedResponse(j['url'], j['status'], j['mime_type'], j['body']) for j in results]
+        return responses
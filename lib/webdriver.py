@@ -1,18 +1,20 @@
-from settings import webdriver_settings
+from settings import webdriver_settings, webdriver_profiles, WEBDRIVER_PROFILE
 
 from abc import ABC, abstractmethod
 from typing import Optional, Union
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from selenium.webdriver import Chrome
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.remote.webdriver import WebDriver
 
+from lib.http_session import AuthorizedSession, get_authorized_session
+
 
 @dataclass
 class DriverSettingsBase(ABC):
     """Base class for interacting with driver options."""
-    settings: Options = Options()
+    settings: Options = field(default_factory=Options)  # every driver gets its own options
 
     @property
     @abstractmethod
@@ -22,16 +24,36 @@ class DriverSettingsBase(ABC):
 
 @dataclass
 class DriverSettings(DriverSettingsBase):
-    """Class for interacting with driver options."""
+    """Class for interacting with driver options.
+
+    The arguments of `webdriver_settings` are extended by the named profile of `webdriver_profiles`,
+    e.g. 'fast' - headless browser with eager page load that does not download images, fonts and media.
+    """
     custom_settings: Optional[tuple] = None
+    profile: str = WEBDRIVER_PROFILE
+    performance_log: bool = False  # log DevTools events, required by `NetworkCapture`
 
     def __post_init__(self) -> None:
         """Post initialization."""
-        settings = webdriver_settings
+        if self.profile not in webdriver_profiles:
+            raise Exception(f'Driver profile not found - {self.profile}')
+
+        settings = webdriver_settings + self.profile_settings.get('arguments', ())
         if custom_settings := self.custom_settings:
             settings += custom_settings
         _ = [self.settings.add_argument(i) for i in settings]
 
+        if page_load_strategy := self.profile_settings.get('page_load_strategy'):
+            self.settings.page_load_strategy = page_load_strategy
+        if prefs := self.profile_settings.get('prefs'):
+            self.settings.add_experimental_option('prefs', prefs)
+        if self.performance_log:
+            self.settings.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    @property
+    def profile_settings(self) -> dict:
+        return webdriver_profiles[self.profile]
+
     @property
     def get_settings(self) -> Options:
         """Method for getting an instance of the browser settings class.
@@ -54,15 +76,17 @@ class DriverBase(ABC):
 class Driver(DriverBase):
     """Class for getting an instance of the driver class."""
     custom_settings: Optional[tuple] = None
+    profile: str = WEBDRIVER_PROFILE
+    performance_log: bool = False
 
     def __post_init__(self) -> None:
         """Post initialization."""
         if self.driver_type.lower() == 'chrome':
-            self.driver = Chrome(
-                options=DriverSettings(
-                    custom_settings=self.custom_settings
-                ).get_settings
-            )
+            settings = DriverSettings(custom_settings=self.custom_settings, profile=self.profile,
+                                      performance_log=self.performance_log)
+            self.driver = Chrome(options=settings.get_settings)
+            if blocked_urls := settings.profile_settings.get('blocked_urls'):
+                block_urls(self.driver, blocked_urls)
             return None
         raise Exception('Driver not found')
 
@@ -88,6 +112,30 @@ def get_user_agent(driver: Union[Driver, WebDriver]) -> str:
     return driver.execute_script("return navigator.userAgent;")
 
 
+def get_http_session(driver: Union[Driver, WebDriver], **kwargs) -> AuthorizedSession:
+    """Method for getting a pooled HTTP session with the cookies and user-agent of the driver.
+
+    Args:
+        driver: driver instance.
+        kwargs: `get_session` arguments.
+
+    Returns:
+        Session instance.
+    """
+    return get_authorized_session(driver.get_cookies(), get_user_agent(driver), **kwargs)
+
+
+def block_urls(driver: Union[Driver, WebDriver], urls: tuple[str, ...]) -> None:
+    """Method for blocking requests of the browser by url patterns (e.g. '*.woff2'), Chrome only.
+
+    Args:
+        driver: driver instance.
+        urls: url patterns.
+    """
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(urls)})
+
+
 def add_cookies(driver: Union[Driver, WebDriver], cookies: list[dict]) -> None:
     """Method for adding cookies.
 
@@ -1,3 +1,188 @@
+"""Command line interface of the trade bot.
 
-if __name__ == "__main__":
-    pass
+Heavy dependencies (pandas, numpy, requests, Selenium) are imported inside the commands that need them,
+so light commands like `stats` or `lookup` start quickly from cron or a shell.
+
+Usage:
+    python main.py stats --count
+    python main.py lookup CS "M4A1-S | Boreal Forest (Field-Tested)"
+    python main.py fetch-history CS --file items.txt --workers 8
+    python main.py poll --iterations 100 --metrics-port 9108
+    python main.py export history_rollup_table --output rollup.csv
+"""
+import json
+import sys
+from argparse import ArgumentParser, Namespace
+from typing import Optional
+
+from settings import DB_PATH, http_cache_settings
+
+CATEGORIES = ('CS', 'DOTA')
+
+
+def use_database(db_path: str) -> None:
+    """Point all database access of the process to the database file, before anything is connected."""
+    from lib.database_manipulator import DataBaseManipulator
+
+    DataBaseManipulator.db_manager.db_name = db_path  # shared by all manipulator instances
+
+
+def read_names(names: list[str], file_path: Optional[str]) -> list[str]:
+    """Item names from the arguments and from a file with one name per line."""
+    if file_path:
+        with open(file_path, encoding='utf-8') as file:
+            names = names + [i.strip() for i in file if i.strip()]
+    return names
+
+
+def stats(args: Namespace) -> int:
+    from lib.database_manipulator import DataBaseManipulator
+
+    db_manager = DataBaseManipulator.db_manager
+    schema = db_manager.load_schema()
+    # counting scans every table, the tables are only listed unless asked
+    tables = {i: db_manager.execute(f'SELECT COUNT(*) FROM {i}')[0][0] if args.count else None
+              for i in sorted(schema.tables)}
+    if args.json:
+        print(json.dumps({'db': db_manager.db_name, 'tables': tables, 'indexes': len(schema.indexes)}))
+        return 0
+
+    print(f'{db_manager.db_name}: {len(tables)} tables, {len(schema.indexes)} indexes')
+    for table_name, count in tables.items():
+        print(table_name if count is None else f'{table_name:<40} {count:>12,}')
+    return 0
+
+
+def lookup(args: Namespace) -> int:
+    from trade_bot.item_registry import get_item_registry
+    from trade_bot.util import CategoryTrade
+
+    item_name_id = get_item_registry().resolve(CategoryTrade[args.category], args.name, fetch_missing=args.fetch)
+    if item_name_id is None:
+        print(f'Item {args.name} is unknown', file=sys.stderr)
+        return 1
+    print(item_name_id)
+    return 0
+
+
+def fetch_history(args: Namespace) -> int:
+    from lib.http_cache import get_response_cache
+    from lib.http_session import get_session
+    from trade_bot.credential_pool import CredentialPool
+    from trade_bot.history_fetcher import HistoryBatchFetcher
+    from trade_bot.util import CategoryTrade
+
+    category = CategoryTrade[args.category]
+    cache = get_response_cache() if http_cache_settings['enabled'] and not args.no_cache else None
+    credentials = CredentialPool(cache=cache).load() if args.accounts else None
+    fetcher = HistoryBatchFetcher([(category, i) for i in read_names(args.names, args.file)],
+                                  max_workers=args.workers, session=get_session(pool_size=args.workers, cache=cache),
+                                  credentials=credentials, cache=cache)
+    failed = fetcher.exec()
+    for key in failed:
+        print(f'{key[1]}: {fetcher.errors[key]}', file=sys.stderr)
+    return 1 if failed else 0
+
+
+def poll(args: Namespace) -> int:
+    from trade_bot.trade_bot import TradeBot
+
+    TradeBot(item_ids=args.item_ids, iterations=args.iterations, metrics_port=args.metrics_port).exec()
+    return 0
+
+
+def login(args: Namespace) -> int:
+    from trade_bot.authorization import AuthorizationManager
+
+    driver = AuthorizationManager().exec()
+    driver.quit()
+    print('Logged in, the session is saved')
+    return 0
+
+
+def rank(args: Namespace) -> int:
+    from trade_bot.analytics import MarketAnalytics
+
+    for i in MarketAnalytics().rank(top=args.top):
+        print(f'{i.item_id:>12} score {i.score:.4f} margin {i.margin:.2%} price {i.price / 100:.2f} '
+              f'velocity {i.velocity:.1f}/day')
+    return 0
+
+
+def export(args: Namespace) -> int:
+    import csv
+    from lib.database_manipulator import DataBaseManipulator, IDENTIFIER_REGEXP
+
+    if not IDENTIFIER_REGEXP.match(args.table):
+        print(f'Invalid table name {args.table}', file=sys.stderr)
+        return 1
+
+    db_manipulator = DataBaseManipulator()
+    columns = args.columns or db_manipulator.get_table_columns(args.table)
+    rows = db_manipulator.iter_table_data(args.table, columns=columns, order_by=args.order_by)
+    file = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        writer.writerows(rows)  # rows are streamed, the table is never loaded into memory
+    finally:
+        if file is not sys.stdout:
+            file.close()
+    return 0
+
+
+def get_parser() -> ArgumentParser:
+    parser = ArgumentParser(description='Steam market trade bot.')
+    parser.add_argument('--db', default=DB_PATH, help='database file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('stats', help='tables and their row counts')
+    command.add_argument('--count', action='store_true', help='count the rows, every table is scanned')
+    command.add_argument('--json', action='store_true', help='print as JSON')
+    command.set_defaults(func=stats)
+
+    command = commands.add_parser('lookup', help='item id by category and name')
+    command.add_argument('category', choices=CATEGORIES)
+    command.add_argument('name')
+    command.add_argument('--fetch', action='store_true', help='download the listing page if the item is unknown')
+    command.set_defaults(func=lookup)
+
+    command = commands.add_parser('fetch-history', help='refresh the price history of items')
+    command.add_argument('category', choices=CATEGORIES)
+    command.add_argument('names', nargs='*', help='item names')
+    command.add_argument('--file', help='file with one item name per line')
+    command.add_argument('--workers', type=int, default=8)
+    command.add_argument('--accounts', action='store_true', help='spread the requests across saved accounts')
+    command.add_argument('--no-cache', action='store_true', help='download the pages even if they are cached')
+    command.set_defaults(func=fetch_history)
+
+    command = commands.add_parser('poll', help='log in and poll the order books of the watchlist')
+    command.add_argument('item_ids', type=int, nargs='*', help='watchlist, all registered items if empty')
+    command.add_argument('--iterations', type=int, default=None, help='number of polls, endless by default')
+    command.add_argument('--metrics-port', type=int, default=None, help='serve the metrics on this port')
+    command.set_defaults(func=poll)
+
+    command = commands.add_parser('login', help='log in and save the session')
+    command.set_defaults(func=login)
+
+    command = commands.add_parser('rank', help='best items to trade')
+    command.add_argument('--top', type=int, default=20)
+    command.set_defaults(func=rank)
+
+    command = commands.add_parser('export', help='export a table to CSV')
+    command.add_argument('table')
+    command.add_argument('--output', help='CSV file, stdout by default')
+    command.add_argument('--columns', nargs='+', help='columns, all by default')
+    command.add_argument('--order-by', nargs='+', help='sort order, e.g. "ts DESC"')
+    command.set_defaults(func=export)
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = get_parser().parse_args(argv)
+    use_database(args.db)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,9 +9,80 @@ webdriver_settings = (
     '--window-size=1200x600',
 )
 
+WEBDRIVER_PROFILE = 'default'
+webdriver_profiles = {
+    'default': {},
+    'fast': {  # for pages that are only read or restored from cookies, not for the first login
+        'arguments': ('--headless=new', '--disable-gpu', '--disable-extensions', '--mute-audio'),
+        'page_load_strategy': 'eager',  # do not wait for images, stylesheets and frames
+        'prefs': {
+            'profile.managed_default_content_settings.images': 2,  # 2 - block
+            'profile.default_content_setting_values.notifications': 2,
+        },
+        'blocked_urls': ('*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.woff', '*.woff2',
+                         '*.ttf', '*.otf', '*.mp4', '*.webm', '*.m3u8'),
+    },
+}
+
+driver_pool_settings = {
+    'size': 2,
+    'max_uses': 50,  # leases before a driver is relaunched
+    'max_memory': 512 * 1024 * 1024,  # JS heap bytes before a driver is relaunched
+    'lease_timeout': 120,
+}
+
+credential_pool_settings = {
+    'size': 4,  # accounts used at once
+    'rate': 0.3,  # requests per second per account
+    'burst': 5,
+}
+
+scheduler_settings = {
+    'base_interval': 300,  # seconds between polls of an item before it is adapted
+    'min_interval': 30,
+    'max_interval': 3600,
+    'max_workers': 4,  # items polled at once
+}
+
+metrics_settings = {
+    'enabled': True,
+    'buckets': (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),  # seconds
+    'slow_query_threshold': 0.1,  # seconds, statements at least this slow are logged
+    'slow_query_log_size': 100,
+    'host': '127.0.0.1',
+    'port': 9108,
+}
+
+AUTH_CHECK_TTL = 3600  # seconds the result of a session validity check is trusted
+
 DB_PATH = path.join(getcwd(), 'SteamTrade.db')
 DB_PATH_TEST = path.join(getcwd(), 'tests', 'TestDB.db')
 
+DB_PERSISTENT = True
+db_pragmas = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # negative value - size in KiB
+}
+
+http_settings = {
+    'pool_size': 16,
+    'retries': 3,
+    'backoff_factor': 0.5,
+    'timeout': 10,
+    'chunk_size': 16 * 1024,
+}
+
+http_cache_settings = {
+    'enabled': True,
+    'path': path.join(getcwd(), 'HttpCache.db'),
+    'max_size': 256 * 1024 ** 2,  # bytes of the stored bodies
+    'ttls': {  # url regexp - seconds the response is fresh, urls not listed here are not cached
+        r'/market/listings/\d+/': 3600,  # price history has hourly granularity
+        r'/market/pricehistory/': 3600,
+    },
+}
+
 STEAM_MAIN: str = 'https://steamcommunity.com'
 STEAM_LOGIN: Optional[str] = environ.get('login', None)
 STEAM_PASSWORD: Optional[str] = environ.get('password', None)
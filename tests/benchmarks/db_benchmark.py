@@ -0,0 +1,329 @@
+"""Throughput benchmarks of the database layer with a stored baseline.
+
+Usage:
+    python -m tests.benchmarks.db_benchmark run --sizes 1000 100000 1000000 --save
+    python -m tests.benchmarks.db_benchmark compare --threshold 0.2
+
+The baseline is only comparable on the machine and the Python build it was measured with, `compare` refuses
+to run elsewhere unless `--force` is passed. Variations of the machine speed between the runs (CPU frequency,
+other load) are compensated with a fixed reference workload timed before every run.
+
+The committed db_baseline.json is an example recorded on a 1-CPU box and is not a gate, measure your own
+baseline with `run --save` before comparing.
+"""
+import json
+import logging
+import platform
+import sqlite3
+import sys
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from os import cpu_count, path
+from random import Random
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Optional
+from unittest.mock import patch, PropertyMock
+
+from pandas import DataFrame
+
+from lib.database_manipulator import DataBaseManipulator, DatabaseManager
+
+BASELINE_PATH = path.join(path.dirname(__file__), 'db_baseline.json')
+SIZES = (1000, 100000, 1000000)
+TABLE_NAME = 'benchmark_table'
+DB_FIELDS = {'item_id': 'INTEGER', 'ts': 'INTEGER', 'price': 'INTEGER', 'volume': 'INTEGER'}
+ITEM_ROWS = 100  # rows of every item
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    rows: int  # rows in the table
+    operations: int  # rows written or read, or calls for point operations
+    samples: list[float]  # seconds of every measured run
+    reference: float = 0.0  # median seconds of the reference workload before the runs, 0 - not calibrated
+
+    @property
+    def key(self) -> str:
+        return f'{self.name}/{self.rows}'
+
+    @property
+    def seconds(self) -> float:
+        return median(self.samples)
+
+    @property
+    def throughput(self) -> float:
+        """Operations per second of the median run."""
+        return self.operations / self.seconds if self.seconds else 0.0
+
+    @property
+    def throughput_range(self) -> tuple[float, float]:
+        """Operations per second of the slowest and the fastest run."""
+        return (self.operations / max(self.samples) if max(self.samples) else 0.0,
+                self.operations / min(self.samples) if min(self.samples) else 0.0)
+
+    def to_baseline(self) -> dict[str, float]:
+        low, high = self.throughput_range
+        return {'median': round(self.throughput, 1), 'min': round(low, 1), 'max': round(high, 1),
+                'reference': round(self.reference, 6)}
+
+    def __str__(self) -> str:
+        low, high = self.throughput_range
+        return (f'{self.key:<28} {self.throughput:>14,.0f} ops/s  ({low:,.0f} - {high:,.0f}, '
+                f'{self.operations} ops in {self.seconds:.3f} s)')
+
+
+def get_environment() -> dict[str, str]:
+    """Properties of the machine and the interpreter the throughput depends on."""
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'system': platform.system(), 'machine': platform.machine(), 'processor': platform.processor(),
+            'cpus': str(cpu_count()), 'sqlite': sqlite3.sqlite_version}
+
+
+def reference_workload() -> int:
+    """Fixed SQLite and Python workload independent of the code under test."""
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE reference (a INTEGER PRIMARY KEY, b INTEGER)')
+    conn.executemany('INSERT INTO reference VALUES (?, ?)', ((i, i * 7 % 1000) for i in range(50000)))
+    result = conn.execute('SELECT SUM(b) FROM reference WHERE a % 3 = 0').fetchone()[0]
+    conn.close()
+    return result
+
+
+def generate_rows(count: int, start: int = 0) -> list[dict]:
+    """Hourly bars of `count / ITEM_ROWS` items."""
+    random = Random(start)
+    return [{'id': i + 1, 'item_id': i // ITEM_ROWS, 'ts': i % ITEM_ROWS * 3600,
+             'price': random.randint(1, 100000), 'volume': random.randint(0, 1000)}
+            for i in range(start, start + count)]
+
+
+def measure(func: Callable[[], int], repeat: int, setup: Optional[Callable[[], None]] = None
+            ) -> tuple[int, list[float]]:
+    """Time `repeat` runs after a warm-up run.
+
+    Args:
+        func: benchmark returning the number of operations it made.
+        repeat: number of runs.
+        setup: preparation before every run, not measured.
+
+    Returns:
+        Number of operations and the time of every run in seconds.
+    """
+    samples, operations = [], 0
+    for run in range(repeat + 1):
+        if setup:
+            setup()
+        start = perf_counter()
+        operations = func()
+        if run:  # the first run warms up the caches and the statement cache
+            samples.append(perf_counter() - start)
+    return operations, samples
+
+
+def time_reference() -> float:
+    """Time of the reference workload in seconds, the speed of the machine at the moment."""
+    start = perf_counter()
+    reference_workload()
+    return perf_counter() - start
+
+
+@dataclass
+class DatabaseBenchmark:
+    """Benchmarks of `DataBaseManipulator` and `DatabaseManager` against a table of `rows` rows."""
+    rows: int
+    repeat: int = 5
+    samples: int = 200  # calls of the point operations
+    arraysize: int = 1000
+
+    def __post_init__(self) -> None:
+        self.db_manipulator = DataBaseManipulator()
+        self.data = generate_rows(self.rows)
+        self.updates = [{**i, 'price': i['price'] + 1} for i in self.data]  # new prices of the stored bars
+        self.random = Random(self.rows)
+
+    def create_table(self) -> None:
+        self.db_manipulator.delete_table(TABLE_NAME)
+        self.db_manipulator.create_table(TABLE_NAME, DB_FIELDS, unique_keys=('item_id', 'ts'))
+
+    def fill_table(self) -> None:
+        self.create_table()
+        self.db_manipulator.bulk_upsert(TABLE_NAME, self.data, ('item_id', 'ts'))
+
+    def bulk_upsert(self) -> int:
+        """Upsert into the filled table, every row conflicts on the (item_id, ts) key and updates it."""
+        self.db_manipulator.bulk_upsert(TABLE_NAME, self.updates, ('item_id', 'ts'))
+        return len(self.updates)
+
+    def insert(self) -> int:
+        """Single-row inserts into the filled table, as done by `create_or_update_table_data`."""
+        for row in generate_rows(self.samples, start=self.rows + self.random.randrange(10 ** 9)):
+            self.db_manipulator.create_table_data(TABLE_NAME, row)
+        return self.samples
+
+    def point_read(self) -> int:
+        for _ in range(self.samples):
+            self.db_manipulator.get_table_data(TABLE_NAME, {'id': self.random.randint(1, self.rows)}, limit=1)
+        return self.samples
+
+    def range_read(self) -> int:
+        """Read of 10 % of the items through the (item_id, ts) index."""
+        items = max(self.rows // ITEM_ROWS, 1)
+        first = self.random.randrange(items - items // 10) if items > 10 else 0
+        search_condition = {'item_id': ('BETWEEN', (first, first + max(items // 10, 1) - 1))}
+        return sum(1 for _ in self.db_manipulator.iter_table_data(TABLE_NAME, search_condition,
+                                                                   arraysize=self.arraysize))
+
+    def dataframe_to_table(self) -> int:
+        df = DataFrame(self.data)
+        self.db_manipulator.dataframe_to_table(df, TABLE_NAME, {'if_exists': 'replace', 'index': False})
+        return len(df)
+
+    def table_to_dataframe(self) -> int:
+        return len(self.db_manipulator.table_to_dataframe(TABLE_NAME))
+
+    def exec(self) -> list[BenchmarkResult]:
+        benchmarks = (
+            ('bulk_upsert', self.bulk_upsert, self.fill_table),
+            ('point_read', self.point_read, None),
+            ('range_read', self.range_read, None),
+            ('table_to_dataframe', self.table_to_dataframe, None),
+            ('insert', self.insert, self.fill_table),
+            ('dataframe_to_table', self.dataframe_to_table, self.create_table),
+        )
+        results = []
+        for name, func, setup in benchmarks:
+            references = []
+
+            def prepare(setup: Optional[Callable[[], None]] = setup) -> None:
+                if setup:
+                    setup()
+                references.append(time_reference())  # right before every run, the speed changes over time
+
+            operations, samples = measure(func, self.repeat, prepare)
+            results.append(BenchmarkResult(name, self.rows, operations, samples, median(references[1:])))
+        self.db_manipulator.delete_table(TABLE_NAME)
+        return results
+
+
+def run_benchmarks(sizes: tuple[int, ...] = SIZES, repeat: int = 5, samples: int = 200,
+                   db_path: Optional[str] = None, verbose: bool = False) -> list[BenchmarkResult]:
+    """Run all benchmarks for every table size.
+
+    Args:
+        sizes: table sizes in rows.
+        repeat: measured runs of every benchmark.
+        samples: calls of the point operations.
+        db_path: database file, a temporary one is used if not passed.
+        verbose: print the results as they are measured.
+
+    Returns:
+        Benchmark results.
+    """
+    results = []
+    with TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(db_path or path.join(tmp_dir, 'Benchmark.db'), persistent=True)
+        with patch.object(DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=db_manager)):
+            for rows in sizes:
+                for result in DatabaseBenchmark(rows, repeat, samples).exec():
+                    if verbose:
+                        print(result)
+                    results.append(result)
+        db_manager.disconnect()
+    return results
+
+
+def save_baseline(results: list[BenchmarkResult], file_path: str = BASELINE_PATH) -> None:
+    """Store the median and the range of the throughput of every benchmark together with the environment.
+
+    Entries of other benchmarks are kept if the baseline was measured in the same environment.
+    """
+    baseline = {}
+    if path.exists(file_path) and not check_environment((stored := load_baseline(file_path)).get('environment', {})):
+        baseline = stored['results']
+    baseline.update({i.key: i.to_baseline() for i in results})
+    with open(file_path, 'w') as file:
+        json.dump({'environment': get_environment(), 'results': dict(sorted(baseline.items()))}, file, indent=2)
+        file.write('\n')
+
+
+def load_baseline(file_path: str = BASELINE_PATH) -> dict:
+    """Baseline with the `environment` it was measured in and the throughput `results` by benchmark key."""
+    with open(file_path) as file:
+        return json.load(file)
+
+
+def check_environment(environment: dict[str, str]) -> list[str]:
+    """Differences between the environment of a baseline and the current one."""
+    current = get_environment()
+    return [f'{k}: {environment.get(k)} in the baseline, {v} here' for k, v in current.items()
+            if environment.get(k) != v]
+
+
+def compare(results: list[BenchmarkResult], baseline: dict[str, dict[str, float]], threshold: float = 0.2
+            ) -> tuple[list[str], list[str]]:
+    """Compare the results with the baseline.
+
+    The baseline is first scaled by the speed of the machine, measured with the reference workload before every
+    run, both now and when the baseline was stored. A benchmark regressed if its median throughput dropped
+    by more than `threshold` against the scaled baseline median and is also below the scaled slowest baseline run,
+    so the noise already seen in the baseline is tolerated.
+
+    Args:
+        results: benchmark results.
+        baseline: median, min and max throughput and the reference time by benchmark key.
+        threshold: allowed relative drop of the throughput.
+
+    Returns:
+        Report line of every compared benchmark and descriptions of the regressions, benchmarks missing from
+        the baseline are skipped.
+    """
+    report, regressions = [], []
+    for result in results:
+        if not (expected := baseline.get(result.key)) or not expected['median']:
+            continue
+        scale = expected['reference'] / result.reference if expected.get('reference') and result.reference else 1
+        median_expected, min_expected = expected['median'] * scale, expected['min'] * scale
+        change = result.throughput / median_expected - 1
+        report.append(f'{result}  {change:+.1%} vs baseline x {scale:.2f}')
+        if change < -threshold and result.throughput < min_expected:
+            regressions.append(f'{result.key}: {result.throughput:,.0f} ops/s, baseline {median_expected:,.0f} '
+                               f'ops/s (min {min_expected:,.0f}, machine speed x {scale:.2f}, {change:+.1%})')
+    return report, regressions
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Throughput benchmarks of the database layer.')
+    parser.add_argument('command', choices=('run', 'compare'))
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='table sizes in rows')
+    parser.add_argument('--repeat', type=int, default=5, help='measured runs of every benchmark')
+    parser.add_argument('--samples', type=int, default=200, help='calls of the point operations')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative drop of the throughput')
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--db', default=None, help='database file, temporary by default')
+    parser.add_argument('--force', action='store_true', help='compare with a baseline of another environment')
+    args = parser.parse_args()
+    logging.getLogger('lib.metrics').setLevel(logging.ERROR)  # large scans are expected to be slow here
+
+    if args.command == 'run':
+        benchmark_results = run_benchmarks(tuple(args.sizes), args.repeat, args.samples, args.db, verbose=True)
+        if args.save:
+            save_baseline(benchmark_results, args.baseline)
+    else:
+        stored = load_baseline(args.baseline)
+        if note := stored.get('note'):
+            print(note)
+        if differences := check_environment(stored.get('environment', {})):
+            print('The baseline was measured in another environment:', *differences, sep='\n')
+            if not args.force:
+                print('Measure a new baseline with `run --save` or pass --force')
+                sys.exit(2)
+        benchmark_results = run_benchmarks(tuple(args.sizes), args.repeat, args.samples, args.db)
+        lines, found = compare(benchmark_results, stored['results'], args.threshold)
+        print(*lines, sep='\n')
+        if found:
+            print('Regressions:', *found, sep='\n')
+            sys.exit(1)
@@ -0,0 +1,57 @@
+import json
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from tests.benchmarks.db_benchmark import (BenchmarkResult, check_environment, compare, get_environment, load_baseline,
+                                          save_baseline)
+
+
+class TestDatabaseBenchmark(TestCase):
+
+    def setUp(self) -> None:
+        self.results = [BenchmarkResult('insert', 1000, 100, [0.1, 0.125, 0.2], 0.05),
+                        BenchmarkResult('point_read', 1000, 100, [0.01, 0.01, 0.01], 0.05)]
+        self.baseline = {'insert/1000': {'median': 800.0, 'min': 500.0, 'max': 1000.0, 'reference': 0.05},
+                         'point_read/1000': {'median': 20000.0, 'min': 19000.0, 'max': 21000.0, 'reference': 0.05}}
+
+    def test_result(self) -> None:
+        self.assertEqual({'median': 800.0, 'min': 500.0, 'max': 1000.0, 'reference': 0.05},
+                         self.results[0].to_baseline())
+
+    def test_compare(self) -> None:
+        with self.subTest('Drop within the noise of the baseline'):
+            report, regressions = compare(self.results, self.baseline)
+            self.assertEqual(2, len(report))
+            self.assertEqual(['point_read/1000'], [i.split(':')[0] for i in regressions])
+
+        with self.subTest('Baseline is scaled by the speed of the machine'):
+            self.baseline['point_read/1000']['reference'] = 0.005  # the machine was 10 times faster
+            self.assertEqual([], compare(self.results, self.baseline)[1])
+
+        with self.subTest('Benchmarks missing from the baseline are skipped'):
+            self.assertEqual(([], []), compare(self.results, {}))
+
+    def test_check_environment(self) -> None:
+        environment = get_environment()
+        self.assertEqual([], check_environment(environment))
+        self.assertEqual([f'sqlite: 3.0.0 in the baseline, {environment["sqlite"]} here'],
+                         check_environment({**environment, 'sqlite': '3.0.0'}))
+
+    def test_save_baseline(self) -> None:
+        with TemporaryDirectory() as tmp_dir:
+            file_path = path.join(tmp_dir, 'baseline.json')
+            save_baseline(self.results[:1], file_path)
+            save_baseline(self.results[1:], file_path)
+
+            with self.subTest('Entries of other benchmarks are kept'):
+                baseline = load_baseline(file_path)
+                self.assertEqual(get_environment(), baseline['environment'])
+                self.assertEqual(['insert/1000', 'point_read/1000'], list(baseline['results']))
+
+            with self.subTest('Entries of another environment are dropped'):
+                with patch('tests.benchmarks.db_benchmark.get_environment', return_value={'machine': 'arm64'}):
+                    save_baseline(self.results[1:], file_path)
+                with open(file_path) as file:
+                    self.assertEqual(['point_read/1000'], list(json.load(file)['results']))
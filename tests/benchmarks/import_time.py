@@ -0,0 +1,127 @@
+"""Import time of the modules and start time of the light CLI commands, each measured in a fresh interpreter.
+
+Usage:
+    python -m tests.benchmarks.import_time --runs 5
+    python -m tests.benchmarks.import_time --details trade_bot.item_history
+"""
+import json
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from statistics import median
+from time import perf_counter
+
+MODULES = (
+    'settings', 'lib.metrics', 'lib.database_manipulator', 'trade_bot.item_registry', 'main',
+    'lib.http_session', 'trade_bot.item_history', 'trade_bot.analytics', 'trade_bot.authorization',
+    'trade_bot.trade_bot',
+)
+LIGHT_MODULES = ('lib.database_manipulator', 'trade_bot.item_registry', 'main')  # used by the light commands
+HEAVY_MODULES = ('pandas', 'numpy', 'requests', 'selenium')
+COMMANDS = (('main.py', '--help'), ('main.py', '--db', ':memory:', 'stats', '--json'))
+# bytecode is cached as in a normal installation, otherwise the compilation of the sources is measured too
+ENV = {k: v for k, v in os.environ.items() if k != 'PYTHONDONTWRITEBYTECODE'}
+
+
+def run(args: list[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True, env=ENV)
+
+
+@dataclass
+class ImportTime:
+    module: str
+    cumulative_ms: float  # the module with everything it imports
+    self_ms: float
+    heavy: list[str]  # heavy dependencies loaded by the import
+
+    def __str__(self) -> str:
+        heavy = f'  loads {", ".join(self.heavy)}' if self.heavy else ''
+        return f'{self.module:<28} {self.cumulative_ms:>9.1f} ms  (self {self.self_ms:.1f} ms){heavy}'
+
+
+def parse_import_time(stderr: str) -> list[tuple[str, float, float]]:
+    """Parse the `-X importtime` output.
+
+    Returns:
+        Module, self and cumulative time in ms of every import, in import order.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line.removeprefix('import time:').split('|')
+        imports.append((module.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return imports
+
+
+def measure_import(module: str, runs: int = 5) -> ImportTime:
+    """Median import time of the module in fresh interpreters.
+
+    Args:
+        module: module name.
+        runs: number of interpreters started.
+
+    Returns:
+        Import time of the module.
+    """
+    code = (f'import sys, json; import {module}; '
+            f'print(json.dumps([i for i in {HEAVY_MODULES!r} if i in sys.modules]))')
+    self_times, cumulative_times, heavy = [], [], []
+    run(['-c', code])  # warm-up, writes the bytecode cache
+    for _ in range(runs):
+        result = run(['-X', 'importtime', '-c', code])
+        times = {name: (self_ms, cumulative_ms) for name, self_ms, cumulative_ms in parse_import_time(result.stderr)}
+        self_times.append(times[module][0])
+        cumulative_times.append(times[module][1])
+        heavy = json.loads(result.stdout)
+    return ImportTime(module, median(cumulative_times), median(self_times), heavy)
+
+
+def measure_command(args: tuple[str, ...], runs: int = 5) -> float:
+    """Median wall time of the command in ms, including the interpreter start."""
+    times = []
+    run(list(args))
+    for _ in range(runs):
+        start = perf_counter()
+        run(list(args))
+        times.append((perf_counter() - start) * 1000)
+    return median(times)
+
+
+def get_details(module: str, top: int = 15) -> list[tuple[str, float, float]]:
+    """Imports with the largest self time caused by importing the module."""
+    run(['-c', f'import {module}'])
+    result = run(['-X', 'importtime', '-c', f'import {module}'])
+    return sorted(parse_import_time(result.stderr), key=lambda i: -i[1])[:top]
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Import time of the modules and start time of the light CLI commands.')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per measurement')
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--details', help='show the slowest imports caused by the module')
+    parser.add_argument('--max-ms', type=float, default=100, help='import time budget of the light modules')
+    args = parser.parse_args()
+
+    if args.details:
+        for name, self_ms, cumulative_ms in get_details(args.details):
+            print(f'{name:<50} {self_ms:>9.1f} ms  (cumulative {cumulative_ms:.1f} ms)')
+        sys.exit(0)
+
+    failures = []
+    baseline = measure_command(('-c', 'pass'), args.runs)
+    print(f'{"interpreter start":<28} {baseline:>9.1f} ms')
+    for command in COMMANDS:
+        print(f'{" ".join(command):<28} {measure_command(command, args.runs):>9.1f} ms')
+
+    for name in args.modules:
+        import_time = measure_import(name, args.runs)
+        print(import_time)
+        if name in LIGHT_MODULES and (import_time.heavy or import_time.cumulative_ms > args.max_ms):
+            failures.append(str(import_time))
+
+    if failures:
+        print('Light modules over the budget or loading heavy dependencies:', *failures, sep='\n')
+        sys.exit(1)
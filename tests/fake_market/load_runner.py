@@ -0,0 +1,148 @@
+"""Load test of the history pipeline against the local fake Steam market.
+
+Usage:
+    python -m tests.fake_market.load_runner --items 2000 --workers 16 --latency 0.05 --rate-limit-every 50
+"""
+import resource
+from argparse import ArgumentParser
+from dataclasses import dataclass, field
+from os import path
+from tempfile import TemporaryDirectory
+from threading import Lock
+from time import perf_counter
+from typing import Optional
+from unittest.mock import patch, PropertyMock
+
+from lib.database_manipulator import DataBaseManipulator, DatabaseManager
+from lib.http_session import get_session
+from tests.fake_market.server import FakeMarketServer
+from trade_bot.history_fetcher import HistoryBatchFetcher
+from trade_bot.item_history import ItemHistory
+from trade_bot.listing_extractor import ListingData
+from trade_bot.util import CategoryTrade
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile, q in [0, 100]."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def get_peak_rss_mb() -> float:
+    """Peak resident set size of the process in MiB (ru_maxrss is in KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@dataclass
+class LoadReport:
+    items: int
+    failed: int
+    seconds: float
+    fetch_latency: list[float] = field(repr=False)
+    store_latency: list[float] = field(repr=False)
+    requests: int = 0
+    rate_limited: int = 0
+    peak_rss_mb: float = 0.0
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        ms = 1000
+        return '\n'.join((
+            f'items:            {self.items} ({self.failed} failed)',
+            f'elapsed:          {self.seconds:.2f} s',
+            f'throughput:       {self.items_per_second:.1f} items/s',
+            f'fetch latency:    p50 {percentile(self.fetch_latency, 50) * ms:.1f} ms, '
+            f'p99 {percentile(self.fetch_latency, 99) * ms:.1f} ms',
+            f'store latency:    p50 {percentile(self.store_latency, 50) * ms:.1f} ms, '
+            f'p99 {percentile(self.store_latency, 99) * ms:.1f} ms',
+            f'requests:         {self.requests} ({self.rate_limited} answered with 429)',
+            f'peak RSS:         {self.peak_rss_mb:.1f} MiB',
+        ))
+
+
+@dataclass
+class TimedHistoryBatchFetcher(HistoryBatchFetcher):
+    """HistoryBatchFetcher that records the duration of every download and every parse/store."""
+    fetch_latency: list[float] = field(default_factory=list)
+    store_latency: list[float] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        self._lock = Lock()
+
+    def fetch_listing_data(self, history: ItemHistory) -> ListingData:
+        start = perf_counter()
+        listing = super().fetch_listing_data(history)
+        with self._lock:
+            self.fetch_latency.append(perf_counter() - start)
+        return listing
+
+    def get_item_history(self, category: CategoryTrade, item_name: str) -> ItemHistory:
+        history = super().get_item_history(category, item_name)
+        exec_history = history.exec
+
+        def timed_exec(listing: Optional[ListingData] = None):
+            start = perf_counter()
+            exec_history(listing)
+            self.store_latency.append(perf_counter() - start)
+
+        history.exec = timed_exec
+        return history
+
+
+def run_load_test(items: int = 200, workers: int = 8, latency: float = 0.0, rate_limit_every: int = 0,
+                  db_path: Optional[str] = None) -> LoadReport:
+    """Refresh the history of `items` generated items against a fake market and measure the pipeline.
+
+    Args:
+        items: number of items.
+        workers: number of concurrent downloads.
+        latency: latency of the fake market in seconds.
+        rate_limit_every: every N-th request is answered with 429.
+        db_path: database file, a temporary one is used if not passed.
+
+    Returns:
+        Load test report.
+    """
+    with TemporaryDirectory() as tmp_dir, \
+            FakeMarketServer(item_count=items, latency=latency, rate_limit_every=rate_limit_every) as server:
+        db_manager = DatabaseManager(db_path or path.join(tmp_dir, 'LoadTest.db'), persistent=True)
+        with patch.object(DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=db_manager)):
+            fetcher = TimedHistoryBatchFetcher(
+                [(CategoryTrade.CS, i) for i in server.item_names],
+                max_workers=workers,
+                session=get_session(pool_size=workers, retries=10, backoff_factor=0),
+                market_url=server.url,
+            )
+            start = perf_counter()
+            failed = fetcher.exec()
+            seconds = perf_counter() - start
+        db_manager.disconnect()
+
+        return LoadReport(
+            items=items,
+            failed=len(failed),
+            seconds=seconds,
+            fetch_latency=fetcher.fetch_latency,
+            store_latency=fetcher.store_latency,
+            requests=server.request_count,
+            rate_limited=server.rate_limited_count,
+            peak_rss_mb=get_peak_rss_mb(),
+        )
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Load test of the history pipeline against a local fake Steam market.')
+    parser.add_argument('--items', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help='response latency in seconds')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='answer every N-th request with 429')
+    parser.add_argument('--db', default=None, help='database file, temporary by default')
+    args = parser.parse_args()
+
+    print(run_load_test(args.items, args.workers, args.latency, args.rate_limit_every, args.db))
@@ -0,0 +1,199 @@
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Optional
+from urllib.parse import urlparse, unquote, parse_qs
+
+PAGE_HEADER = '<!DOCTYPE html>\n<html class=" responsive" lang="en">\n<head>\n<title>Steam Community Market :: ' \
+              'Listings for {name}</title>\n</head>\n<body>\n'
+PAGE_FOOTER = '</body>\n</html>\n'
+PADDING_LINE = '<div class="market_listing_row market_recent_listing_row">{}</div>\n'
+
+
+@dataclass
+class FakeMarketServer:
+    """Local stand-in for the Steam community market.
+
+    Serves synthetic `/market/listings/<app>/<name>` pages with `var line1=` price history and
+    `Market_LoadOrderSpread`, and `/market/itemordershistogram?item_nameid=` order books for `item_count`
+    generated items named `Fake Item 00000`, `Fake Item 00001`, ...
+
+    Example:
+        with FakeMarketServer(item_count=2000, latency=0.05, rate_limit_every=10) as server:
+            ItemHistory(CategoryTrade.CS, server.item_names[0], market_url=server.url).exec()
+    """
+    item_count: int = 1000
+    latency: float = 0.0  # seconds added to every response
+    rate_limit_every: int = 0  # every N-th request is answered with 429, 0 - never
+    retry_after: int = 0  # value of the Retry-After header of 429 responses
+    history_days: int = 365
+    page_padding: int = 1000  # number of filler lines around the data, the real page is about 300 KB
+    host: str = '127.0.0.1'
+    port: int = 0
+    first_item_name_id: int = 100000
+    request_count: int = field(default=0, init=False)
+    rate_limited_count: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        self._lock = Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[Thread] = None
+        self._now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    def __enter__(self) -> 'FakeMarketServer':
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def item_names(self) -> list[str]:
+        return [self.get_item_name(i) for i in range(self.item_count)]
+
+    @staticmethod
+    def get_item_name(index: int) -> str:
+        return f'Fake Item {index:05d}'
+
+    def get_item_index(self, name: str) -> Optional[int]:
+        if not name.startswith('Fake Item '):
+            return None
+        try:
+            index = int(name.removeprefix('Fake Item '))
+        except ValueError:
+            return None
+        return index if 0 <= index < self.item_count else None
+
+    def get_item_name_id(self, name: str) -> Optional[int]:
+        if (index := self.get_item_index(name)) is not None:
+            return self.first_item_name_id + index
+
+    def get_price_history(self, index: int) -> list[list]:
+        """Price history in the format of the listing page: daily points, then hourly points for 31 days."""
+        rand = random.Random(index)
+        price = rand.uniform(0.05, 500)
+        history = []
+        start = self._now - timedelta(days=self.history_days)
+        hourly_start = self._now - timedelta(days=31)
+        date = start.replace(hour=1)
+        while date <= self._now:
+            price = max(0.03, price * rand.uniform(0.97, 1.03))
+            history.append([f'{date:%b %d %Y %H}: +0', round(price, 3), str(rand.randint(1, 500))])
+            date += timedelta(hours=1) if date >= hourly_start else timedelta(days=1)
+        return history
+
+    def get_listing_page(self, name: str) -> str:
+        lines = [PAGE_HEADER.format(name=name)]
+        lines += [PADDING_LINE.format(i) for i in range(self.page_padding)]
+        if (index := self.get_item_index(name)) is not None:
+            lines.append('<script type="text/javascript">\n')
+            lines.append(f'\t\tvar line1={json.dumps(self.get_price_history(index), separators=(",", ":"))};\n')
+            lines.append(f'\t\tMarket_LoadOrderSpread( {self.first_item_name_id + index} );\n')
+            lines.append('</script>\n')
+        lines += [PADDING_LINE.format(i) for i in range(self.page_padding // 20)]
+        lines.append(PAGE_FOOTER)
+        return ''.join(lines)
+
+    def get_order_histogram(self, item_name_id: int) -> dict:
+        """Order book in the format of `/market/itemordershistogram`, slightly different on every call."""
+        rand = random.Random()
+        base = random.Random(item_name_id).randint(5, 50000)
+        sell_prices = [base + i * rand.randint(1, 3) for i in range(rand.randint(5, 20))]
+        buy_prices = [base - 1 - i * rand.randint(1, 3) for i in range(rand.randint(5, 20))]
+        buy_prices = [i for i in buy_prices if i > 0]
+
+        def graph(prices: list[int], side: str) -> list[list]:
+            quantity, result = 0, []
+            for price in prices:
+                quantity += rand.randint(1, 40)
+                result.append([price / 100, quantity, f'{quantity} {side} orders at ${price / 100:.2f}'])
+            return result
+
+        buy_order_graph, sell_order_graph = graph(buy_prices, 'buy'), graph(sell_prices, 'sell')
+        return {
+            'success': 1,
+            'highest_buy_order': str(buy_prices[0]) if buy_prices else None,
+            'lowest_sell_order': str(sell_prices[0]),
+            'buy_order_graph': buy_order_graph,
+            'sell_order_graph': sell_order_graph,
+            'graph_max_y': max(i[1] for i in buy_order_graph + sell_order_graph),
+            'graph_min_x': min(i[0] for i in buy_order_graph + sell_order_graph),
+            'graph_max_x': max(i[0] for i in buy_order_graph + sell_order_graph),
+            'price_prefix': '$',
+            'price_suffix': '',
+        }
+
+    def is_rate_limited(self) -> bool:
+        with self._lock:
+            self.request_count += 1
+            limited = bool(self.rate_limit_every) and self.request_count % self.rate_limit_every == 0
+            self.rate_limited_count += limited
+        return limited
+
+    def start(self) -> str:
+        """Start serving in a background thread.
+
+        Returns:
+            Base url of the server, to be used instead of `STEAM_MAIN`.
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def send_body(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if server.is_rate_limited():
+                    return self.send_body(429, b'[]', 'application/json', {'Retry-After': str(server.retry_after)})
+
+                url = urlparse(self.path)
+                parts = url.path.strip('/').split('/')
+                if len(parts) == 4 and parts[:2] == ['market', 'listings']:
+                    page = server.get_listing_page(unquote(parts[3]))
+                    return self.send_body(200, page.encode(), 'text/html; charset=UTF-8')
+
+                if parts == ['market', 'itemordershistogram']:
+                    item_name_id = parse_qs(url.query).get('item_nameid', [''])[0]
+                    index = int(item_name_id) - server.first_item_name_id if item_name_id.isdigit() else -1
+                    if 0 <= index < server.item_count:
+                        body = json.dumps(server.get_order_histogram(int(item_name_id))).encode()
+                    else:
+                        body = b'{"success":16}'
+                    return self.send_body(200, body, 'application/json; charset=utf-8')
+
+                self.send_body(404, b'Not Found', 'text/plain')
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
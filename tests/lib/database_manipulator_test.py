@@ -4,7 +4,7 @@ from os import path, remove
 
 from lib.database_manipulator import (
     DataBaseManipulator, DatabaseManager, TableNameException, DataCreateTableException, DataTableException,
-    SearchConditionException,
+    SearchConditionException, UniqueKeysException, ColumnsException, TransactionException,
 )
 
 from settings import DB_PATH_TEST
@@ -57,10 +57,19 @@ class TestDataBaseManipulator(TestCase):
             self.instance.create_table(table_name, data)
             self.assertTrue(self.instance.check_table_exist(table_name))
 
+        with self.subTest('Create table with primary key'):
+            self.instance.delete_table(table_name)
+            self.instance.create_table(table_name, data, primary_key=('firstname', 'lastname'), without_rowid=True)
+            self.assertEqual(['firstname', 'lastname', 'age'], self.instance.get_table_columns(table_name))
+
         with self.subTest('Wrong table_name arg'):
             with self.assertRaises(TableNameException):
                 self.instance.create_table(1.01, data)
 
+        with self.subTest('Wrong primary_key arg'):
+            with self.assertRaises(UniqueKeysException):
+                self.instance.create_table(table_name, data, without_rowid=True)
+
         with self.subTest('Wrong field arg'):
             with self.assertRaises(DataCreateTableException):
                 self.instance.create_table(table_name, '')
@@ -141,6 +150,109 @@ class TestDataBaseManipulator(TestCase):
             with self.assertRaises(TableNameException):
                 self.instance.get_table_data(1.01)
 
+    def test_get_table_data_query_options(self) -> None:
+        table_name = 'test_table'
+        data_create_table = {'firstname': 'TEXT', 'lastname': 'TEXT', 'age': 'INTEGER'}
+        rows = [(1, 'Bob', 'Orange', 102), (2, 'Alex', 'Green', 18), (3, 'Kate', None, 35), (4, 'Ann', 'Blue', 64)]
+
+        self.instance.create_table(table_name, data_create_table)
+        self.instance.bulk_upsert(table_name, [dict(zip(['id', *data_create_table], i)) for i in rows], ['id'])
+
+        with self.subTest('Columns and order'):
+            self.assertEqual([('Alex', 18), ('Kate', 35), ('Ann', 64), ('Bob', 102)],
+                             self.instance.get_table_data(table_name, columns=['firstname', 'age'], order_by='age'))
+
+        with self.subTest('Range predicates'):
+            self.assertEqual([('Kate',), ('Ann',)], self.instance.get_table_data(
+                table_name, {'age': ('BETWEEN', (30, 70))}, columns=['firstname'], order_by=['age ASC']))
+            self.assertEqual([('Bob',)], self.instance.get_table_data(
+                table_name, {'age': ('>', 64)}, columns=['firstname']))
+            self.assertEqual([('Alex',), ('Bob',)], self.instance.get_table_data(
+                table_name, {'firstname': ['Bob', 'Alex']}, columns=['firstname'], order_by='age'))
+            self.assertEqual([('Kate',)], self.instance.get_table_data(
+                table_name, {'lastname': None}, columns=['firstname']))
+            self.assertEqual([('Ann',), ('Alex',)], self.instance.get_table_data(
+                table_name, {'firstname': ('LIKE', 'A%')}, columns=['firstname'], order_by='age DESC'))
+
+        with self.subTest('Pagination'):
+            self.assertEqual([('Ann',), ('Bob',)], self.instance.get_table_data(
+                table_name, limit=2, offset=2, columns=['firstname'], order_by='age'))
+
+        with self.subTest('Predicates in update and delete'):
+            self.instance.update_table_data(table_name, {'lastname': "O'Neil"}, {'age': ('<', 30)})
+            self.assertEqual([("O'Neil",)], self.instance.get_table_data(
+                table_name, {'firstname': 'Alex'}, columns=['lastname']))
+            self.instance.delete_table_data(table_name, {'age': ('>=', 64)})
+            self.assertEqual(2, len(self.instance.get_table_data(table_name)))
+
+        with self.subTest('Wrong args'):
+            with self.assertRaises(SearchConditionException):
+                self.instance.get_table_data(table_name, {'age': ('BETWEEN', 30)})
+            with self.assertRaises(ColumnsException):
+                self.instance.get_table_data(table_name, columns=['age; DROP TABLE test_table'])
+            with self.assertRaises(ColumnsException):
+                self.instance.get_table_data(table_name, order_by='age DESC, 1')
+
+    def test_iter_table_data(self) -> None:
+        table_name = 'test_table'
+        self.instance.create_table(table_name, {'value': 'INTEGER'})
+        self.instance.bulk_upsert(table_name, [{'id': i, 'value': i * 10} for i in range(1, 101)], ['id'])
+
+        with self.subTest('Read all rows in batches'):
+            rows = self.instance.iter_table_data(table_name, columns=['value'], order_by='id', arraysize=7)
+            self.assertEqual([(i * 10,) for i in range(1, 101)], list(rows))
+
+        with self.subTest('Other queries while reading'):
+            rows = self.instance.iter_table_data(table_name, {'value': ('>', 950)}, order_by='id DESC', arraysize=2)
+            self.assertEqual((100, 1000), next(rows))
+            self.assertEqual(100, len(self.instance.get_table_data(table_name, limit=-1)))
+            self.assertEqual([(99, 990), (98, 980), (97, 970), (96, 960)], list(rows))
+
+        with self.subTest('Wrong args'):
+            with self.assertRaises(DataTableException):
+                self.instance.iter_table_data(table_name, arraysize=0)
+            with self.assertRaises(TableNameException):
+                self.instance.iter_table_data(None)
+
+    def test_table_to_dataframe(self) -> None:
+        table_name = 'test_table'
+        self.instance.create_table(table_name, {'name': 'TEXT', 'value': 'INTEGER'})
+        self.instance.bulk_upsert(table_name, [{'id': i, 'name': f'n{i}', 'value': i} for i in range(1, 11)], ['id'])
+
+        with self.subTest('Whole table'):
+            df = self.instance.table_to_dataframe(table_name)
+            self.assertEqual(['id', 'name', 'value'], list(df.columns))
+            self.assertEqual(10, len(df))
+
+        with self.subTest('Chunks'):
+            chunks = list(self.instance.table_to_dataframe(table_name, {'value': ('<=', 8)}, ['value'],
+                                                           order_by='value', chunksize=3))
+            self.assertEqual([3, 3, 2], [len(i) for i in chunks])
+            self.assertEqual(list(range(1, 9)), [v for i in chunks for v in i['value']])
+
+        with self.subTest('Wrong chunksize arg'):
+            with self.assertRaises(DataTableException):
+                self.instance.table_to_dataframe(table_name, chunksize=-1)
+
+    def test_create_index(self) -> None:
+        table_name = 'test_table'
+        self.instance.create_table(table_name, {'category': 'TEXT', 'name': 'TEXT'})
+
+        with self.subTest('Create index'):
+            self.instance.create_index(table_name, ['category', 'name'])
+            self.instance.create_index(table_name, ['category', 'name'])
+            indexes = self.instance.db_manager.execute(f'PRAGMA index_list({table_name})')
+            self.assertEqual(['idx_test_table_category_name'], [i[1] for i in indexes])
+
+        with self.subTest('Query plan uses index'):
+            plan = self.instance.db_manager.execute(
+                f'EXPLAIN QUERY PLAN SELECT * FROM {table_name} WHERE category = ? AND name = ?', ('a', 'b'))
+            self.assertIn('idx_test_table_category_name', plan[0][-1])
+
+        with self.subTest('Wrong columns arg'):
+            with self.assertRaises(ColumnsException):
+                self.instance.create_index(table_name, [])
+
     def test_update_table_data(self) -> None:
         table_name = 'test_table'
         data_create_table = {'firstname': 'TEXT', 'lastname': 'TEXT', 'age': 'INTEGER'}
@@ -221,3 +333,166 @@ class TestDataBaseManipulator(TestCase):
         with self.subTest('Wrong search_condition arg'):
             with self.assertRaises(SearchConditionException):
                 self.instance.create_or_update_table_data(table_name, update_data, None)
+
+    def test_bulk_upsert(self) -> None:
+        table_name = 'test_table'
+        data_create_table = {'firstname': 'TEXT', 'lastname': 'TEXT', 'age': 'INTEGER'}
+        rows = [{'firstname': 'Bob', 'lastname': 'Orange', 'age': 104},
+                {'firstname': 'Alex', 'lastname': 'Green', 'age': 20}]
+
+        self.instance.create_table(table_name, data_create_table, unique_keys=('firstname', 'lastname'))
+
+        with self.subTest('Create data'):
+            self.instance.bulk_upsert(table_name, rows, ('firstname', 'lastname'))
+            self.assertEqual([(1, 'Bob', 'Orange', 104), (2, 'Alex', 'Green', 20)],
+                             self.instance.get_table_data(table_name))
+
+        with self.subTest('Update data'):
+            self.instance.bulk_upsert(table_name, [{'firstname': 'Bob', 'lastname': 'Orange', 'age': 105},
+                                                   {'firstname': 'Tom', 'lastname': 'Blue', 'age': 30}],
+                                      ('firstname', 'lastname'), batch_size=1)
+            self.assertEqual([(1, 'Bob', 'Orange', 105), (2, 'Alex', 'Green', 20), (3, 'Tom', 'Blue', 30)],
+                             self.instance.get_table_data(table_name))
+
+        with self.subTest('Update only selected columns'):
+            self.instance.bulk_upsert(table_name, [{'firstname': 'Tom', 'lastname': 'Blue', 'age': 31}],
+                                      ('firstname', 'lastname'), update_columns=())
+            self.assertEqual([(3, 'Tom', 'Blue', 30)], self.instance.get_table_data(table_name, {'age': 30}))
+
+        with self.subTest('Wrong table_name arg'):
+            with self.assertRaises(TableNameException):
+                self.instance.bulk_upsert(None, rows, ('firstname', 'lastname'))
+
+        with self.subTest('Wrong rows arg'):
+            with self.assertRaises(DataTableException):
+                self.instance.bulk_upsert(table_name, [rows[0], {'age': 1}], ('firstname', 'lastname'))
+
+        with self.subTest('Wrong conflict_columns arg'):
+            with self.assertRaises(UniqueKeysException):
+                self.instance.bulk_upsert(table_name, rows, ('nickname',))
+
+        with self.subTest('Wrong unique_keys arg'):
+            with self.assertRaises(UniqueKeysException):
+                self.instance.create_table('test_', data_create_table, unique_keys=('nickname',))
+
+    def test_transaction(self) -> None:
+        table_name = 'test_table'
+        data_create_table = {'firstname': 'TEXT', 'lastname': 'TEXT', 'age': 'INTEGER'}
+
+        self.instance.create_table(table_name, data_create_table)
+
+        with self.subTest('Commit on exit'):
+            with self.instance.transaction():
+                self.instance.create_table_data(table_name, {'firstname': 'Bob', 'lastname': 'Orange', 'age': 101})
+                self.instance.create_table_data(table_name, {'firstname': 'Alex', 'lastname': 'Green', 'age': 102})
+                self.assertIsNotNone(self.instance.db_manager.conn)
+            self.assertIsNone(self.instance.db_manager.conn)
+            self.assertEqual(2, len(self.instance.get_table_data(table_name)))
+            self.instance.delete_table_data(table_name)
+
+        with self.subTest('Rollback on error'):
+            with self.assertRaises(ValueError):
+                with self.instance.transaction():
+                    self.instance.create_table_data(table_name, {'firstname': 'Bob', 'lastname': 'Orange', 'age': 1})
+                    raise ValueError
+            self.assertFalse(self.instance.get_table_data(table_name))
+
+        with self.subTest('DataFrame inside a transaction'):
+            with self.assertRaises(TransactionException):
+                with self.instance.transaction():
+                    self.instance.create_table_data(table_name, {'firstname': 'Bob', 'lastname': 'Orange', 'age': 1})
+                    self.instance.dataframe_to_table(None, table_name, {'if_exists': 'append', 'index': False})
+            self.assertFalse(self.instance.get_table_data(table_name))
+
+
+class TestDatabaseManagerPersistent(TestCase):
+
+    def setUp(self) -> None:
+        self.instance = DatabaseManager(DB_PATH_TEST, persistent=True, pragmas={'journal_mode': 'WAL'})
+
+    def tearDown(self) -> None:
+        self.instance.delete_table('test_table')
+        self.instance.disconnect()
+        for suffix in ('', '-wal', '-shm'):
+            if path.exists(DB_PATH_TEST + suffix):
+                remove(DB_PATH_TEST + suffix)
+
+    def test_persistent_connection(self) -> None:
+        self.instance.create_table('test_table', {'firstname': 'TEXT'})
+        conn = self.instance.conn
+
+        with self.subTest('Connection is reused'):
+            self.instance.insert_record_at_table_data('test_table', {'firstname': 'Bob'})
+            self.assertIs(conn, self.instance.conn)
+
+        with self.subTest('Pragmas are applied'):
+            self.assertEqual(('wal',), conn.execute('PRAGMA journal_mode').fetchone())
+
+        with self.subTest('Disconnect'):
+            self.instance.disconnect()
+            self.assertIsNone(self.instance.conn)
+            self.assertEqual([(1, 'Bob')], self.instance.get_record_from_table('test_table'))
+
+
+class TestSchemaRegistry(TestCase):
+
+    def setUp(self) -> None:
+        self.instance = DatabaseManager(DB_PATH_TEST)
+
+    def tearDown(self) -> None:
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def test_schema_is_cached(self) -> None:
+        self.instance.create_table('test_table', {'firstname': 'TEXT'})
+        self.instance.create_index('test_table', ['firstname'])
+
+        with patch.object(self.instance, 'connect', wraps=self.instance.connect) as mock_connect:
+            with self.subTest('Known tables, columns and indexes are answered from memory'):
+                self.instance.create_table('test_table', {'firstname': 'TEXT'})
+                self.instance.create_index('test_table', ['firstname'])
+                self.assertTrue(self.instance.check_table_exist('test_table'))
+                self.assertFalse(self.instance.check_table_exist('other_table'))
+                self.assertEqual(['id', 'firstname'], self.instance.get_table_columns('test_table'))
+                mock_connect.assert_not_called()
+
+            with self.subTest('Statement text is reused'):
+                self.instance.insert_record_at_table_data('test_table', {'firstname': 'Bob'})
+                statements = dict(self.instance.schema.statements)
+                self.instance.insert_record_at_table_data('test_table', {'firstname': 'Alex'})
+                self.assertEqual(statements, self.instance.schema.statements)
+                self.assertIn(('insert', 'test_table', 'firstname'), statements)
+
+        with self.subTest('Drop'):
+            self.instance.delete_table('test_table')
+            self.assertFalse(self.instance.check_table_exist('test_table'))
+            self.assertEqual({}, self.instance.schema.indexes)
+            self.assertEqual({}, self.instance.schema.statements)
+
+        with self.subTest('Raw DDL refreshes the registry'):
+            self.instance.create_table('test_table', {'firstname': 'TEXT'})
+            self.instance.execute('ALTER TABLE test_table ADD COLUMN age INTEGER')
+            self.assertEqual(['id', 'firstname', 'age'], self.instance.get_table_columns('test_table'))
+
+        with self.subTest('Rolled back DDL'):
+            with self.assertRaises(ValueError):
+                with self.instance.transaction():
+                    self.instance.create_table('other_table', {'firstname': 'TEXT'})
+                    raise ValueError
+            self.assertFalse(self.instance.check_table_exist('other_table'))
+
+    @patch.object(DataBaseManipulator, 'db_manager', new_callable=PropertyMock)
+    def test_create_tables(self, mock_db_manager: PropertyMock) -> None:
+        mock_db_manager.return_value = self.instance
+        instance = DataBaseManipulator()
+        instance.create_tables({
+            'test_table': {'field': {'firstname': 'TEXT'}},
+            'other_table': {'field': {'item_id': 'INTEGER', 'ts': 'INTEGER'}, 'primary_key': ('item_id', 'ts'),
+                            'without_rowid': True},
+        })
+
+        self.assertTrue(instance.check_table_exist('test_table'))
+        self.assertEqual(['item_id', 'ts'], instance.get_table_columns('other_table'))
+
+        with self.assertRaises(DataCreateTableException):
+            instance.create_tables([('test_table', {'firstname': 'TEXT'})])
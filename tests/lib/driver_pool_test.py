@@ -0,0 +1,111 @@
+from itertools import count
+from threading import Barrier
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from selenium.common import WebDriverException
+
+from lib.driver_pool import DriverPool, DriverPoolException
+
+
+class FakeDriver:
+
+    def __init__(self, number: int) -> None:
+        self.number = number
+        self.memory = 0
+        self.alive = True
+        self.quit = MagicMock(side_effect=self.stop)
+
+    def stop(self) -> None:
+        self.alive = False
+
+    def execute_script(self, script: str):
+        if not self.alive:
+            raise WebDriverException('Browser is closed')
+        return self.memory if 'memory' in script else 1
+
+
+class TestDriverPool(TestCase):
+
+    def setUp(self) -> None:
+        numbers = count()
+        self.drivers: list[FakeDriver] = []
+
+        def factory() -> FakeDriver:
+            driver = FakeDriver(next(numbers))
+            self.drivers.append(driver)
+            return driver
+
+        self.factory = factory
+
+    def test_start(self) -> None:
+        with DriverPool(size=3, factory=self.factory) as pool:
+            self.assertEqual(3, len(self.drivers))
+            self.assertEqual(3, pool.idle)
+
+        with self.subTest('Drivers are quit on close'):
+            self.assertTrue(all(i.quit.called for i in self.drivers))
+
+    def test_lease(self) -> None:
+        with DriverPool(size=1, factory=self.factory) as pool:
+            with self.subTest('Warm driver is reused'):
+                with pool.lease() as driver:
+                    first = driver
+                with pool.lease() as driver:
+                    self.assertIs(first, driver)
+                self.assertEqual(1, len(self.drivers))
+
+            with self.subTest('Dead driver is replaced on lease'):
+                first.alive = False
+                with pool.lease() as driver:
+                    self.assertIsNot(first, driver)
+                self.assertEqual(1, len(pool))
+
+            with self.subTest('No driver available'):
+                pool.lease_timeout = 0.1
+                with pool.lease():
+                    with self.assertRaises(DriverPoolException):
+                        with pool.lease():
+                            pass
+
+    def test_recycle(self) -> None:
+        with DriverPool(size=1, max_uses=2, max_memory=100, factory=self.factory) as pool:
+            with self.subTest('After max uses'):
+                for _ in range(2):
+                    with pool.lease() as driver:
+                        first = driver
+                with pool.lease() as driver:
+                    self.assertIsNot(first, driver)
+                    self.assertTrue(first.quit.called)
+
+            with self.subTest('After max memory'):
+                with pool.lease() as driver:
+                    driver.memory = 101
+                    first = driver
+                with pool.lease() as driver:
+                    self.assertIsNot(first, driver)
+
+            with self.subTest('After browser error'):
+                with self.assertRaises(WebDriverException):
+                    with pool.lease() as driver:
+                        first = driver
+                        raise WebDriverException('Tab crashed')
+                with pool.lease() as driver:
+                    self.assertIsNot(first, driver)
+                self.assertEqual(1, len(pool))
+
+    def test_parallel_leases(self) -> None:
+        barrier = Barrier(3)
+
+        def task(pool: DriverPool) -> int:
+            with pool.lease() as driver:
+                barrier.wait(timeout=5)  # all drivers are leased at the same time
+                return driver.number
+
+        with DriverPool(size=3, factory=self.factory) as pool:
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                numbers = list(executor.map(task, [pool] * 3))
+
+        self.assertEqual([0, 1, 2], sorted(numbers))
+        self.assertEqual(3, len(self.drivers))
@@ -0,0 +1,121 @@
+from io import BytesIO
+from os import path
+from tempfile import TemporaryDirectory
+from time import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from requests import Response
+
+from lib.http_cache import ResponseCache, CacheEntry
+from lib.http_session import get_session
+
+LISTING_URL = 'https://steamcommunity.com/market/listings/730/AK-47'
+
+
+class TestResponseCache(TestCase):
+
+    def setUp(self) -> None:
+        self.tmp_dir = TemporaryDirectory()
+        self.db_name = path.join(self.tmp_dir.name, 'HttpCache.db')
+        self.instance = ResponseCache(self.db_name, ttls={r'/market/listings/\d+/': 3600})
+        self.session = get_session(cache=self.instance)
+        self.body, self.etag, self.headers = b'<html>listing</html>', '"v1"', {}
+        self.requests = []
+        self.patcher = patch('requests.adapters.HTTPAdapter.send', side_effect=self.send)
+        self.patcher.start()
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        self.instance.db_manager.disconnect()
+        self.tmp_dir.cleanup()
+
+    def send(self, request, **kwargs) -> Response:
+        self.requests.append(dict(request.headers))
+        response = Response()
+        response.url, response.request, response.raw = request.url, request, BytesIO()
+        if request.headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            response._content, response.raw = self.body, BytesIO(self.body)
+        response.headers.update({'ETag': self.etag, 'Content-Type': 'text/html; charset=utf-8', **self.headers})
+        return response
+
+    def test_fresh_entry(self) -> None:
+        first = self.session.get(LISTING_URL)
+        with self.session.get(LISTING_URL, stream=True) as second:
+            chunks = list(second.iter_content(chunk_size=8))
+
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(first.content, b''.join(chunks))
+        self.assertTrue(second.from_cache)
+        self.assertEqual({'miss': 1, 'store': 1, 'hit': 1}, self.instance.stats)
+
+        with self.subTest('Cache is kept on disk'):
+            instance = ResponseCache(self.db_name, ttls=self.instance.ttls)
+            self.assertEqual(len(self.body), instance.size)
+            self.assertTrue(instance.get(LISTING_URL).is_fresh)
+            instance.db_manager.disconnect()
+
+        with self.subTest('Freshness check does not read the entry'):
+            with patch.object(ResponseCache, 'get') as mock_get:
+                self.assertTrue(self.instance.is_fresh(LISTING_URL))
+                self.assertFalse(self.instance.is_fresh(LISTING_URL + '-1'))
+            mock_get.assert_not_called()
+
+        with self.subTest('Other endpoints are not cached'):
+            self.session.get('https://steamcommunity.com/market/itemordershistogram?item_nameid=1')
+            self.session.get('https://steamcommunity.com/market/itemordershistogram?item_nameid=1')
+            self.assertEqual(3, len(self.requests))
+
+    def test_revalidation(self) -> None:
+        self.instance.ttls = {r'/market/listings/\d+/': 0}
+        self.instance.__post_init__()
+        self.session = get_session(cache=self.instance)
+        self.session.get(LISTING_URL)
+
+        with self.subTest('Not modified'):
+            response = self.session.get(LISTING_URL)
+            self.assertEqual('"v1"', self.requests[-1]['If-None-Match'])
+            self.assertEqual((200, self.body), (response.status_code, response.content))
+            self.assertEqual(1, self.instance.stats['revalidated'])
+
+        with self.subTest('Modified'):
+            self.body, self.etag = b'<html>new</html>', '"v2"'
+            self.assertEqual(self.body, self.session.get(LISTING_URL).content)
+            self.assertEqual(self.body, self.instance.get(LISTING_URL).body)
+
+    def test_only_if_cached(self) -> None:
+        self.session.headers['Cache-Control'] = 'only-if-cached'
+        self.assertEqual(504, self.session.get(LISTING_URL).status_code)
+        self.assertEqual(504, self.session.get('https://steamcommunity.com/market/').status_code)
+        self.assertEqual([], self.requests)
+
+        self.instance.put(CacheEntry(LISTING_URL, 200, {}, self.body, time() + 60))
+        self.assertEqual(self.body, self.session.get(LISTING_URL).content)
+
+    def test_streamed_miss(self) -> None:
+        with self.session.get(LISTING_URL, stream=True) as response:
+            self.assertEqual(b'<htm', next(response.iter_content(chunk_size=4)))  # the caller stops early
+        self.assertEqual(0, self.instance.size)
+        self.assertEqual({'miss': 1}, self.instance.stats)
+
+    def test_no_store(self) -> None:
+        self.headers = {'Cache-Control': 'no-store'}
+        self.session.get(LISTING_URL)
+        self.session.get(LISTING_URL)
+        self.assertEqual(2, len(self.requests))
+
+    def test_eviction(self) -> None:
+        self.instance.max_size = 10
+        for url in ('a', 'b', 'c'):
+            self.instance.put(CacheEntry(url, 200, {}, b'1234', time() + 60))
+            if url == 'b':
+                self.instance.get('a')  # 'b' becomes the least recently used entry
+
+        self.assertIsNone(self.instance.get('b'))
+        self.assertIsNotNone(self.instance.get('a'))
+        self.assertEqual(8, self.instance.size)
+        self.assertEqual(1, self.instance.stats['eviction'])
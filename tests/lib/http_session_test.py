@@ -0,0 +1,67 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from urllib.parse import parse_qs
+
+from requests import Response
+from requests.adapters import HTTPAdapter
+
+from lib.http_session import get_authorized_session, AuthorizedSession
+from lib.webdriver import get_http_session
+
+
+def mock_send(request, **kwargs) -> Response:
+    response = Response()
+    response.status_code = 200
+    response.request = request
+    response.url = request.url
+    return response
+
+
+class TestAuthorizedSession(TestCase):
+
+    def setUp(self) -> None:
+        self.cookies = [
+            {'name': 'sessionid', 'value': 'community', 'domain': 'steamcommunity.com', 'path': '/', 'secure': True},
+            {'name': 'sessionid', 'value': 'store', 'domain': 'store.steampowered.com', 'path': '/'},
+            {'name': 'steamLoginSecure', 'value': 'token', 'domain': '.steamcommunity.com', 'path': '/',
+             'httpOnly': True, 'expiry': 4102444800},
+        ]
+
+    def test_get_authorized_session(self) -> None:
+        session = get_authorized_session(self.cookies, 'Mozilla/5.0')
+
+        self.assertIsInstance(session, AuthorizedSession)
+        self.assertEqual('Mozilla/5.0', session.headers['User-Agent'])
+        self.assertEqual(3, len(session.cookies))
+        self.assertEqual('community', session.get_session_id('https://steamcommunity.com/market/'))
+        self.assertEqual('store', session.get_session_id('https://store.steampowered.com/'))
+
+        with self.subTest('Cookies are not sent to other domains'):
+            self.assertEqual('community', session.get_session_id('https://api.steamcommunity.com/'))
+            self.assertIsNone(session.get_session_id('https://evilsteamcommunity.com/market/'))
+            self.assertIsNone(session.get_session_id('https://steamcommunity.com.evil.com/'))
+
+    @patch.object(HTTPAdapter, 'send', side_effect=mock_send)
+    def test_request(self, mock: MagicMock) -> None:
+        session = get_authorized_session(self.cookies, 'Mozilla/5.0')
+
+        with self.subTest('Session id is added to POST data'):
+            request = session.post('https://steamcommunity.com/market/removelisting/1', data={'a': 1}).request
+            self.assertEqual({'sessionid': ['community'], 'a': ['1']}, parse_qs(request.body))
+            self.assertIn('steamLoginSecure=token', request.headers['Cookie'])
+
+        with self.subTest('Explicit session id is kept'):
+            request = session.post('https://steamcommunity.com/market/', data={'sessionid': 'other'}).request
+            self.assertEqual({'sessionid': ['other']}, parse_qs(request.body))
+
+        with self.subTest('GET is not changed'):
+            request = session.get('https://steamcommunity.com/market/').request
+            self.assertIsNone(request.body)
+
+    def test_get_http_session(self) -> None:
+        driver = MagicMock(get_cookies=MagicMock(return_value=self.cookies),
+                           execute_script=MagicMock(return_value='Mozilla/5.0 Chrome'))
+        session = get_http_session(driver, pool_size=2)
+
+        self.assertEqual('Mozilla/5.0 Chrome', session.headers['User-Agent'])
+        self.assertEqual('community', session.get_session_id('https://steamcommunity.com/market/'))
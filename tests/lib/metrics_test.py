@@ -0,0 +1,151 @@
+import json
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+from urllib.request import urlopen
+
+from requests import Response
+
+from lib.database_manipulator import DatabaseManager
+from lib.http_session import get_session
+from lib.metrics import Metrics, Histogram
+from settings import DB_PATH_TEST
+
+
+class TestHistogram(TestCase):
+
+    def test_observe(self) -> None:
+        histogram = Histogram((0.1, 1))
+        for value in (0.05, 0.5, 0.5, 2):
+            histogram.observe(value)
+
+        self.assertEqual([1, 2, 1], histogram.counts)
+        self.assertEqual(3.05, histogram.sum)
+        self.assertEqual(1, histogram.quantile(0.5))
+        self.assertEqual(2, histogram.quantile(1))
+        self.assertIsNone(Histogram((1,)).quantile(0.5))
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self) -> None:
+        self.instance = Metrics(buckets=(0.1, 1), slow_query_threshold=0.5)
+
+    def test_counters_and_timers(self) -> None:
+        self.instance.inc('requests_total', status=200)
+        self.instance.inc('requests_total', 2, status=200)
+        with self.assertRaises(ValueError):
+            with self.instance.timer('parse_seconds', page='listing'):
+                raise ValueError
+
+        stats = self.instance.get_stats()
+        self.assertIn({'name': 'requests_total', 'labels': {'status': '200'}, 'value': 3}, stats['counters'])
+        self.assertIn({'name': 'parse_errors_total', 'labels': {'page': 'listing'}, 'value': 1}, stats['counters'])
+        self.assertEqual(1, stats['histograms'][0]['count'])
+
+        with self.subTest('Disabled'):
+            self.instance.reset()
+            self.instance.enabled = False
+            self.instance.timed('parse_seconds')(lambda: None)()
+            self.assertEqual({'counters': [], 'histograms': [], 'slow_queries': []}, self.instance.get_stats())
+
+    def test_to_prometheus(self) -> None:
+        self.instance.inc('requests_total', host='a"b')
+        self.instance.observe('query_seconds', 0.5, statement='SELECT')
+
+        self.assertEqual(
+            '# TYPE requests_total counter\n'
+            'requests_total{host="a\\"b"} 1\n'
+            '# TYPE query_seconds histogram\n'
+            'query_seconds_bucket{statement="SELECT",le="0.1"} 0\n'
+            'query_seconds_bucket{statement="SELECT",le="1.0"} 1\n'
+            'query_seconds_bucket{statement="SELECT",le="+Inf"} 1\n'
+            'query_seconds_sum{statement="SELECT"} 0.5\n'
+            'query_seconds_count{statement="SELECT"} 1\n',
+            self.instance.to_prometheus()
+        )
+
+        with TemporaryDirectory() as directory:
+            file_path = path.join(directory, 'trade_bot.prom')
+            self.instance.write_prometheus(file_path)
+            with open(file_path) as file:
+                self.assertEqual(self.instance.to_prometheus(), file.read())
+
+    def test_slow_query_log(self) -> None:
+        self.instance.record_query('SELECT *\n  FROM items', 0.01)
+        with self.assertLogs('lib.metrics', level='WARNING'):
+            self.instance.record_query('SELECT *\n  FROM history', 0.6)
+
+        self.assertEqual(['SELECT * FROM history'], [i.query for i in self.instance.slow_queries])
+        self.assertEqual(2, self.instance.get_stats()['histograms'][0]['count'])
+
+    def test_database_statements(self) -> None:
+        self.instance.slow_query_threshold = 0
+        manager = DatabaseManager(DB_PATH_TEST)
+        with patch('lib.database_manipulator.get_metrics', return_value=self.instance), self.assertLogs('lib.metrics'):
+            manager.create_table('test_metrics_table', {'value': 'INTEGER'})
+            manager.upsert_records_at_table('test_metrics_table', [{'id': 1, 'value': 1}], ('id',))
+            manager.get_record_from_table('test_metrics_table')
+            list(manager.iter_records_from_table('test_metrics_table'))
+            manager.delete_table('test_metrics_table')
+
+        statements = [i['labels']['statement'] for i in self.instance.get_stats()['histograms']]
+        self.assertEqual(['CREATE', 'DROP', 'INSERT', 'PRAGMA', 'SELECT'], statements)
+        self.assertIn('SELECT * FROM test_metrics_table LIMIT 50', [i.query for i in self.instance.slow_queries])
+
+    def test_cursor_fetches(self) -> None:
+        manager = DatabaseManager(DB_PATH_TEST)
+        manager.create_table('test_metrics_table', {'value': 'INTEGER'})
+        manager.upsert_records_at_table('test_metrics_table', [{'id': i, 'value': i} for i in range(3)], ('id',))
+        self.addCleanup(manager.delete_table, 'test_metrics_table')
+
+        def count_selects() -> int:
+            return sum(i['count'] for i in self.instance.get_stats()['histograms']
+                       if i['labels'] == {'statement': 'SELECT'})
+
+        with patch('lib.database_manipulator.get_metrics', return_value=self.instance):
+            manager.connect()
+            with self.subTest('Rows read one by one'):
+                manager.cursor.execute('SELECT value FROM test_metrics_table')
+                while manager.cursor.fetchone() is not None:
+                    self.assertEqual(0, count_selects())
+                self.assertEqual(1, count_selects())
+
+            with self.subTest('Iterated cursor'):
+                rows = list(manager.cursor.execute('SELECT value FROM test_metrics_table'))
+                self.assertEqual([(0,), (1,), (2,)], rows)
+                self.assertEqual(2, count_selects())
+
+            with self.subTest('Rows not exhausted'):
+                manager.cursor.execute('SELECT value FROM test_metrics_table').fetchone()
+                manager.close_connect()
+                self.assertEqual(3, count_selects())
+
+    def test_http_requests(self) -> None:
+        def send(request, **kwargs) -> Response:
+            response = Response()
+            response.status_code, response.url, response.request = 404, request.url, request
+            return response
+
+        session = get_session()
+        with patch('lib.http_session.get_metrics', return_value=self.instance), \
+                patch('requests.adapters.HTTPAdapter.send', side_effect=send):
+            session.get('https://steamcommunity.com/market/')
+
+        histogram = self.instance.get_stats()['histograms'][0]
+        self.assertEqual(('http_request_seconds', {'host': 'steamcommunity.com', 'status': '404'}),
+                         (histogram['name'], histogram['labels']))
+
+    def test_serve(self) -> None:
+        self.instance.inc('requests_total')
+        server = self.instance.serve(port=0)
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}'
+            with urlopen(f'{url}/stats') as response:
+                self.assertEqual(1, json.load(response)['counters'][0]['value'])
+            with urlopen(f'{url}/metrics') as response:
+                self.assertIn('requests_total 1', response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
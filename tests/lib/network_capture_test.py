@@ -0,0 +1,81 @@
+import json
+from base64 import b64encode
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from selenium.common import WebDriverException
+
+from lib.network_capture import NetworkCapture, CapturedResponse
+
+
+def log_entry(method: str, **params) -> dict:
+    return {'message': json.dumps({'message': {'method': method, 'params': params}}), 'level': 'INFO'}
+
+
+def response_received(request_id: str, url: str, mime_type: str = 'application/json', resource_type: str = 'XHR'):
+    return log_entry('Network.responseReceived', requestId=request_id, type=resource_type,
+                     response={'url': url, 'status': 200, 'mimeType': mime_type})
+
+
+class TestNetworkCapture(TestCase):
+
+    def setUp(self) -> None:
+        self.bodies = {'1': {'body': '{"success": 1}', 'base64Encoded': False},
+                       '4': {'body': b64encode(b'{"success": 2}').decode(), 'base64Encoded': True}}
+        self.driver = MagicMock()
+        self.driver.execute_cdp_cmd.side_effect = self.execute_cdp_cmd
+
+    def execute_cdp_cmd(self, cmd: str, params: dict) -> dict:
+        if cmd == 'Network.getResponseBody':
+            if params['requestId'] not in self.bodies:
+                raise WebDriverException('No resource with given identifier found')
+            return self.bodies[params['requestId']]
+        return {}
+
+    def test_collect(self) -> None:
+        instance = NetworkCapture(self.driver, url_pattern='itemordershistogram').start()
+        self.driver.get_log.return_value = [
+            response_received('1', 'https://steamcommunity.com/market/itemordershistogram?item_nameid=1'),
+            response_received('2', 'https://steamcommunity.com/market/itemordershistogram?item_nameid=2'),
+            response_received('3', 'https://steamcommunity.com/market/itemordershistogram?item_nameid=3',
+                              mime_type='image/png', resource_type='Image'),
+            response_received('4', 'https://steamcommunity.com/market/itemordershistogram?item_nameid=4',
+                              mime_type='application/json; charset=utf-8'),
+            response_received('5', 'https://steamcommunity.com/market/pricehistory'),
+            log_entry('Network.loadingFinished', requestId='1'),
+            log_entry('Network.loadingFinished', requestId='3'),
+            log_entry('Network.loadingFinished', requestId='5'),
+        ]
+
+        with self.subTest('Finished matching responses with bodies'):
+            responses = instance.collect()
+            self.assertEqual(['1'], [i.request_id for i in responses])
+            self.assertEqual({'success': 1}, responses[0].json())
+
+        with self.subTest('Responses finished later'):
+            self.driver.get_log.return_value = [
+                log_entry('Network.loadingFailed', requestId='2'),
+                log_entry('Network.loadingFinished', requestId='4'),
+            ]
+            responses = instance.collect()
+            self.assertEqual([{'success': 2}], [i.json() for i in responses])
+            self.assertEqual({}, instance._pending)
+
+        with self.subTest('Evicted body'):
+            self.driver.get_log.return_value = [
+                response_received('6', 'https://steamcommunity.com/market/itemordershistogram?item_nameid=6'),
+                log_entry('Network.loadingFinished', requestId='6'),
+            ]
+            self.assertIsNone(instance.collect()[0].body)
+
+    def test_fetch_batch(self) -> None:
+        def execute_async_script(script: str, urls: list[str]) -> list[dict]:
+            return [{'url': i, 'status': 200, 'mime_type': 'application/json', 'body': '{}'} for i in urls]
+
+        self.driver.execute_async_script.side_effect = execute_async_script
+        urls = [f'/market/itemordershistogram?item_nameid={i}' for i in range(25)]
+        responses = NetworkCapture(self.driver).fetch_batch(urls, batch_size=10)
+
+        self.assertEqual(3, self.driver.execute_async_script.call_count)
+        self.assertEqual(urls, [i.url for i in responses])
+        self.assertEqual(CapturedResponse(urls[0], 200, 'application/json', '{}'), responses[0])
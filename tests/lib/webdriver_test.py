@@ -1,7 +1,7 @@
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
-from lib.webdriver import Driver
+from lib.webdriver import Driver, DriverSettings, block_urls
 
 
 settings = (
@@ -17,3 +17,34 @@ class TestWebDriver(TestCase):
         instance = Driver().get_driver
         instance.get("https://www.google.ru/")
         self.assertEqual('Google', instance.title)
+
+
+@patch('lib.webdriver.webdriver_settings', settings)
+class TestDriverSettings(TestCase):
+
+    def test_default_profile(self) -> None:
+        options = DriverSettings(custom_settings=('user-agent=Mozilla/5.0',), profile='default').get_settings
+        self.assertEqual(['--headless', '--window-size=1200x600', 'user-agent=Mozilla/5.0'], options.arguments)
+        self.assertEqual('normal', options.page_load_strategy)
+
+    def test_fast_profile(self) -> None:
+        options = DriverSettings(profile='fast').get_settings
+        self.assertIn('--headless=new', options.arguments)
+        self.assertEqual('eager', options.page_load_strategy)
+        self.assertEqual(2, options.experimental_options['prefs']['profile.managed_default_content_settings.images'])
+
+        with self.subTest('Options are not shared'):
+            self.assertEqual('normal', DriverSettings(profile='default').get_settings.page_load_strategy)
+
+    def test_performance_log(self) -> None:
+        options = DriverSettings(performance_log=True).get_settings
+        self.assertEqual({'performance': 'ALL'}, options.to_capabilities()['goog:loggingPrefs'])
+
+    def test_unknown_profile(self) -> None:
+        with self.assertRaises(Exception):
+            DriverSettings(profile='slow')
+
+    def test_block_urls(self) -> None:
+        driver = MagicMock()
+        block_urls(driver, ('*.woff2',))
+        driver.execute_cdp_cmd.assert_called_with('Network.setBlockedURLs', {'urls': ['*.woff2']})
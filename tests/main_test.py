@@ -0,0 +1,87 @@
+import csv
+import json
+import subprocess
+import sys
+from contextlib import redirect_stdout
+from io import StringIO
+from os import path, remove
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+
+from lib.database_manipulator import DataBaseManipulator, DatabaseManager
+from main import main
+from settings import DB_PATH_TEST
+from trade_bot.item_registry import get_item_registry
+from trade_bot.util import CategoryTrade
+
+
+class TestCli(TestCase):
+    _patcher = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._patcher = patch.object(
+            DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=DatabaseManager(DB_PATH_TEST))
+        )
+        cls._patcher.start()
+
+    def setUp(self) -> None:
+        self.registry = get_item_registry('items_table')
+        self.registry.register_many([(1, CategoryTrade.CS, 'AK-47'), (2, CategoryTrade.DOTA, 'Mask')])
+
+    def tearDown(self) -> None:
+        self.registry.clear()
+        DataBaseManipulator().delete_table('items_table')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._patcher.stop()
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def run_cli(self, *args: str) -> tuple[int, str]:
+        with redirect_stdout(StringIO()) as stdout:
+            code = main(['--db', DB_PATH_TEST, *args])
+        return code, stdout.getvalue()
+
+    def test_stats(self) -> None:
+        code, output = self.run_cli('stats', '--count', '--json')
+        self.assertEqual(0, code)
+        self.assertEqual(2, json.loads(output)['tables']['items_table'])
+
+        with self.subTest('Rows are not counted by default'):
+            self.assertIsNone(json.loads(self.run_cli('stats', '--json')[1])['tables']['items_table'])
+
+    def test_db_option(self) -> None:
+        with TemporaryDirectory() as directory:
+            db_path = path.join(directory, 'Other.db')
+            code = 'import main; main.main(["--db", %r, "stats", "--json"])'  # the class-level manager is not patched
+            result = subprocess.run([sys.executable, '-c', code % db_path], capture_output=True, text=True,
+                                    check=True)
+            self.assertEqual({'db': db_path, 'tables': {}, 'indexes': 0}, json.loads(result.stdout))
+            self.assertTrue(path.exists(db_path))
+
+    def test_lookup(self) -> None:
+        self.registry.clear()
+        self.assertEqual((0, '2\n'), self.run_cli('lookup', 'DOTA', 'Mask'))
+        with redirect_stdout(StringIO()), patch('sys.stderr', new=StringIO()):
+            self.assertEqual(1, main(['--db', DB_PATH_TEST, 'lookup', 'CS', 'Mask']))
+
+    def test_export(self) -> None:
+        with TemporaryDirectory() as directory:
+            file_path = path.join(directory, 'items.csv')
+            self.run_cli('export', 'items_table', '--columns', 'id', 'name', '--order-by', 'id DESC',
+                         '--output', file_path)
+            with open(file_path, newline='') as file:
+                self.assertEqual([['id', 'name'], ['2', 'Mask'], ['1', 'AK-47']], list(csv.reader(file)))
+
+        with self.subTest('Invalid table name'), patch('sys.stderr', new=StringIO()) as stderr:
+            self.assertEqual((1, ''), self.run_cli('export', 'items_table; DROP TABLE items_table'))
+            self.assertIn('Invalid table name', stderr.getvalue())
+
+    def test_lazy_imports(self) -> None:
+        code = 'import sys, main, trade_bot.item_registry; print(sorted(i for i in sys.modules if i in %r))'
+        result = subprocess.run([sys.executable, '-c', code % (('pandas', 'numpy', 'requests', 'selenium'),)],
+                                capture_output=True, text=True, check=True)
+        self.assertEqual('[]', result.stdout.strip())
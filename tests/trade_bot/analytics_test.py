@@ -0,0 +1,80 @@
+from os import path, remove
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+
+import numpy as np
+
+from lib.database_manipulator import DataBaseManipulator, DatabaseManager
+from settings import DB_PATH_TEST
+from trade_bot.analytics import MarketAnalytics, forward_fill, moving_average, net_price
+from trade_bot.rollup import HistoryRollup
+
+DAY = 86400
+START = 1704067200  # 2024-01-01 00:00:00
+
+
+class TestMarketAnalytics(TestCase):
+    _patcher = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._patcher = patch.object(
+            DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=DatabaseManager(DB_PATH_TEST))
+        )
+        cls._patcher.start()
+
+    def setUp(self) -> None:
+        self.rollup = HistoryRollup('test_history_rollup_table')
+        self.instance = MarketAnalytics('test_history_rollup_table', days=30, short_window=3, long_window=10)
+
+    def tearDown(self) -> None:
+        self.rollup.db_manipulator.delete_table(self.rollup.table_name)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._patcher.stop()
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def add_history(self, item_id: int, prices: list[int], volume: int) -> None:
+        self.rollup.update(item_id, [{'ts': START + i * DAY + 3600, 'price': price, 'volume': volume}
+                                     for i, price in enumerate(prices)])
+
+    def test_forward_fill(self) -> None:
+        values = np.array([[np.nan, 1, np.nan, 3], [2, np.nan, np.nan, np.nan]])
+        np.testing.assert_array_equal(np.array([[np.nan, 1, 1, 3], [2, 2, 2, 2]]), forward_fill(values))
+
+    def test_moving_average(self) -> None:
+        values = np.array([[1, 2, 3, np.nan, 5]])
+        np.testing.assert_array_equal(np.array([[1, 1.5, 2.5, 3, 5]]), moving_average(values, 2))
+
+    def test_net_price(self) -> None:
+        self.assertAlmostEqual(100, net_price(np.array([115.0]))[0])
+
+    def test_load(self) -> None:
+        self.add_history(1, [100] * 5, 10)
+        self.add_history(2, [200] * 3, 1)
+
+        data = self.instance.load()
+        self.assertEqual([1, 2], data.item_ids.tolist())
+        self.assertEqual((2, 30), data.prices.shape)
+        self.assertEqual(START + 4 * DAY, data.days[-1])
+        self.assertEqual(100, data.prices[0, -1])
+        self.assertTrue(np.isnan(data.prices[1, -1]))
+        self.assertEqual([2], self.instance.load([2]).item_ids.tolist())
+        self.assertEqual([], self.instance.load([]).item_ids.tolist())
+
+    def test_rank(self) -> None:
+        self.add_history(1, [100, 120, 90, 140, 100, 150, 100, 150], 10)  # volatile
+        self.add_history(2, [100, 100, 100, 100, 100, 100, 150, 150], 10)  # rising
+        self.add_history(3, [100, 100, 100, 100, 100, 100, 150, 150], 0)  # no sales
+        self.add_history(4, [100, 100, 100, 100, 100, 100, 100, 100], 50)  # flat, loses the fee
+
+        candidates = self.instance.rank()
+        self.assertEqual([2, 1, 4], [i.item_id for i in candidates])
+        self.assertLess(candidates[-1].margin, 0)
+        self.assertEqual([2], [i.item_id for i in self.instance.rank(top=1)])
+        self.assertEqual([], self.instance.rank([]))
+
+    def test_rank_without_data(self) -> None:
+        self.assertEqual([], self.instance.rank())
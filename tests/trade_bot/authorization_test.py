@@ -1,12 +1,15 @@
 from datetime import datetime
 from os import path, remove
+from time import time
 from unittest import TestCase
-from unittest.mock import patch, PropertyMock
+from unittest.mock import patch, PropertyMock, MagicMock
+
+from requests import RequestException
 
 from lib.database_manipulator import DataBaseManipulator, DatabaseManager
-from trade_bot.authorization import AuthorizationManager
+from trade_bot.authorization import AuthorizationManager, Authorization, check_session
 
-from settings import DB_PATH_TEST
+from settings import DB_PATH_TEST, AUTH_CHECK_TTL
 
 
 class TestAuthorizationManager(TestCase):
@@ -121,3 +124,109 @@ class TestAuthorizationManager(TestCase):
                 self.instance.db_manipulator.get_table_data(table_name, search_condition)
             )
             self.instance.db_manipulator.delete_table_data(table_name)
+
+
+class TestSessionCheck(TestCase):
+    _patcher = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._patcher = patch.object(
+            DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=DatabaseManager(DB_PATH_TEST))
+        )
+        cls._patcher.start()
+
+    def setUp(self) -> None:
+        self.instance = AuthorizationManager(table_name='test_auth_table', check_table_name='test_auth_check_table')
+        self.instance.create_auth_table()
+        self.instance.create_or_update_cred('Mozilla/5.0', '[{"name": "sessionid", "value": "1"}]')
+        self.record = self.instance.get_valid_creds[0]
+
+    def tearDown(self) -> None:
+        self.instance.db_manipulator.delete_table(self.instance.table_name)
+        self.instance.db_manipulator.delete_table(self.instance.check_table_name)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._patcher.stop()
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def test_check_session(self) -> None:
+        response = MagicMock(json=MagicMock(return_value={'logged_in': True, 'steamid': '7656'}))
+
+        with self.subTest('Logged in'):
+            self.assertTrue(check_session(MagicMock(get=MagicMock(return_value=response))))
+
+        with self.subTest('Logged out'):
+            response.json.return_value = {'logged_in': False}
+            self.assertFalse(check_session(MagicMock(get=MagicMock(return_value=response))))
+
+        with self.subTest('Unknown'):
+            self.assertIsNone(check_session(MagicMock(get=MagicMock(side_effect=RequestException))))
+            response.json.side_effect = ValueError
+            self.assertIsNone(check_session(MagicMock(get=MagicMock(return_value=response))))
+
+    @patch('trade_bot.authorization.check_session', return_value=True)
+    def test_check_cred(self, mock_check: MagicMock) -> None:
+        with self.subTest('Result is cached'):
+            self.assertTrue(self.instance.check_cred(self.record))
+            self.assertTrue(self.instance.check_cred(self.record))
+            mock_check.assert_called_once()
+
+        with self.subTest('Cache is bound to the update date'):
+            updated_record = (*self.record[:2], '2030-01-01 00:00:00', *self.record[3:])
+            mock_check.return_value = False
+            self.assertFalse(self.instance.check_cred(updated_record))
+
+        with self.subTest('Cache expires'):
+            with patch('trade_bot.authorization.time', return_value=time() + AUTH_CHECK_TTL + 1):
+                self.assertFalse(self.instance.check_cred(self.record))
+            self.assertEqual(3, mock_check.call_count)
+
+        with self.subTest('Unknown state is not cached'):
+            mock_check.return_value = None
+            self.instance.db_manipulator.delete_table_data(self.instance.check_table_name)
+            self.assertIsNone(self.instance.check_cred(self.record))
+            self.assertFalse(self.instance.db_manipulator.get_table_data(self.instance.check_table_name))
+
+    @patch('trade_bot.authorization.get_http_session')
+    @patch('trade_bot.authorization.get_user_agent', return_value='Mozilla/5.0')
+    @patch('trade_bot.authorization.Authorization')
+    @patch('trade_bot.authorization.Driver')
+    @patch('trade_bot.authorization.check_session')
+    def test_exec_saves_checked_state(self, mock_check: MagicMock, _, mock_auth: MagicMock, *__) -> None:
+        mock_auth.return_value.exec.return_value.get_cookies.return_value = [{'name': 'sessionid', 'value': '2'}]
+
+        def get_valid() -> list[tuple]:
+            return self.instance.db_manipulator.get_table_data(self.instance.check_table_name, columns=['valid'])
+
+        with self.subTest('Login that is not confirmed is not cached'):
+            mock_check.side_effect = [None, None]  # credentials check, check after the login
+            self.instance.exec(self.record)
+            self.assertEqual([], get_valid())
+
+        with self.subTest('Login is checked after falling back to the credentials form'):
+            mock_check.side_effect = [False, False]
+            self.instance.exec(self.record)
+            self.assertEqual([(0,)], get_valid())
+
+        with self.subTest('Restored valid session is not checked again'):
+            self.instance.db_manipulator.delete_table_data(self.instance.check_table_name)
+            mock_check.side_effect = [True]
+            self.instance.exec(self.instance.get_valid_creds[0])
+            self.assertEqual([(1,)], get_valid())
+
+    def test_authorization(self) -> None:
+        cookies = [{'name': 'sessionid', 'value': '1'}]
+
+        with self.subTest('Valid session is restored without waiting for the login form'):
+            driver = MagicMock(execute_script=MagicMock(return_value=None))
+            self.assertIs(driver, Authorization(driver=driver).exec(cookies=cookies, valid=True))
+            driver.add_cookie.assert_called_once_with(cookies[0])
+            driver.find_element.assert_not_called()
+
+        with self.subTest('Logged in marker of the page'):
+            driver = MagicMock(execute_script=MagicMock(return_value='76561197960287930'))
+            self.assertIs(driver, Authorization(driver=driver).exec(cookies=cookies))
+            driver.find_element.assert_not_called()
@@ -0,0 +1,153 @@
+import json
+from os import path, remove
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock, MagicMock
+
+from requests import HTTPError, Response
+from requests.exceptions import RetryError
+from urllib3.exceptions import MaxRetryError, ResponseError
+
+from lib.database_manipulator import DataBaseManipulator, DatabaseManager
+from settings import DB_PATH_TEST
+from trade_bot.credential_pool import CredentialPool, CredentialPoolException, RateBudget, Strategy, RATE_LIMIT_PAUSE
+
+
+class TestRateBudget(TestCase):
+
+    def test_budget(self) -> None:
+        budget = RateBudget(rate=2, capacity=2, updated=0)
+
+        with self.subTest('Burst'):
+            budget.take(0)
+            budget.take(0)
+            self.assertEqual(0.5, budget.wait_time(0))
+
+        with self.subTest('Refill'):
+            self.assertEqual(0, budget.wait_time(0.5))
+            budget.refill(10)
+            self.assertEqual(2, budget.tokens)
+
+        with self.subTest('Block'):
+            budget.block(10, 30)
+            self.assertEqual(30, budget.wait_time(10))
+
+
+class TestCredentialPool(TestCase):
+    _patcher = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._patcher = patch.object(
+            DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=DatabaseManager(DB_PATH_TEST))
+        )
+        cls._patcher.start()
+
+    def setUp(self) -> None:
+        self.check_patcher = patch('trade_bot.authorization.check_session', return_value=True)
+        self.mock_check = self.check_patcher.start()
+        self.table_name = 'test_auth_table'
+        self.instance = CredentialPool(table_name=self.table_name, size=2, rate=1, burst=2)
+        manipulator = DataBaseManipulator()
+        manipulator.create_table(self.table_name, {'create_date': 'DATE', 'update_date': 'DATE',
+                                                   'user_agent': 'TEXT', 'cookies': 'TEXT'})
+        creds = [('UA 1', [{'name': 'sessionid', 'value': '1'}]), ('UA 2', [{'name': 'sessionid', 'value': '2'}]),
+                 ('UA 3', [{'name': 'sessionid', 'value': '3'}]), ('UA 4', [])]
+        for i, (user_agent, cookies) in enumerate(creds, 1):
+            data = {'create_date': '2024-01-01', 'update_date': f'2024-01-0{i}', 'user_agent': user_agent,
+                    'cookies': json.dumps(cookies)}
+            manipulator.create_table_data(self.table_name, data)
+
+    def tearDown(self) -> None:
+        self.check_patcher.stop()
+        DataBaseManipulator().delete_table(self.table_name)
+        DataBaseManipulator().delete_table('auth_check')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._patcher.stop()
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def test_load(self) -> None:
+        with self.subTest('No credentials'):
+            with self.assertRaises(CredentialPoolException):
+                self.instance.acquire()
+
+        self.instance.load()
+
+        with self.subTest('Latest valid accounts'):
+            self.assertEqual(['UA 3', 'UA 2'], [i.user_agent for i in self.instance.credentials])
+
+        with self.subTest('Every account has its own session'):
+            sessions = [i.session for i in self.instance.credentials]
+            self.assertEqual(['UA 3', 'UA 2'], [i.headers['User-Agent'] for i in sessions])
+            self.assertEqual(['3', '2'], [i.cookies['sessionid'] for i in sessions])
+
+        with self.subTest('Logged out accounts are skipped'):
+            self.mock_check.side_effect = lambda session: session.headers['User-Agent'] != 'UA 3'
+            DataBaseManipulator().delete_table('auth_check')
+            self.instance.load()
+            self.assertEqual(['UA 2', 'UA 1'], [i.user_agent for i in self.instance.credentials])
+
+    def test_round_robin(self) -> None:
+        self.instance.strategy = Strategy.ROUND_ROBIN
+        self.instance.load()
+
+        user_agents = [self.instance.acquire(timeout=0).user_agent for _ in range(4)]
+        self.assertEqual(['UA 3', 'UA 2', 'UA 3', 'UA 2'], user_agents)
+
+        with self.subTest('Budget is exhausted'):
+            with self.assertRaises(CredentialPoolException):
+                self.instance.acquire(timeout=0)
+
+    def test_budget(self) -> None:
+        self.instance.load()
+        first, second = self.instance.credentials
+        first.budget.tokens = 1
+
+        self.assertIs(second, self.instance.acquire(timeout=0))
+        self.assertIs(first, self.instance.acquire(timeout=0))
+
+        with self.subTest('Wait for budget'):
+            self.instance.rate = 20
+            for i in self.instance.credentials:
+                i.budget.rate = 20
+            self.instance.acquire(timeout=0)
+            self.assertIsNotNone(self.instance.acquire(timeout=1))
+
+    def test_lease_rate_limited(self) -> None:
+        self.instance.load()
+        response = Response()
+        response.status_code = 429
+        response.headers['Retry-After'] = '120'
+
+        with self.assertRaises(HTTPError):
+            with self.instance.lease() as credential:
+                raise HTTPError(response=response)
+
+        self.assertEqual(120, credential.budget.wait_time(credential.budget.updated))
+        self.assertIsNot(credential, self.instance.acquire(timeout=0))
+
+    def test_lease_retries_exhausted(self) -> None:
+        self.instance.load()
+        url = 'https://steamcommunity.com/market/listings/730/Sticker%20429'
+
+        for status_code, penalized in ((500, False), (429, True)):
+            with self.subTest(status_code=status_code):
+                reason = ResponseError(ResponseError.SPECIFIC_ERROR.format(status_code=status_code))
+                with self.assertRaises(RetryError):
+                    with self.instance.lease() as credential:
+                        raise RetryError(MaxRetryError(None, url, reason))
+                self.assertEqual(penalized, credential.budget.wait_time(credential.budget.updated) == RATE_LIMIT_PAUSE)
+
+    @patch('trade_bot.credential_pool.AuthorizationManager.exec')
+    def test_get_driver_pool(self, mock_exec: MagicMock) -> None:
+        mock_exec.return_value = MagicMock(execute_script=MagicMock(return_value=1))
+        self.instance.load()
+        credential = self.instance.credentials[1]
+
+        with self.instance.get_driver_pool(credential, size=1) as pool:
+            with pool.lease():
+                pass
+
+        mock_exec.assert_called_once_with(credential.record)
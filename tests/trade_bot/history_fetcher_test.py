@@ -0,0 +1,122 @@
+from os import path, remove
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch, MagicMock, PropertyMock
+
+from requests import ConnectionError
+
+from lib.database_manipulator import DataBaseManipulator, DatabaseManager
+from lib.http_cache import ResponseCache
+from lib.http_session import get_session
+from settings import DB_PATH_TEST
+from tests.fake_market.server import FakeMarketServer
+from trade_bot.history_fetcher import HistoryBatchFetcher
+from trade_bot.item_history import ItemHistory
+from trade_bot.listing_extractor import ListingData
+from trade_bot.util import CategoryTrade
+
+
+def mock_get(url: str, **kwargs) -> MagicMock:
+    if 'Broken' in url:
+        raise ConnectionError(url)
+    response = MagicMock(encoding='utf-8')
+    response.__enter__.return_value = response
+    history = '[[' if 'Garbled' in url else '[]'
+    response.iter_content.return_value = [f'Market_LoadOrderSpread( {len(url)} );\nvar line1={history};\n'.encode()]
+    return response
+
+
+class TestHistoryBatchFetcher(TestCase):
+
+    def setUp(self) -> None:
+        self.items = [(CategoryTrade.CS, f'Item {i}') for i in range(20)]
+        self.session = MagicMock(get=MagicMock(side_effect=mock_get))
+
+    @patch.object(ItemHistory, 'create_tables')
+    @patch.object(ItemHistory, 'exec')
+    def test_exec(self, mock_exec: MagicMock, mock_create_tables: MagicMock) -> None:
+        instance = HistoryBatchFetcher(self.items + [(CategoryTrade.DOTA, 'Broken'), (CategoryTrade.CS, 'Garbled')],
+                                       max_workers=4, session=self.session)
+
+        with self.subTest('All pages are fetched through the shared session'):
+            failed = instance.exec()
+            self.assertEqual(22, self.session.get.call_count)
+
+        with self.subTest('Tables are created once per batch'):
+            mock_create_tables.assert_called_once()
+
+        with self.subTest('Pages are passed to the parse/store path'):
+            self.assertEqual(20, mock_exec.call_count)
+            listing = mock_exec.call_args_list[0].args[0]
+            self.assertEqual(ListingData(len('https://steamcommunity.com/market/listings/730/Item%200'), []),
+                             listing)
+
+        with self.subTest('Failed items are reported'):
+            self.assertCountEqual([(CategoryTrade.DOTA, 'Broken'), (CategoryTrade.CS, 'Garbled')], failed)
+            self.assertIsInstance(instance.errors[(CategoryTrade.DOTA, 'Broken')], ConnectionError)
+
+        with self.subTest('A page that fails to parse does not abort the batch'):
+            self.assertIsInstance(instance.errors[(CategoryTrade.CS, 'Garbled')], ValueError)
+
+
+class TestHistoryBatchFetcherFakeMarket(TestCase):
+    _patcher = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._patcher = patch.object(
+            DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=DatabaseManager(DB_PATH_TEST))
+        )
+        cls._patcher.start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._patcher.stop()
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def test_exec(self) -> None:
+        with FakeMarketServer(item_count=30, rate_limit_every=7) as server:
+            instance = HistoryBatchFetcher(
+                [(CategoryTrade.CS, i) for i in server.item_names], max_workers=4,
+                session=get_session(pool_size=4, backoff_factor=0), market_url=server.url
+            )
+            self.assertEqual([], instance.exec())
+            self.assertTrue(server.rate_limited_count)
+
+        db_manipulator = DataBaseManipulator()
+        items = db_manipulator.get_table_data('items_table', limit=100)
+        self.assertEqual({server.get_item_name_id(i) for i in server.item_names}, {i[0] for i in items})
+        self.assertTrue(db_manipulator.get_table_data('global_history_table', {'item_id': items[0][0]}))
+        self.assertTrue(db_manipulator.get_table_data('local_history_table', {'item_id': items[0][0]}))
+
+    def test_exec_cached(self) -> None:
+        tmp_dir = TemporaryDirectory()
+        cache = ResponseCache(path.join(tmp_dir.name, 'HttpCache.db'))
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(cache.db_manager.disconnect)
+        credentials = MagicMock()
+        credentials.lease.return_value.__enter__.return_value = MagicMock(session=get_session(cache=cache))
+
+        with FakeMarketServer(item_count=2) as server:
+            instance = HistoryBatchFetcher([(CategoryTrade.CS, i) for i in server.item_names], market_url=server.url,
+                                           credentials=credentials, cache=cache)
+
+            with self.subTest('Pages are requested under a lease'):
+                self.assertEqual([], instance.exec())
+                self.assertEqual((2, 2), (credentials.lease.call_count, server.request_count))
+
+            with self.subTest('Extracted data is cached instead of the streamed pages'):
+                urls = cache.db_manager.get_record_from_table(cache.table_name, columns=['url'])
+                self.assertEqual(2, len(urls))
+                self.assertTrue(all(url.endswith('#listing') for url, in urls))
+
+            with self.subTest('Cached pages are read without a lease'):
+                self.assertEqual([], instance.exec())
+                self.assertEqual((2, 2), (credentials.lease.call_count, server.request_count))
+                self.assertEqual(2, cache.stats['hit'])
+
+            with self.subTest('Expired pages are requested under a lease'):
+                cache.db_manager.update_record_at_table(cache.table_name, {'expires': 0}, {'expires': ('>', 0)})
+                self.assertEqual([], instance.exec())
+                self.assertEqual((4, 4), (credentials.lease.call_count, server.request_count))
@@ -2,6 +2,8 @@ from os import getcwd, path
 from unittest import TestCase
 from unittest.mock import patch, PropertyMock
 
+from pandas import DataFrame, to_datetime
+
 from lib.database_manipulator import DataBaseManipulator, DatabaseManager
 from settings import DB_PATH_TEST
 from trade_bot.item_history import ItemHistory, CategoryTrade
@@ -28,6 +30,12 @@ class TestItemHistory(TestCase):
         self.item_name = 'M4A1-S | Boreal Forest (Field-Tested)'
         self.instance = ItemHistory(CategoryTrade.CS, self.item_name)
         self.instance.items_table_name = 'test_items_table'
+        self.instance.global_history_table_name = 'test_global_history_table'
+        self.instance.local_history_table_name = 'test_local_history_table'
+
+    def tearDown(self) -> None:
+        self.instance.db_manipulator.delete_table(self.instance.global_history_table_name)
+        self.instance.db_manipulator.delete_table(self.instance.local_history_table_name)
 
     def test_get_item_link(self):
         self.assertEqual(
@@ -43,25 +51,36 @@ class TestItemHistory(TestCase):
         self.instance.create_items_table()
         self.instance.create_or_update_items_table_data(20333, CategoryTrade.CS, self.item_name)
 
-    @patch.object(ItemHistory, 'get_html', new=PropertyMock(return_value=mock_html()))
+    @patch.object(ItemHistory, 'iter_html', new=PropertyMock(return_value=[mock_html()]))
     def test_exec(self):
         print(self.instance.exec())
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    def test_store_history(self):
+        def history(item_id: int, dates: list[str]) -> DataFrame:
+            df = DataFrame({'date': to_datetime(dates), 'price': 1.5, 'volume': 2})
+            df['item_id'] = item_id
+            return df
+
+        global_table = self.instance.global_history_table_name
+        local_table = self.instance.local_history_table_name
+
+        self.instance.store_history(1, history(1, ['2024-01-01 01:00:00']), history(1, ['2024-02-10 10:00:00']))
+        self.instance.store_history(2, history(2, ['2024-01-01 01:00:00']), history(2, ['2024-02-10 10:00:00']))
+
+        with self.subTest('Only new rows are appended'):
+            self.instance.store_history(
+                1,
+                history(1, ['2024-01-01 01:00:00', '2024-01-02 01:00:00']),
+                history(1, ['2024-02-10 10:00:00', '2024-02-10 11:00:00']),
+            )
+            self.assertEqual(
+                [(1, 1704070800, 150, 2), (1, 1704157200, 150, 2)],
+                self.instance.db_manipulator.get_table_data(global_table, {'item_id': 1})
+            )
+
+        with self.subTest('Local window is replaced'):
+            self.assertEqual(2, len(self.instance.db_manipulator.get_table_data(local_table, {'item_id': 1})))
+
+        with self.subTest('Other items are kept'):
+            self.assertEqual(1, len(self.instance.db_manipulator.get_table_data(global_table, {'item_id': 2})))
+            self.assertEqual(1, len(self.instance.db_manipulator.get_table_data(local_table, {'item_id': 2})))
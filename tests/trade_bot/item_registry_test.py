@@ -0,0 +1,93 @@
+from os import path, remove
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+
+from lib.database_manipulator import DataBaseManipulator, DatabaseManager
+from settings import DB_PATH_TEST
+from trade_bot.item_history import ItemHistory
+from trade_bot.item_registry import ItemNameIdRegistry, get_item_registry
+from trade_bot.listing_extractor import ListingData
+from trade_bot.util import CategoryTrade
+
+
+class TestItemNameIdRegistry(TestCase):
+    _patcher = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._patcher = patch.object(
+            DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=DatabaseManager(DB_PATH_TEST))
+        )
+        cls._patcher.start()
+
+    def setUp(self) -> None:
+        self.instance = ItemNameIdRegistry(table_name='test_registry_items_table', max_size=2)
+        self.item_name = 'M4A1-S | Boreal Forest (Field-Tested)'
+
+    def tearDown(self) -> None:
+        self.instance.db_manipulator.delete_table(self.instance.table_name)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._patcher.stop()
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def test_register(self) -> None:
+        self.instance.register(2384820, CategoryTrade.CS, self.item_name)
+        self.instance.register(2384820, CategoryTrade.CS, self.item_name)
+
+        with self.subTest('Item is cached'):
+            self.assertEqual(2384820, self.instance.get(CategoryTrade.CS, self.item_name))
+
+        with self.subTest('Item is saved once'):
+            records = self.instance.db_manipulator.get_table_data(self.instance.table_name)
+            self.assertEqual([(2384820, CategoryTrade.CS.name, self.item_name)], [(i[0], i[2], i[3]) for i in records])
+
+    def test_unique_name(self) -> None:
+        db_manipulator = self.instance.db_manipulator
+        db_manipulator.create_table(self.instance.table_name, {'create_date': 'DATE', 'category': 'TEXT',
+                                                               'name': 'TEXT'})
+        for item_name_id in (1, 2):  # a table created before the unique index
+            db_manipulator.create_table_data(self.instance.table_name, {'id': item_name_id, 'category': 'CS',
+                                                                         'name': self.item_name})
+
+        with self.subTest('Duplicate names are removed'):
+            self.instance.create_items_table()
+            self.assertEqual([2], [i[0] for i in db_manipulator.get_table_data(self.instance.table_name)])
+
+        with self.subTest('A name is registered under one id'):
+            self.instance.register(3, CategoryTrade.CS, self.item_name)
+            self.instance.clear()
+            self.assertEqual([3], [i[0] for i in db_manipulator.get_table_data(self.instance.table_name)])
+            self.assertEqual(3, self.instance.resolve(CategoryTrade.CS, self.item_name))
+
+    def test_resolve(self) -> None:
+        self.instance.register_many([(1, CategoryTrade.CS, 'a'), (2, CategoryTrade.CS, 'b'),
+                                     (3, CategoryTrade.DOTA, 'c')])
+
+        with self.subTest('Least recently used item is evicted'):
+            self.assertEqual(2, len(self.instance))
+            self.assertIsNone(self.instance.get(CategoryTrade.CS, 'a'))
+
+        with self.subTest('Resolve from the items table'):
+            self.assertEqual(1, self.instance.resolve(CategoryTrade.CS, 'a'))
+            self.assertEqual(1, self.instance.get(CategoryTrade.CS, 'a'))
+
+        with self.subTest('Unknown item'):
+            self.assertIsNone(self.instance.resolve(CategoryTrade.DOTA, 'a'))
+
+        with self.subTest('Resolve from the listing page'):
+            with patch.object(ItemHistory, 'get_listing_data', new=PropertyMock(return_value=ListingData(4))):
+                self.assertEqual(4, self.instance.resolve(CategoryTrade.DOTA, 'd', fetch_missing=True))
+            self.assertEqual(4, self.instance.resolve(CategoryTrade.DOTA, 'd'))
+
+    def test_preload(self) -> None:
+        self.instance.register_many([(1, CategoryTrade.CS, 'a'), (2, CategoryTrade.DOTA, 'b')])
+        self.instance.clear()
+
+        self.assertEqual(2, self.instance.preload())
+        self.assertEqual(2, self.instance.get(CategoryTrade.DOTA, 'b'))
+
+    def test_get_item_registry(self) -> None:
+        self.assertIs(get_item_registry('test_registry_items_table'), get_item_registry('test_registry_items_table'))
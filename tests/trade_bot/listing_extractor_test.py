@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from tests.trade_bot.item_history_test import mock_html
+from trade_bot.listing_extractor import ListingPageExtractor, ListingData
+
+
+class TestListingPageExtractor(TestCase):
+
+    def setUp(self) -> None:
+        self.html = mock_html()
+
+    def chunks(self, size: int) -> list[str]:
+        return [self.html[i:i + size] for i in range(0, len(self.html), size)]
+
+    def test_extract(self) -> None:
+        for size in (1024, 7, len(self.html)):
+            with self.subTest(f'Chunk size {size}'):
+                data = ListingPageExtractor().extract(self.chunks(size))
+                self.assertEqual(2384820, data.item_name_id)
+                self.assertEqual(['Nov 28 2013 01: +0', 6.061, '22'], data.price_history[0])
+
+    def test_extract_stops_reading(self) -> None:
+        chunks = iter(self.chunks(1024))
+        ListingPageExtractor().extract(chunks)
+        self.assertTrue(next(chunks, None))
+
+    def test_extract_without_data(self) -> None:
+        with self.subTest('No markers'):
+            self.assertEqual(ListingData(), ListingPageExtractor().extract(['<html>', '</html>']))
+
+        with self.subTest('Unterminated last line'):
+            data = ListingPageExtractor().extract(['<script>\nMarket_LoadOrderSpread( 1', '5 );'])
+            self.assertEqual(ListingData(item_name_id=15), data)
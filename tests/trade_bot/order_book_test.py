@@ -0,0 +1,127 @@
+import sqlite3
+from os import path, remove
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+
+from lib.database_manipulator import DataBaseManipulator, DatabaseManager
+from lib.http_session import get_session
+from settings import DB_PATH_TEST
+from tests.fake_market.server import FakeMarketServer
+from trade_bot.order_book import OrderBook, OrderBookSide, OrderBookStorage, OrderBookPoller, pack, unpack
+
+
+class TestOrderBookStorage(TestCase):
+    _patcher = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._patcher = patch.object(
+            DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=DatabaseManager(DB_PATH_TEST))
+        )
+        cls._patcher.start()
+
+    def setUp(self) -> None:
+        self.instance = OrderBookStorage(table_name='test_order_book_table', keyframe_interval=3)
+
+    def tearDown(self) -> None:
+        self.instance.db_manipulator.delete_table(self.instance.table_name)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._patcher.stop()
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def test_pack(self) -> None:
+        self.assertEqual([1, -2, 2 ** 31 - 1], unpack(pack([1, -2, 2 ** 31 - 1])))
+        self.assertEqual(12, len(pack([1, 2, 3])))
+
+    def test_from_histogram(self) -> None:
+        histogram = {'buy_order_graph': [[1.2, 5, ''], [1.1, 8, '']], 'sell_order_graph': [[1.3, 2, '']]}
+        order_book = OrderBook.from_histogram(1, 100, histogram)
+
+        self.assertEqual(OrderBookSide([120, 110], [5, 8]), order_book.buy)
+        self.assertEqual({120: 5, 110: 3}, order_book.buy.levels)
+        self.assertEqual(OrderBookSide([130], [2]), order_book.sell)
+
+    def test_save_replay(self) -> None:
+        order_books = [
+            OrderBook(1, 100, OrderBookSide([120, 110], [5, 8]), OrderBookSide([130, 140], [2, 10])),
+            OrderBook(1, 200, OrderBookSide([120, 110], [5, 9]), OrderBookSide([130, 140], [2, 10])),
+            OrderBook(1, 300, OrderBookSide([125, 120], [1, 6]), OrderBookSide([140], [8])),
+            OrderBook(1, 400, OrderBookSide([125], [1]), OrderBookSide([135, 140], [4, 12])),
+            OrderBook(1, 500, OrderBookSide([125], [1]), OrderBookSide([135, 140], [4, 12])),
+        ]
+        for order_book in order_books:
+            self.instance.save([order_book])
+
+        with self.subTest('Snapshots are restored'):
+            self.assertEqual(order_books, list(self.instance.replay(1)))
+
+        with self.subTest('Keyframes'):
+            rows = self.instance.db_manipulator.get_table_data(self.instance.table_name)
+            self.assertEqual([1, 0, 0, 1, 0], [i[3] for i in rows])
+
+        with self.subTest('Only changed levels are stored'):
+            self.assertEqual(([110], [4]), (unpack(rows[1][4]), unpack(rows[1][5])))
+            self.assertEqual(b'', rows[4][4] + rows[4][5] + rows[4][6] + rows[4][7])
+
+        with self.subTest('The most recent snapshots are restored from a keyframe'):
+            self.assertEqual(order_books[3:], list(self.instance.replay(1, limit=3)))
+
+    def test_save_failure(self) -> None:
+        order_books = [
+            OrderBook(1, 100, OrderBookSide([120], [5]), OrderBookSide([130], [2])),
+            OrderBook(1, 200, OrderBookSide([120], [6]), OrderBookSide([130], [2])),
+            OrderBook(1, 300, OrderBookSide([120], [6]), OrderBookSide([130], [3])),
+        ]
+        self.instance.save(order_books[:1])
+        with patch.object(DataBaseManipulator, 'bulk_upsert', side_effect=sqlite3.OperationalError('locked')):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.instance.save(order_books[1:2])
+        self.instance.save(order_books[2:])
+
+        self.assertEqual([order_books[0], order_books[2]], list(self.instance.replay(1)))
+
+
+class TestOrderBookPoller(TestCase):
+    _patcher = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._patcher = patch.object(
+            DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=DatabaseManager(DB_PATH_TEST))
+        )
+        cls._patcher.start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._patcher.stop()
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def test_poll_once(self) -> None:
+        storage = OrderBookStorage(table_name='test_order_book_table')
+        with FakeMarketServer(item_count=5, rate_limit_every=4) as server:
+            item_ids = [server.get_item_name_id(i) for i in server.item_names] + [1]
+            instance = OrderBookPoller(item_ids, max_workers=2, session=get_session(pool_size=2, backoff_factor=0),
+                                       market_url=server.url, storage=storage)
+            with patch('trade_bot.order_book.time') as mock_time:
+                mock_time.time.return_value = 1000
+                with self.subTest('Unknown item fails'):
+                    self.assertEqual([1], instance.poll_once())
+
+                mock_time.time.return_value = 2000
+                instance.exec(iterations=1)
+
+                with self.subTest('Poll of one item'):
+                    mock_time.time.return_value = 3000
+                    instance.storage = OrderBookStorage(table_name='test_order_book_table')
+                    self.assertTrue(instance.poll_item(item_ids[1]))  # no previous snapshot
+
+        with self.subTest('Snapshots are saved'):
+            snapshots = list(storage.replay(item_ids[0]))
+            self.assertEqual([1000, 2000], [i.ts for i in snapshots])
+            self.assertTrue(snapshots[-1].sell.prices)
+
+        storage.db_manipulator.delete_table(storage.table_name)
@@ -0,0 +1,115 @@
+import sqlite3
+from os import path, remove
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+
+from pandas import DataFrame, to_datetime
+
+from lib.database_manipulator import DataBaseManipulator, DatabaseManager
+from settings import DB_PATH_TEST
+from trade_bot.price_history import PriceHistoryStorage
+from trade_bot.rollup import HistoryRollup, Bar
+
+
+def history(item_id: int, dates: list[str], price: float = 1.5) -> DataFrame:
+    df = DataFrame({'date': to_datetime(dates), 'price': price, 'volume': 2})
+    df['item_id'] = item_id
+    return df
+
+
+class TestPriceHistoryStorage(TestCase):
+    _patcher = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._patcher = patch.object(
+            DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=DatabaseManager(DB_PATH_TEST))
+        )
+        cls._patcher.start()
+
+    def setUp(self) -> None:
+        self.instance = PriceHistoryStorage('test_global_history_table', 'test_local_history_table',
+                                            'test_history_rollup_table')
+
+    def tearDown(self) -> None:
+        self.instance.db_manipulator.delete_table(self.instance.global_table_name)
+        self.instance.db_manipulator.delete_table(self.instance.local_table_name)
+        self.instance.db_manipulator.delete_table(self.instance.rollup_table_name)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._patcher.stop()
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def test_create_history_tables(self) -> None:
+        self.instance.create_history_tables()
+        self.assertEqual(['item_id', 'ts', 'price', 'volume'],
+                         self.instance.db_manipulator.get_table_columns(self.instance.global_table_name))
+
+    def test_migrate_table(self) -> None:
+        table_name = self.instance.global_table_name
+        self.instance.db_manipulator.dataframe_to_table(
+            history(1, ['2024-01-01 01:00:00', '2024-01-02 01:00:00'], 0.035), table_name,
+            {'index': False, 'if_exists': 'replace'}
+        )
+
+        self.instance.create_history_tables()
+        self.assertEqual([(1, 1704070800, 4, 2), (1, 1704157200, 4, 2)],
+                         self.instance.db_manipulator.get_table_data(table_name))
+        self.assertFalse(self.instance.db_manipulator.check_table_exist(f'{table_name}_compact'))
+
+        with self.subTest('Migrated history is rolled up'):
+            self.assertEqual([Bar(1704067200, 4, 4, 4, 4, 4, 1704157200)],
+                             HistoryRollup(self.instance.rollup_table_name).get_bars(1, 'week'))
+
+    def test_migrate_table_interrupted(self) -> None:
+        table_name = self.instance.global_table_name
+        db_manipulator = self.instance.db_manipulator
+        db_manipulator.dataframe_to_table(history(1, ['2024-01-01 01:00:00']), table_name,
+                                          {'index': False, 'if_exists': 'replace'})
+        execute = DatabaseManager.execute
+
+        def fail_rename(db_manager: DatabaseManager, query: str, params: tuple = ()) -> list:
+            if 'RENAME' in query:
+                raise sqlite3.OperationalError('disk I/O error')
+            return execute(db_manager, query, params)
+
+        with patch.object(DatabaseManager, 'execute', new=fail_rename), self.assertRaises(sqlite3.OperationalError):
+            self.instance.create_history_tables()
+
+        with self.subTest('Old table is kept'):
+            self.assertIn('date', db_manipulator.get_table_columns(table_name))
+            self.assertFalse(db_manipulator.check_table_exist(f'{table_name}_compact'))
+
+        with self.subTest('Migration is restarted'):
+            self.instance.create_history_tables()
+            self.assertEqual([(1, 1704070800, 150, 2)], db_manipulator.get_table_data(table_name))
+
+    def test_migrated_copy_restored(self) -> None:
+        table_name = self.instance.global_table_name
+        self.instance.create_history_table(f'{table_name}_compact')
+        self.instance.db_manipulator.bulk_upsert(f'{table_name}_compact', [{'item_id': 1, 'ts': 1, 'price': 2,
+                                                                           'volume': 3}], ('item_id', 'ts'))
+
+        self.instance.create_history_tables()
+        self.assertEqual([(1, 1, 2, 3)], self.instance.db_manipulator.get_table_data(table_name))
+        self.assertFalse(self.instance.db_manipulator.check_table_exist(f'{table_name}_compact'))
+
+    def test_save(self) -> None:
+        self.instance.save(1, history(1, ['2024-01-01 01:00:00']), history(1, ['2024-02-10 10:00:00']))
+        self.instance.save(1, history(1, ['2024-01-01 01:00:00', '2024-01-02 01:00:00']),
+                           history(1, ['2024-02-10 11:00:00']))
+        self.instance.save(2, history(2, ['2024-01-01 01:00:00']), history(2, ['2024-02-10 10:00:00']))
+
+        with self.subTest('History of the item'):
+            self.assertEqual([(1704070800, 150, 2), (1704157200, 150, 2), (1707562800, 150, 2)],
+                             self.instance.get_history(1))
+
+        with self.subTest('Time range'):
+            self.assertEqual([(1704157200, 150, 2)], self.instance.get_history(1, 1704070801, 1707562799))
+
+        with self.subTest('Replace mode'):
+            self.instance.save(1, history(1, ['2024-01-03 01:00:00']), history(1, []), incremental=False)
+            self.assertEqual([(1704243600, 150, 2)], self.instance.get_history(1))
+            self.assertEqual([], self.instance.get_history(2))
@@ -0,0 +1,71 @@
+from os import path, remove
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+
+from lib.database_manipulator import DataBaseManipulator, DatabaseManager
+from settings import DB_PATH_TEST
+from trade_bot.rollup import HistoryRollup, Bar, get_bucket, PERIODS
+
+
+def row(ts: int, price: int, volume: int = 1) -> dict:
+    return {'item_id': 1, 'ts': ts, 'price': price, 'volume': volume}
+
+
+class TestHistoryRollup(TestCase):
+    _patcher = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._patcher = patch.object(
+            DataBaseManipulator, 'db_manager', new=PropertyMock(return_value=DatabaseManager(DB_PATH_TEST))
+        )
+        cls._patcher.start()
+
+    def setUp(self) -> None:
+        self.instance = HistoryRollup('test_history_rollup_table')
+
+    def tearDown(self) -> None:
+        self.instance.db_manipulator.delete_table(self.instance.table_name)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._patcher.stop()
+        if path.exists(DB_PATH_TEST):
+            remove(DB_PATH_TEST)
+
+    def test_get_bucket(self) -> None:
+        ts = 1704157200  # 2024-01-02 01:00:00, Tuesday
+        self.assertEqual(1704157200, get_bucket(ts + 59, PERIODS['hour']))
+        self.assertEqual(1704153600, get_bucket(ts, PERIODS['day']))
+        self.assertEqual(1704067200, get_bucket(ts, PERIODS['week']))  # 2024-01-01, Monday
+
+    def test_update(self) -> None:
+        day = 1704153600  # 2024-01-02 00:00:00
+
+        with self.subTest('Create bars'):
+            self.instance.update(1, [row(day + 3600, 100, 2), row(day, 90, 1), row(day + 3700, 120, 3)])
+            self.assertEqual([Bar(day, 90, 120, 90, 120, 6, day + 3700)], self.instance.get_bars(1, 'day'))
+            self.assertEqual([Bar(day, 90, 90, 90, 90, 1, day), Bar(day + 3600, 100, 120, 100, 120, 5, day + 3700)],
+                             self.instance.get_bars(1, 'hour'))
+
+        with self.subTest('Rebuild the range of new rows'):
+            self.instance.update(1, [row(day + 3600, 500, 9), row(day + 7200, 80, 4), row(day + 86400, 85, 1)])
+            self.assertEqual([Bar(day, 90, 500, 80, 80, 14, day + 7200), Bar(day + 86400, 85, 85, 85, 85, 1,
+                                                                              day + 86400)],
+                             self.instance.get_bars(1, 'day'))
+            self.assertEqual([Bar(day + 86400, 85, 85, 85, 85, 1, day + 86400)], self.instance.get_bars(1, 'day', 1))
+            self.assertEqual([Bar(day, 90, 90, 90, 90, 1, day), Bar(day + 3600, 500, 500, 500, 500, 9, day + 3600)],
+                             self.instance.get_bars(1, 'hour')[:2])
+            self.assertEqual(1, len(self.instance.get_bars(1, 'week')))
+
+        with self.subTest('Revised window replaces partial hours'):
+            self.instance.update(1, [row(day + 3600, 100, 20), row(day + 86400, 95, 3)])  # hour day + 7200 is gone
+            self.assertEqual([Bar(day, 90, 90, 90, 90, 1, day), Bar(day + 3600, 100, 100, 100, 100, 20, day + 3600),
+                              Bar(day + 86400, 95, 95, 95, 95, 3, day + 86400)], self.instance.get_bars(1, 'hour'))
+            self.assertEqual([Bar(day, 90, 100, 90, 100, 21, day + 3600), Bar(day + 86400, 95, 95, 95, 95, 3,
+                                                                                day + 86400)],
+                             self.instance.get_bars(1, 'day'))
+            self.assertEqual([Bar(day - 86400, 90, 100, 90, 95, 24, day + 86400)], self.instance.get_bars(1, 'week'))
+
+        with self.subTest('Unknown item'):
+            self.assertEqual([], self.instance.get_bars(2, 'day'))
@@ -0,0 +1,131 @@
+from threading import Event, Lock
+from unittest import TestCase
+
+from trade_bot.analytics import Candidate
+from trade_bot.scheduler import PollScheduler
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestPollScheduler(TestCase):
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.polled: list[int] = []
+        self.changed: dict[int, bool] = {}
+        self.lock = Lock()
+        self.released = Event()
+        self.instance = PollScheduler(self.task, base_interval=100, min_interval=10, max_interval=1000,
+                                      max_workers=2, clock=self.clock)
+
+    def task(self, item_id: int) -> bool:
+        if item_id < 0:
+            raise ValueError('Unknown item')
+        if item_id == 100:  # slow poll, released once three other items were polled
+            self.released.wait(5)
+        with self.lock:
+            self.polled.append(item_id)
+            if len(self.polled) == 3:
+                self.released.set()
+        return self.changed.get(item_id, False)
+
+    def test_run_once(self) -> None:
+        self.instance.add_many([1, 2, 3])
+
+        with self.subTest('Concurrency budget'):
+            self.assertEqual(2, self.instance.run_once())
+            self.assertEqual([1, 2], sorted(self.polled))
+
+        with self.subTest('Overdue items first'):
+            self.assertEqual(1, self.instance.run_once())
+            self.assertEqual(3, self.polled[-1])
+            self.assertEqual(0, self.instance.run_once())
+
+        with self.subTest('Next run'):
+            self.assertEqual(150, self.instance.get_next_run())
+
+    def test_adaptive_interval(self) -> None:
+        self.changed[1] = True
+        self.instance.add_many([1, 2])
+        self.instance.run_once()
+
+        with self.subTest('Changed items are polled more often'):
+            self.assertEqual(50, self.instance.states[1].interval)
+            self.assertEqual(150, self.instance.states[2].interval)
+
+        with self.subTest('Interval is clamped'):
+            for _ in range(10):
+                self.clock.now += 1000
+                self.instance.run_once()
+            self.assertEqual(10, self.instance.states[1].interval)
+            self.assertEqual(1000, self.instance.states[2].interval)
+
+    def test_set_stats(self) -> None:
+        self.instance.add_many([1, 2])
+        candidates = [Candidate(1, 100, 100, 100, 0.5, 20, 0.1, 1, 1),
+                      Candidate(2, 100, 100, 100, float('nan'), 0, 0.1, 1, 1)]
+        self.instance.set_stats(candidates)
+
+        self.assertLess(self.instance.states[1].interval, 20)
+        self.assertEqual(100, self.instance.states[2].interval)
+
+        with self.subTest('Rescheduled after the last run'):
+            self.instance.run_once()
+            self.instance.reschedule(2, interval=500)
+            self.assertEqual(self.instance.states[1].next_run, self.instance.get_next_run())
+            self.assertEqual(500, self.instance.states[2].next_run)
+
+    def test_reschedule_in_flight(self) -> None:
+        self.instance.add(1)
+        state, = self.instance.pop_due(1)
+
+        self.instance.reschedule(1, interval=20)
+        self.assertEqual(20, state.interval)
+        self.assertEqual([], self.instance.pop_due(1))  # not polled twice at once
+
+        self.instance.complete(state, True)
+        self.assertEqual(10, self.instance.get_next_run())
+        self.clock.now = 10
+        self.assertEqual([state], self.instance.pop_due(2))
+
+    def test_failures(self) -> None:
+        self.instance.add(-1)
+        self.instance.run_once()
+
+        state = self.instance.states[-1]
+        self.assertIsInstance(self.instance.errors[-1], ValueError)
+        self.assertEqual(1, state.failures)
+        self.assertEqual(200, state.next_run)
+
+    def test_remove(self) -> None:
+        self.instance.add_many([1, 2])
+        self.instance.remove(1)
+
+        self.instance.run_once()
+        self.assertEqual([2], self.polled)
+        self.assertEqual(1, len(self.instance))
+
+    def test_exec(self) -> None:
+        with self.subTest('Empty watchlist'):
+            self.instance.exec()
+            self.assertEqual([], self.polled)
+
+        self.instance.add_many([1, 2, 3])
+        self.instance.exec(iterations=3)
+        self.assertEqual([1, 2, 3], sorted(self.polled))
+
+        with self.subTest('Slow poll does not hold back the others'):
+            self.polled.clear()
+            self.released.clear()
+            self.instance.add(100)
+            self.clock.now += 1000
+            self.instance.exec(iterations=4)
+            self.assertEqual(100, self.polled[-1])
+            self.assertEqual([1, 2, 3, 100], sorted(self.polled))
@@ -0,0 +1,171 @@
+import warnings
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from lib.database_manipulator import DataBaseManipulator
+from trade_bot.rollup import PERIODS, get_bucket
+
+STEAM_FEE = 0.05
+GAME_FEE = 0.10  # publisher fee of CS and Dota
+
+
+@dataclass
+class MarketData:
+    """History of many items aligned on a common daily grid."""
+    item_ids: np.ndarray  # (items,)
+    days: np.ndarray  # (days,) start of every day, epoch seconds
+    prices: np.ndarray  # (items, days) daily close in cents, NaN - no data
+    volumes: np.ndarray  # (items, days) daily volume
+
+
+@dataclass
+class Candidate:
+    item_id: int
+    price: float  # prices in cents
+    ma_short: float
+    ma_long: float
+    volatility: float  # standard deviation of daily log returns
+    velocity: float  # average daily volume
+    margin: float  # relative profit of buying at the recent low and selling at the short average after fees
+    liquidity: float
+    score: float
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Fill NaN values of every row with the last known value of the row."""
+    index = np.where(np.isnan(values), 0, np.arange(values.shape[1]))
+    np.maximum.accumulate(index, axis=1, out=index)
+    return values[np.arange(values.shape[0])[:, None], index]
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing moving average of every row, ignoring NaN values."""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    sums[:, window:] = sums[:, window:] - sums[:, :-window]
+    counts[:, window:] = counts[:, window:] - counts[:, :-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def net_price(price: np.ndarray) -> np.ndarray:
+    """Amount received by the seller, the buyer pays the price plus Steam and game fees."""
+    return price / (1 + STEAM_FEE + GAME_FEE)
+
+
+@dataclass
+class MarketAnalyticsBase(ABC):
+    rollup_table_name: str = 'history_rollup_table'
+
+    @abstractmethod
+    def rank(self, item_ids: Optional[list[int]] = None) -> list[Candidate]:
+        pass
+
+
+@dataclass
+class MarketAnalytics(MarketAnalyticsBase):
+    """Cross-item market analytics computed in one vectorized pass over the daily bars of all items."""
+    days: int = 90
+    short_window: int = 7
+    long_window: int = 30
+    min_velocity: float = 1.0  # items sold per day
+    chunksize: int = 50000  # rows read from the database at once
+
+    def __post_init__(self) -> None:
+        self.db_manipulator = DataBaseManipulator()
+
+    def load(self, item_ids: Optional[list[int]] = None, end: Optional[int] = None) -> MarketData:
+        """Load the daily bars of the items into aligned arrays.
+
+        Args:
+            item_ids: item ids, all items if None.
+            end: last day, epoch seconds, the last stored day if not passed.
+
+        Returns:
+            Aligned market data.
+        """
+        day = PERIODS['day']
+        data = np.empty((0, 4), dtype=np.int64)
+        if self.db_manipulator.check_table_exist(self.rollup_table_name):
+            if end is None:
+                end = self.db_manipulator.get_table_max_value(self.rollup_table_name, 'ts', {'period': day}) or 0
+            end = get_bucket(end, day)
+            start = end - (self.days - 1) * day
+            search_condition = {'period': day, 'ts': ('BETWEEN', (start, end))}
+            if item_ids is not None:  # an empty list selects no items
+                search_condition['item_id'] = ('IN', [int(i) for i in item_ids])
+            chunks = self.db_manipulator.table_to_dataframe(self.rollup_table_name, search_condition,
+                                                            ['item_id', 'ts', 'close', 'volume'],
+                                                            chunksize=self.chunksize)
+            # every chunk is converted to a compact array right away, rows are never kept as Python tuples
+            data = np.concatenate([data, *(i.to_numpy(np.int64) for i in chunks)])
+
+        if not len(data):
+            empty = np.empty((0, self.days))
+            return MarketData(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), empty, empty)
+
+        ids = np.unique(data[:, 0])
+        rows = np.searchsorted(ids, data[:, 0])
+        columns = (data[:, 1] - start) // day
+
+        prices = np.full((len(ids), self.days), np.nan)
+        volumes = np.zeros((len(ids), self.days))
+        prices[rows, columns] = data[:, 2]
+        volumes[rows, columns] = data[:, 3]
+        return MarketData(ids, start + np.arange(self.days) * day, prices, volumes)
+
+    def compute(self, data: MarketData) -> list[Candidate]:
+        """Compute the metrics of all items.
+
+        Args:
+            data: aligned market data.
+
+        Returns:
+            Candidates sorted by score, items without enough sales are skipped.
+        """
+        if not len(data.item_ids):
+            return []
+
+        prices = forward_fill(data.prices)
+        with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+            warnings.simplefilter('ignore', category=RuntimeWarning)  # items without data give all-NaN slices
+
+            ma_short = moving_average(prices, self.short_window)[:, -1]
+            ma_long = moving_average(prices, self.long_window)[:, -1]
+            returns = np.diff(np.log(prices[:, -self.long_window:]), axis=1)
+            volatility = np.nanstd(returns, axis=1)
+
+            recent_volumes = data.volumes[:, -self.long_window:]
+            velocity = recent_volumes.mean(axis=1)
+            activity = (recent_volumes > 0).mean(axis=1)  # share of days with sales
+            liquidity = np.log1p(velocity) * activity
+
+            low = np.nanmin(prices[:, -self.short_window:], axis=1)
+            margin = (net_price(ma_short) - low) / low
+            score = margin * liquidity / (1 + volatility)
+
+        valid = (velocity >= self.min_velocity) & np.isfinite(score)
+        order = np.argsort(-np.where(valid, score, -np.inf))
+        return [
+            Candidate(int(data.item_ids[i]), float(prices[i, -1]), float(ma_short[i]), float(ma_long[i]),
+                      float(volatility[i]), float(velocity[i]), float(margin[i]), float(liquidity[i]),
+                      float(score[i]))
+            for i in order if valid[i]
+        ]
+
+    def rank(self, item_ids: Optional[list[int]] = None, top: Optional[int] = 50) -> list[Candidate]:
+        """Rank the items to trade.
+
+        Args:
+            item_ids: item ids, all items if None.
+            top: number of candidates, all if None.
+
+        Returns:
+            Best candidates first.
+        """
+        candidates = self.compute(self.load(item_ids))
+        return candidates if top is None else candidates[:top]
@@ -1,23 +1,48 @@
 import json
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from time import time
 from typing import Optional, Union
 
+from requests import Session, RequestException
+
 from selenium.common import TimeoutException
 from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support.expected_conditions import presence_of_element_located
 
-from settings import STEAM_LOGIN, STEAM_PASSWORD, STEAM_MAIN
+from settings import STEAM_LOGIN, STEAM_PASSWORD, STEAM_MAIN, AUTH_CHECK_TTL, WEBDRIVER_PROFILE, http_settings
 
 from trade_bot.util import get_current_date
 from lib.database_manipulator import DataBaseManipulator
 from trade_bot.web_elements import LOGIN_FIELD, PASSWORD_FIELD, AUTH_BUTTON, GLOBAL_LOGIN_BUTTON
-from lib.webdriver import Driver, get_user_agent, add_cookies
+from lib.http_session import AuthorizedSession, get_authorized_session
+from lib.metrics import get_metrics
+from lib.webdriver import Driver, get_user_agent, add_cookies, get_http_session
 
 DRIVER_TIMEOUT = 10
+DRIVER_POLL_FREQUENCY = 0.1  # seconds between element lookups, 0.5 by default
+SESSION_CHECK_URL = f'{STEAM_MAIN}/chat/clientjstoken'  # small JSON with the login state of the session
+STEAM_ID_SCRIPT = "return typeof g_steamID === 'undefined' ? null : g_steamID;"  # false - the page is anonymous
+
+
+def check_session(session: Session, timeout: float = http_settings['timeout']) -> Optional[bool]:
+    """Check whether the session is logged in with one lightweight request.
+
+    Args:
+        session: session with the cookies and user-agent of the account.
+        timeout: request timeout in seconds.
+
+    Returns:
+        True - logged in, False - logged out, None - the state is unknown (e.g. network error).
+    """
+    try:
+        response = session.get(SESSION_CHECK_URL, timeout=timeout, allow_redirects=False)
+        response.raise_for_status()
+        return bool(response.json()['logged_in'])
+    except (RequestException, ValueError, KeyError, TypeError):
+        return None
 
 
 @dataclass
@@ -33,37 +58,63 @@ class AuthorizationBase(ABC):
 @dataclass
 class Authorization(AuthorizationBase):
     driver_timeout: int = DRIVER_TIMEOUT
+    poll_frequency: float = DRIVER_POLL_FREQUENCY
 
     @staticmethod
     def find_element(waiter: WebDriverWait, locator: tuple[str, str]) -> WebElement:
-        return waiter.until(presence_of_element_located(locator))
+        with get_metrics().timer('browser_wait_seconds', locator=locator[1]):
+            return waiter.until(presence_of_element_located(locator))
 
     def find_field_send_text(self, waiter: WebDriverWait, locator: tuple[str, str], text: str) -> None:
         field = self.find_element(waiter, locator)
         field.send_keys(text)
 
-    def exec(self, cookies: Optional[list[dict]] = None) -> Union[Driver, WebDriver]:
+    def is_logged_in(self) -> Optional[bool]:
+        """Check the login state by the `g_steamID` variable of the current page, without waiting for elements.
+
+        Returns:
+            True - logged in, False - logged out, None - the page has no login state.
+        """
+        steam_id = self.driver.execute_script(STEAM_ID_SCRIPT)
+        return None if steam_id is None else bool(steam_id)
+
+    def exec(self, cookies: Optional[list[dict]] = None, valid: Optional[bool] = None) -> Union[Driver, WebDriver]:
+        """Log in, restoring the session from cookies if they are passed.
+
+        Args:
+            cookies: cookies of a previous session.
+            valid: the cookies are already known to be valid (see `check_session`).
+
+        Returns:
+            Driver instance.
+        """
         super().exec()
         self.driver.get(f'{STEAM_MAIN}/login/home')
-        waiter = WebDriverWait(self.driver, self.driver_timeout)
+        waiter = WebDriverWait(self.driver, self.driver_timeout, poll_frequency=self.poll_frequency)
 
         if cookies:
             self.driver.delete_all_cookies()
             add_cookies(self.driver, cookies)
+            self.driver.refresh()
 
-            global_login_button = self.find_element(waiter, (By.XPATH, GLOBAL_LOGIN_BUTTON))
-            global_login_button.click()
-
-            try:
-                self.find_element(waiter, (By.XPATH, AUTH_BUTTON))
-            except TimeoutException:
+            logged_in = True if valid else self.is_logged_in()
+            if logged_in:
                 return self.driver
 
+            if logged_in is None:  # no login marker on the page, the session is valid if the login form is missing
+                global_login_button = self.find_element(waiter, GLOBAL_LOGIN_BUTTON)
+                global_login_button.click()
+
+                try:
+                    self.find_element(waiter, AUTH_BUTTON)
+                except TimeoutException:
+                    return self.driver
+
         try:
-            self.find_field_send_text(waiter, (By.XPATH, LOGIN_FIELD), STEAM_LOGIN)
-            self.find_field_send_text(waiter, (By.XPATH, PASSWORD_FIELD), STEAM_PASSWORD)
+            self.find_field_send_text(waiter, LOGIN_FIELD, STEAM_LOGIN)
+            self.find_field_send_text(waiter, PASSWORD_FIELD, STEAM_PASSWORD)
 
-            auth_button = self.find_element(waiter, (By.XPATH, AUTH_BUTTON))
+            auth_button = self.find_element(waiter, AUTH_BUTTON)
             auth_button.click()
         except TypeError:
             raise TypeError('Enter steam login and password')
@@ -76,6 +127,7 @@ class Authorization(AuthorizationBase):
 @dataclass
 class AuthorizationManagerBase(ABC):
     table_name: str = 'auth'
+    check_table_name: str = 'auth_check'
     table_limit: int = 50
 
     @abstractmethod
@@ -92,6 +144,41 @@ class AuthorizationManager(AuthorizationManagerBase):
     def create_auth_table(self) -> None:
         db_fields = {'create_date': 'DATE', 'update_date': 'DATE', 'user_agent': 'TEXT', 'cookies': 'TEXT'}
         self.db_manipulator.create_table(self.table_name, db_fields)
+        self.db_manipulator.create_index(self.table_name, ['user_agent'])
+
+    def create_auth_check_table(self) -> None:
+        db_fields = {'auth_id': 'INTEGER', 'update_date': 'DATE', 'checked': 'INTEGER', 'valid': 'INTEGER'}
+        self.db_manipulator.create_table(self.check_table_name, db_fields, primary_key=('auth_id',))
+
+    def save_cred_check(self, record: tuple, valid: bool) -> None:
+        """Cache the validity of the credentials, the result is bound to their update date."""
+        self.create_auth_check_table()
+        row = {'auth_id': record[0], 'update_date': record[2], 'checked': int(time()), 'valid': int(valid)}
+        self.db_manipulator.bulk_upsert(self.check_table_name, [row], ('auth_id',))
+
+    def check_cred(self, record: tuple, session: Optional[Session] = None) -> Optional[bool]:
+        """Check whether the credentials are still logged in, within milliseconds instead of a browser login.
+
+        The result is cached for `AUTH_CHECK_TTL` seconds as long as the credentials are not updated.
+
+        Args:
+            record: credentials record.
+            session: session of the credentials, created if not passed.
+
+        Returns:
+            True - logged in, False - logged out, None - the state is unknown.
+        """
+        self.create_auth_check_table()
+        search_condition = {'auth_id': record[0], 'update_date': record[2], 'checked': ('>=', time() - AUTH_CHECK_TTL)}
+        if cached := self.db_manipulator.get_table_data(self.check_table_name, search_condition, columns=['valid']):
+            return bool(cached[0][0])
+
+        if session is None:
+            # record[3] - user_agent column, record[4] - cookie column
+            session = get_authorized_session(json.loads(record[4]), record[3], pool_size=1)
+        if (valid := check_session(session)) is not None:
+            self.save_cred_check(record, valid)
+        return valid
 
     @property
     def get_data_from_table(self) -> list[tuple]:
@@ -99,11 +186,26 @@ class AuthorizationManager(AuthorizationManagerBase):
 
     @property
     def get_valid_creds(self, ) -> Optional[list[tuple]]:
-        records: list[tuple] = self.get_data_from_table
-        valid_creds = [i for i in records if i[3] and i[4] not in '[]']
+        search_condition = {'user_agent': ('!=', ''), 'cookies': ('NOT IN', ('', '[', ']', '[]'))}
+        valid_creds: list[tuple] = self.db_manipulator.get_table_data(
+            self.table_name, search_condition, limit=self.table_limit, order_by='update_date DESC')
         if valid_creds:
             return valid_creds
 
+    def get_http_session(self, **kwargs) -> Optional[AuthorizedSession]:
+        """HTTP session of the latest valid credentials, the browser is not started.
+
+        Args:
+            kwargs: `get_session` arguments.
+
+        Returns:
+            Session instance or None if there are no valid credentials.
+        """
+        if valid_creds := self.get_valid_creds:
+            first_record = valid_creds[0]
+            # first_record[3] - user_agent column, first_record[4] - cookie column
+            return get_authorized_session(json.loads(first_record[4]), first_record[3], **kwargs)
+
     def create_or_update_cred(self, user_agent: str, cookies: Optional[str]) -> None:
         current_date = str(get_current_date())
         search_condition = {'user_agent': user_agent}
@@ -112,17 +214,30 @@ class AuthorizationManager(AuthorizationManagerBase):
 
         self.db_manipulator.create_or_update_table_data(self.table_name, data, search_condition, additional_column)
 
-    def exec(self, ) -> Union[Driver, WebDriver]:
+    def exec(self, record: Optional[tuple] = None) -> Union[Driver, WebDriver]:
+        """Get an authorized driver.
+
+        Args:
+            record: credentials record to restore, the latest valid one if not passed (see `CredentialPool`
+                for using several accounts at once).
+
+        Returns:
+            Driver instance.
+        """
         self.create_auth_table()
 
-        #  in the future you can add multithreading here
-        if valid_creds := self.get_valid_creds:
-            first_record = valid_creds[0]
-            table_user_agent: tuple[str] = (f'user-agent={first_record[3]}',)  # first_record[3] - user_agent column
-            driver = Driver(custom_settings=table_user_agent).get_driver
-            if table_cookies := first_record[4]:  # first_record[4] - cookie column
+        valid = None  # state of the restored session, known before the login only from `check_cred`
+        if record is None and (valid_creds := self.get_valid_creds):
+            record = valid_creds[0]
+        if record is not None:
+            table_user_agent: tuple[str] = (f'user-agent={record[3]}',)  # record[3] - user_agent column
+            valid = self.check_cred(record) if record[4] else None  # record[4] - cookie column
+            # a session that is known to be valid does not need a visible browser to log in
+            driver = Driver(custom_settings=table_user_agent, profile='fast' if valid else WEBDRIVER_PROFILE).get_driver
+            if table_cookies := record[4]:
                 cookies = json.loads(table_cookies)
-                driver = Authorization(driver=driver).exec(cookies=cookies)
+                # cookies known to be logged out are not restored
+                driver = Authorization(driver=driver).exec(cookies=None if valid is False else cookies, valid=valid)
         else:
             driver = Driver().get_driver
             driver = Authorization(driver=driver).exec()
@@ -130,4 +245,10 @@ class AuthorizationManager(AuthorizationManagerBase):
         user_agent = get_user_agent(driver)
         cookies = json.dumps(driver.get_cookies())
         self.create_or_update_cred(user_agent, cookies)
+        # the state of the saved session is cached, the next start does not check it again; a login that
+        # fell back to the credentials form is not confirmed until checked
+        valid = True if valid else check_session(get_http_session(driver, pool_size=1))
+        updated = self.db_manipulator.get_table_data(self.table_name, {'user_agent': user_agent}, limit=1)
+        if updated and valid is not None:
+            self.save_cred_check(updated[0], valid)
         return driver
@@ -0,0 +1,239 @@
+import json
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import partial
+from threading import Lock
+from time import monotonic, sleep
+from typing import Iterator, Optional
+
+from requests import HTTPError
+from requests.exceptions import RetryError
+from urllib3.exceptions import ResponseError
+
+from lib.driver_pool import DriverPool
+from lib.http_cache import ResponseCache
+from lib.http_session import AuthorizedSession, get_authorized_session
+from settings import credential_pool_settings
+from trade_bot.authorization import AuthorizationManager
+
+RATE_LIMIT_PAUSE = 60  # seconds, if the server does not send Retry-After
+
+
+class Strategy(Enum):
+    ROUND_ROBIN = 'round_robin'
+    BUDGET = 'budget'  # the account with the largest remaining rate budget
+
+
+@dataclass
+class RateBudget:
+    """Token bucket of one account: `rate` requests per second with bursts of up to `capacity` requests."""
+    rate: float
+    capacity: float
+    tokens: Optional[float] = None
+    updated: float = field(default_factory=monotonic)
+
+    def __post_init__(self) -> None:
+        if self.tokens is None:
+            self.tokens = self.capacity
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a request is allowed."""
+        self.refill(now)
+        return max(1 - self.tokens, 0) / self.rate
+
+    def take(self, now: float) -> None:
+        self.refill(now)
+        self.tokens -= 1
+
+    def block(self, now: float, seconds: float) -> None:
+        """Empty the bucket so that the next request is allowed in `seconds`, e.g. after HTTP 429."""
+        self.refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+@dataclass
+class Credential:
+    record: tuple  # row of the auth table
+    session: AuthorizedSession
+    budget: RateBudget
+
+    @property
+    def user_agent(self) -> str:
+        return self.record[3]  # record[3] - user_agent column
+
+
+@dataclass
+class CredentialPoolBase(ABC):
+    table_name: str = 'auth'
+    size: int = credential_pool_settings['size']
+
+    @abstractmethod
+    def acquire(self):
+        pass
+
+
+@dataclass
+class CredentialPool(CredentialPoolBase):
+    """Pool of the authorized accounts stored in the auth table.
+
+    Every account gets its own HTTP session (and, on demand, its own browser), and requests are spread across
+    the accounts round-robin or by the remaining rate budget, so the throughput grows with the number of accounts
+    instead of being capped by the rate limit of a single session.
+
+    Example:
+        pool = CredentialPool().load()
+        with pool.lease() as credential:
+            credential.session.get(url)
+    """
+    rate: float = credential_pool_settings['rate']
+    burst: int = credential_pool_settings['burst']
+    strategy: Strategy = Strategy.BUDGET
+    pool_size: int = 4  # connections per session
+    cache: Optional[ResponseCache] = None  # response cache shared by the sessions
+
+    def __post_init__(self) -> None:
+        self.credentials: list[Credential] = []
+        self._lock = Lock()
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    def load(self) -> 'CredentialPool':
+        """Restore HTTP sessions of the latest valid accounts, accounts known to be logged out are skipped.
+
+        Returns:
+            Pool instance.
+        """
+        manager = AuthorizationManager(table_name=self.table_name)
+        manager.create_auth_table()
+        credentials = []
+        for record in manager.get_valid_creds or []:
+            if len(credentials) == self.size:
+                break
+            # record[3] - user_agent column, record[4] - cookie column
+            session = get_authorized_session(json.loads(record[4]), record[3], pool_size=self.pool_size,
+                                             cache=self.cache)
+            if manager.check_cred(record, session) is not False:
+                credentials.append(Credential(record, session, RateBudget(self.rate, self.burst)))
+
+        with self._lock:
+            self.credentials = credentials
+            self._next = 0
+        return self
+
+    def choose(self, now: float) -> Optional[Credential]:
+        """Choose an account that is allowed to make a request now.
+
+        Args:
+            now: monotonic time.
+
+        Returns:
+            Credential or None if every account has exhausted its budget.
+        """
+        if self.strategy == Strategy.ROUND_ROBIN:
+            for shift in range(len(self.credentials)):
+                index = (self._next + shift) % len(self.credentials)
+                if self.credentials[index].budget.wait_time(now) == 0:
+                    self._next = index + 1
+                    return self.credentials[index]
+            return None
+
+        for i in self.credentials:
+            i.budget.refill(now)
+        credential = max(self.credentials, key=lambda i: i.budget.tokens)
+        return credential if credential.budget.tokens >= 1 else None
+
+    def acquire(self, timeout: Optional[float] = None) -> Credential:
+        """Take one request from the budget of an account, waiting while all accounts are rate limited.
+
+        Args:
+            timeout: maximum time to wait in seconds, None - wait as long as required.
+
+        Returns:
+            Credential to make the request with.
+        """
+        if not self.credentials:
+            raise CredentialPoolException('There are no valid credentials, log in first')
+
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            with self._lock:
+                now = monotonic()
+                if credential := self.choose(now):
+                    credential.budget.take(now)
+                    return credential
+                wait = min(i.budget.wait_time(now) for i in self.credentials)
+
+            if deadline is not None and now + wait > deadline:
+                raise CredentialPoolException(f'All accounts are rate limited for {wait:.1f} s')
+            sleep(wait)
+
+    def penalize(self, credential: Credential, seconds: float) -> None:
+        """Stop using an account for a while, e.g. after it was rate limited by the server.
+
+        Args:
+            credential: credential.
+            seconds: pause in seconds.
+        """
+        with self._lock:
+            credential.budget.block(monotonic(), seconds)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[Credential]:
+        """Take a credential for one request, the account is paused if the server answers with HTTP 429.
+
+        Args:
+            timeout: maximum time to wait in seconds, None - wait as long as required.
+
+        Returns:
+            Context manager with the credential.
+        """
+        credential = self.acquire(timeout)
+        try:
+            yield credential
+        except RetryError as e:
+            if is_rate_limited(e):
+                self.penalize(credential, RATE_LIMIT_PAUSE)
+            raise
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code == 429:
+                retry_after = e.response.headers.get('Retry-After', '')
+                self.penalize(credential, float(retry_after) if retry_after.isdigit() else RATE_LIMIT_PAUSE)
+            raise
+
+    def get_driver_pool(self, credential: Credential, **kwargs) -> DriverPool:
+        """Pool of browsers restored with the cookies and user-agent of the account.
+
+        Args:
+            credential: credential.
+            kwargs: `DriverPool` arguments.
+
+        Returns:
+            Driver pool, not started.
+        """
+        factory = partial(AuthorizationManager(table_name=self.table_name).exec, credential.record)
+        return DriverPool(factory=factory, **kwargs)
+
+
+def is_rate_limited(error: RetryError) -> bool:
+    """Whether the retries of a session were exhausted on HTTP 429 responses.
+
+    Args:
+        error: error raised by the session, it wraps the urllib3 `MaxRetryError`.
+
+    Returns:
+        True - the last retried response was HTTP 429.
+    """
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, ResponseError) and str(reason) == ResponseError.SPECIFIC_ERROR.format(status_code=429)
+
+
+class CredentialPoolException(Exception):
+    pass
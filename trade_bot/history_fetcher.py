@@ -0,0 +1,105 @@
+import json
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict
+from time import time
+from typing import Optional
+
+from requests import Session
+
+from lib.http_cache import CacheEntry, ResponseCache, get_response_cache
+from lib.http_session import get_session
+from trade_bot.credential_pool import CredentialPool
+from trade_bot.item_history import ItemHistory
+from trade_bot.listing_extractor import ListingData
+from trade_bot.util import CategoryTrade
+from settings import STEAM_MAIN, http_cache_settings
+
+
+@dataclass
+class HistoryBatchFetcherBase(ABC):
+    items: list[tuple[CategoryTrade, str]]
+
+    @abstractmethod
+    def exec(self):
+        pass
+
+
+@dataclass
+class HistoryBatchFetcher(HistoryBatchFetcherBase):
+    """Class for refreshing the price history of many items.
+
+    Listing pages are streamed concurrently by a bounded pool of workers sharing one keep-alive session,
+    and the extracted data is saved in the calling thread as soon as each download completes. The extracted
+    data, not the page, is kept in the response cache, so pages fetched within their TTL are neither downloaded
+    nor parsed again, and the download still stops as soon as the data is found.
+    """
+    max_workers: int = 8
+    session: Optional[Session] = None
+    market_url: str = STEAM_MAIN
+    errors: dict[tuple[CategoryTrade, str], Exception] = field(default_factory=dict)
+    credentials: Optional[CredentialPool] = None  # spread the requests across several accounts
+    cache: Optional[ResponseCache] = None  # response cache of `session`
+
+    def __post_init__(self) -> None:
+        if self.session is None:
+            if self.cache is None and http_cache_settings['enabled']:
+                self.cache = get_response_cache()
+            self.session = get_session(pool_size=self.max_workers, cache=self.cache)
+
+    @staticmethod
+    def get_cache_key(history: ItemHistory) -> str:
+        return f'{history.get_item_link}#listing'  # never requested, the page itself is not stored
+
+    def get_cached_listing(self, history: ItemHistory) -> Optional[ListingData]:
+        """Data extracted from the listing page within its TTL, None if there is none."""
+        if self.cache is None or (entry := self.cache.get(self.get_cache_key(history))) is None or not entry.is_fresh:
+            return None
+        self.cache.count('hit')
+        return ListingData(**json.loads(entry.body))
+
+    def cache_listing(self, history: ItemHistory, listing: ListingData) -> None:
+        """Store the data extracted from the listing page for the TTL of the page."""
+        if self.cache is None or not listing.complete or (ttl := self.cache.get_ttl(history.get_item_link)) is None:
+            return
+        body = json.dumps(asdict(listing)).encode()
+        self.cache.put(CacheEntry(self.get_cache_key(history), 200, {'Content-Type': 'application/json'}, body,
+                                  time() + ttl))
+
+    def get_item_history(self, category: CategoryTrade, item_name: str) -> ItemHistory:
+        return ItemHistory(category, item_name, session=self.session, market_url=self.market_url)
+
+    def fetch_listing_data(self, history: ItemHistory) -> ListingData:
+        if (listing := self.get_cached_listing(history)) is not None:  # no request budget is spent on cached pages
+            return listing
+
+        if self.credentials is None:
+            listing = history.get_listing_data
+        else:
+            with self.credentials.lease() as credential:  # the request is made from the account with free budget
+                history.session = credential.session
+                listing = history.get_listing_data
+        self.cache_listing(history, listing)
+        return listing
+
+    def exec(self) -> list[tuple[CategoryTrade, str]]:
+        """Refresh the price history of all items.
+
+        Returns:
+            Items that were not refreshed, the reasons are stored in `errors`.
+        """
+        self.errors.clear()
+        histories = [self.get_item_history(category, item_name) for category, item_name in self.items]
+        if histories:
+            histories[0].create_tables()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch_listing_data, i): i for i in histories}
+            for future in as_completed(futures):
+                history = futures[future]
+                try:
+                    history.exec(future.result())
+                except Exception as e:  # one failed item (download, parsing, saving) does not abort the batch
+                    self.errors[(history.category, history.item_name)] = e
+
+        return list(self.errors)
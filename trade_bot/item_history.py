@@ -1,16 +1,21 @@
-import json
-import re
+import codecs
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import timedelta
+from typing import Optional, Iterator
 
 from pandas import DataFrame, to_datetime
-from requests import get
+from requests import Session, get
 from urllib.parse import quote
 
 from lib.database_manipulator import DataBaseManipulator
-from trade_bot.util import CategoryTrade, get_current_date
-from settings import STEAM_MAIN
+from lib.metrics import get_metrics
+from trade_bot.item_registry import ItemNameIdRegistry, get_item_registry
+from trade_bot.listing_extractor import ListingData, ListingPageExtractor
+from trade_bot.price_history import PriceHistoryStorage
+from trade_bot.rollup import HistoryRollup
+from trade_bot.util import CategoryTrade
+from settings import STEAM_MAIN, http_settings
 
 
 @dataclass
@@ -28,65 +33,111 @@ class ItemHistory(ItemHistoryBase):
     items_table_name: str = 'items_table'
     global_history_table_name: str = 'global_history_table'
     local_history_table_name: str = 'local_history_table'
+    rollup_table_name: str = 'history_rollup_table'
+    incremental: bool = True
+    session: Optional[Session] = None
+    market_url: str = STEAM_MAIN
 
     def __post_init__(self) -> None:
         self.db_manipulator = DataBaseManipulator()
-        self.item_name_id_regexp = 'Market_LoadOrderSpread\((.*)\);'
-        self.prise_history_regexp = 'var line1=(.*);'
 
     @property
     def get_item_link(self) -> str:
-        return f'{STEAM_MAIN}/market/listings/{self.category}/{quote(self.item_name)}'
+        return f'{self.market_url}/market/listings/{self.category}/{quote(self.item_name)}'
 
     @property
-    def get_html(self):
-        return get(self.get_item_link).text
+    def get_html(self) -> str:
+        request = self.session.get if self.session else get
+        with get_metrics().timer('http_fetch_seconds', page='listing'):
+            response = request(self.get_item_link, timeout=http_settings['timeout'])
+            response.raise_for_status()
+            return response.text
+
+    @property
+    def iter_html(self) -> Iterator[str]:
+        """Listing page downloaded in chunks, the connection is closed when the generator is closed."""
+        request = self.session.get if self.session else get
+        with request(self.get_item_link, timeout=http_settings['timeout'], stream=True) as response:
+            response.raise_for_status()
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+            for chunk in response.iter_content(chunk_size=http_settings['chunk_size']):
+                yield decoder.decode(chunk)
+
+    @property
+    def get_listing_data(self) -> ListingData:
+        """Item id and price history, the download stops as soon as both have been found."""
+        chunks = self.iter_html
+        try:
+            with get_metrics().timer('listing_seconds'):  # download and extraction
+                return ListingPageExtractor().extract(chunks)
+        finally:
+            if close := getattr(chunks, 'close', None):
+                close()
+
+    @property
+    def item_registry(self) -> ItemNameIdRegistry:
+        return get_item_registry(self.items_table_name)
 
     def create_items_table(self) -> None:
-        db_fields = {'create_date': 'DATE', 'category': 'TEXT', 'name': 'TEXT'}
-        self.db_manipulator.create_table(self.items_table_name, db_fields)
+        self.item_registry.create_items_table()
+
+    def create_tables(self) -> None:
+        """Create the items, history and rollup tables in one transaction, before the items are processed."""
+        with self.db_manipulator.transaction():
+            self.create_items_table()
+            self.price_history.create_history_tables()
+            self.rollup.create_rollup_table()
 
     def create_or_update_items_table_data(self, item_name_id: int, category: CategoryTrade, name: str) -> None:
-        data = {
-            'id': item_name_id,
-            'create_date': str(get_current_date()),
-            'category': str(category.name),
-            'name': name
-        }
-        search_condition = {'id': item_name_id}
-        self.db_manipulator.create_or_update_table_data(self.items_table_name, data, search_condition)
-        self.db_manipulator.create_table_data(self.items_table_name, data)
+        self.item_registry.register(item_name_id, category, name)
 
-    def exec(self):
-        html = self.get_html
-        if item_name_id := re.findall(self.item_name_id_regexp, html):
-            item_name_id = item_name_id[0]
-            self.create_items_table()
+    @property
+    def price_history(self) -> PriceHistoryStorage:
+        return PriceHistoryStorage(self.global_history_table_name, self.local_history_table_name,
+                                   self.rollup_table_name)
+
+    @property
+    def rollup(self) -> HistoryRollup:
+        return HistoryRollup(self.rollup_table_name)
+
+    def store_history(self, item_name_id: int, df: DataFrame, df_recent_month_hourly: DataFrame) -> None:
+        """Save the price history of the item.
+
+        In incremental mode only new rows are written and history of other items is kept,
+        otherwise both history tables are replaced entirely. OHLCV bars of the written time range are rebuilt.
+
+        Args:
+            item_name_id: item id.
+            df: history older than 31 days.
+            df_recent_month_hourly: hourly history for the last 31 days.
+        """
+        rows = self.price_history.save(item_name_id, df, df_recent_month_hourly, incremental=self.incremental)
+        self.rollup.update(item_name_id, rows)
+
+    def exec(self, listing: Optional[ListingData] = None):
+        """Save the id and the price history of the item.
+
+        Args:
+            listing: data of the listing page, downloaded if not passed.
+        """
+        if listing is None:
+            listing = self.get_listing_data
+
+        if item_name_id := listing.item_name_id:
             self.create_or_update_items_table_data(item_name_id, self.category, self.item_name)
 
-        if prise_history := re.findall(self.prise_history_regexp, html):
-            df = DataFrame(json.loads(prise_history[0]), columns=['date', 'price', 'volume'])
-            df.date = to_datetime(df.date.str.replace(': +0', ''), format='%b %d %Y %H')
-            df.volume = df.volume.astype(int)
-            df['item_id'] = int(item_name_id)
-
-            condition = df.date > to_datetime(df.date.max()) - timedelta(days=31)
-            #  the most current date in the table subtract 31 days
-            df_recent_month_hourly = df.loc[condition].copy()
-            df = df.loc[~condition]
-
-            self.db_manipulator.dataframe_to_table(df, self.global_history_table_name,
-                                                   {'index': False, 'if_exists': 'replace'})
-
-            self.db_manipulator.dataframe_to_table(df_recent_month_hourly, self.local_history_table_name,
-                                                   {'index': False, 'if_exists': 'replace'})
-
-            # inaccurate data for the last 31 days
-            # df_recent_month = df_recent_month_hourly.groupby(df['date'].dt.date).mean()
-            # # calculating daily averages
-            # df_recent_month.volume = df_recent_month.volume.astype(int)
-            # df_recent_month.date = df_recent_month.date.dt.floor('D') + timedelta(hours=1)
-            # # to format %Y-%m-%d 01:00:00
-            # concat([df, df_recent_month], ignore_index=True)
+        if listing.price_history is not None:
+            with get_metrics().timer('parse_seconds', page='price_history'):
+                df = DataFrame(listing.price_history, columns=['date', 'price', 'volume'])
+                df.date = to_datetime(df.date.str.replace(': +0', ''), format='%b %d %Y %H')
+                df.volume = df.volume.astype(int)
+                df['item_id'] = item_name_id
+
+                condition = df.date > to_datetime(df.date.max()) - timedelta(days=31)
+                #  the most current date in the table subtract 31 days
+                df_recent_month_hourly = df.loc[condition].copy()
+                df = df.loc[~condition]
+
+            self.store_history(item_name_id, df, df_recent_month_hourly)
 
         # https://steamcommunity.com/market/itemordershistogram?language=english&currency=3&item_nameid=2384820
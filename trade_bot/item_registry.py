@@ -0,0 +1,171 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from threading import Lock
+from typing import Optional
+
+from lib.database_manipulator import DataBaseManipulator
+from trade_bot.util import CategoryTrade, get_current_date
+
+
+@dataclass
+class ItemNameIdRegistryBase(ABC):
+    table_name: str = 'items_table'
+
+    @abstractmethod
+    def resolve(self, category: CategoryTrade, name: str) -> Optional[int]:
+        pass
+
+
+@dataclass
+class ItemNameIdRegistry(ItemNameIdRegistryBase):
+    """Registry of item ids (item_nameid) by category and name.
+
+    Lookups go to an in-memory LRU cache first and to the items table second, so the listing page only has
+    to be downloaded for items that were never seen. Use `get_item_registry` to share one registry per table.
+    """
+    max_size: int = 50000
+
+    def __post_init__(self) -> None:
+        self.db_manipulator = DataBaseManipulator()
+        self._cache: OrderedDict[tuple[CategoryTrade, str], int] = OrderedDict()
+        self._lock = Lock()
+
+    def create_items_table(self) -> None:
+        """Create the items table with a unique index on (category, name), so a name has exactly one id."""
+        db_fields = {'create_date': 'DATE', 'category': 'TEXT', 'name': 'TEXT'}
+        self.db_manipulator.create_table(self.table_name, db_fields)
+
+        index_name = f'uq_{self.table_name}_category_name'
+        if index_name not in self.db_manipulator.db_manager.load_schema().indexes:
+            # tables created before the index may hold a name under several ids, the highest one is kept
+            self.db_manipulator.db_manager.execute(f'''
+                DELETE FROM {self.table_name}
+                WHERE rowid NOT IN (SELECT MAX(rowid) FROM {self.table_name} GROUP BY category, name)
+            ''')
+            self.db_manipulator.create_index(self.table_name, ['category', 'name'], unique=True,
+                                             index_name=index_name)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @property
+    def item_ids(self) -> list[int]:
+        """Ids of the cached items."""
+        with self._lock:
+            return list(self._cache.values())
+
+    def cache(self, item_name_id: int, category: CategoryTrade, name: str) -> None:
+        with self._lock:
+            self._cache[(category, name)] = item_name_id
+            self._cache.move_to_end((category, name))
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def get(self, category: CategoryTrade, name: str) -> Optional[int]:
+        """Get the item id from memory only.
+
+        Args:
+            category: item category.
+            name: item name.
+
+        Returns:
+            Item id or None if the item is not cached.
+        """
+        with self._lock:
+            if (item_name_id := self._cache.get((category, name))) is not None:
+                self._cache.move_to_end((category, name))
+            return item_name_id
+
+    def resolve(self, category: CategoryTrade, name: str, fetch_missing: bool = False) -> Optional[int]:
+        """Get the item id from memory, then from the items table, then from the listing page.
+
+        Args:
+            category: item category.
+            name: item name.
+            fetch_missing: download the listing page if the item is unknown.
+
+        Returns:
+            Item id or None if the item is unknown.
+        """
+        if (item_name_id := self.get(category, name)) is not None:
+            return item_name_id
+
+        if self.db_manipulator.check_table_exist(self.table_name):
+            if records := self.db_manipulator.get_table_data(
+                    self.table_name, {'category': category.name, 'name': name}, limit=1
+            ):
+                item_name_id = records[0][0]  # records[0][0] - id column
+                self.cache(item_name_id, category, name)
+                return item_name_id
+
+        if fetch_missing:
+            from trade_bot.item_history import ItemHistory
+
+            if (item_name_id := ItemHistory(category, name).get_listing_data.item_name_id) is not None:
+                self.register(item_name_id, category, name)
+            return item_name_id
+
+    def register(self, item_name_id: int, category: CategoryTrade, name: str) -> None:
+        """Save the item id in memory and in the items table.
+
+        Args:
+            item_name_id: item id.
+            category: item category.
+            name: item name.
+        """
+        self.register_many([(item_name_id, category, name)])
+
+    def register_many(self, items: list[tuple[int, CategoryTrade, str]]) -> None:
+        """Save many item ids in memory and in the items table with one statement per batch.
+
+        Args:
+            items: item id, category and name of every item.
+        """
+        items = [i for i in items if self.get(i[1], i[2]) != i[0]]  # skip items that are already saved
+        if not items:
+            return
+
+        current_date = str(get_current_date())
+        rows = [
+            {'id': item_name_id, 'create_date': current_date, 'category': category.name, 'name': name}
+            for item_name_id, category, name in items
+        ]
+        self.create_items_table()
+        # concurrent registrations of a name update one record instead of inserting duplicates
+        self.db_manipulator.bulk_upsert(self.table_name, rows, ('category', 'name'), update_columns=('id',))
+        for item in items:
+            self.cache(*item)
+
+    def preload(self) -> int:
+        """Load known items from the items table into memory, meant to be called at startup.
+
+        Returns:
+            Number of cached items.
+        """
+        if not self.db_manipulator.check_table_exist(self.table_name):
+            return 0
+
+        for item_name_id, _, category, name in self.db_manipulator.get_table_data(self.table_name,
+                                                                                  limit=self.max_size):
+            if category in CategoryTrade.__members__:
+                self.cache(item_name_id, CategoryTrade[category], name)
+        return len(self)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+@lru_cache(maxsize=None)
+def get_item_registry(table_name: str = 'items_table') -> ItemNameIdRegistry:
+    """Method for getting the registry shared by all users of the table.
+
+    Args:
+        table_name: items table name.
+
+    Returns:
+        Registry instance.
+    """
+    return ItemNameIdRegistry(table_name=table_name)
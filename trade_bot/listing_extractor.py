@@ -0,0 +1,97 @@
+import json
+import re
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Optional, Iterable
+
+from lib.metrics import get_metrics
+
+
+@dataclass
+class ListingData:
+    """Data extracted from the listing page of an item."""
+    item_name_id: Optional[int] = None
+    price_history: Optional[list[list]] = None  # [['Nov 28 2013 01: +0', 6.061, '22'], ...]
+
+    @property
+    def complete(self) -> bool:
+        return self.item_name_id is not None and self.price_history is not None
+
+
+@dataclass
+class ListingPageExtractor:
+    """Incremental extractor of the item_nameid and the price history from a listing page.
+
+    The page is fed in chunks and scanned line by line (both markers are single-line scripts), so only the line
+    being received is kept in memory. Extraction stops as soon as both values have been found.
+    """
+    item_name_id_regexp: re.Pattern = re.compile(r'Market_LoadOrderSpread\((.*)\);')
+    price_history_regexp: re.Pattern = re.compile(r'var line1=(.*);')
+    data: ListingData = field(default_factory=ListingData)
+
+    def __post_init__(self) -> None:
+        self._tail: list[str] = []
+
+    def scan_line(self, line: str) -> None:
+        if self.data.item_name_id is None and 'Market_LoadOrderSpread(' in line:
+            if match := self.item_name_id_regexp.search(line):
+                self.data.item_name_id = int(match.group(1))
+
+        if self.data.price_history is None and 'var line1=' in line:
+            if match := self.price_history_regexp.search(line):
+                self.data.price_history = json.loads(match.group(1))
+
+    def feed(self, chunk: str) -> bool:
+        """Scan the next chunk of the page.
+
+        Args:
+            chunk: part of the page.
+
+        Returns:
+            True - all data has been found and the rest of the page is not needed.
+        """
+        if '\n' not in chunk:
+            self._tail.append(chunk)
+            return self.data.complete
+
+        self._tail.append(chunk)
+        *lines, tail = ''.join(self._tail).split('\n')
+        self._tail = [tail] if tail else []
+        for line in lines:
+            self.scan_line(line)
+            if self.data.complete:
+                break
+        return self.data.complete
+
+    def close(self) -> ListingData:
+        """Scan the last unterminated line of the page.
+
+        Returns:
+            Extracted data.
+        """
+        if self._tail and not self.data.complete:
+            self.scan_line(''.join(self._tail))
+        self._tail = []
+        return self.data
+
+    def extract(self, chunks: Iterable[str]) -> ListingData:
+        """Extract data from the page, stops reading the chunks once everything has been found.
+
+        Args:
+            chunks: parts of the page.
+
+        Returns:
+            Extracted data.
+        """
+        elapsed = 0.0  # time spent scanning, without waiting for the chunks
+        for chunk in chunks:
+            start = perf_counter()
+            complete = self.feed(chunk)
+            elapsed += perf_counter() - start
+            if complete:
+                break
+
+        start = perf_counter()
+        data = self.close()
+        get_metrics().observe('parse_seconds', elapsed + perf_counter() - start, page='listing')
+        return data
@@ -0,0 +1,295 @@
+import sys
+import time
+from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import Optional, Iterator
+
+from requests import Session, RequestException
+
+from lib.database_manipulator import DataBaseManipulator
+from lib.http_session import get_session
+from trade_bot.item_registry import get_item_registry
+from trade_bot.util import CategoryTrade
+from settings import STEAM_MAIN, http_settings
+
+
+def pack(values: list[int]) -> bytes:
+    """Pack integers into a little-endian int32 array."""
+    packed = array('i', values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack(data: Optional[bytes]) -> list[int]:
+    """Unpack a little-endian int32 array."""
+    packed = array('i')
+    packed.frombytes(data or b'')
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tolist()
+
+
+def to_cents(price: float) -> int:
+    return int(round(price * 100))
+
+
+@dataclass
+class OrderBookSide:
+    """One side of the order book: prices in cents from the best one and cumulative quantities."""
+    prices: list[int] = field(default_factory=list)
+    quantities: list[int] = field(default_factory=list)
+
+    @classmethod
+    def from_graph(cls, graph: Optional[list[list]]) -> 'OrderBookSide':
+        """Side from `buy_order_graph` / `sell_order_graph`: [[price, cumulative quantity, label], ...]."""
+        graph = graph or []
+        return cls([to_cents(i[0]) for i in graph], [int(i[1]) for i in graph])
+
+    @property
+    def levels(self) -> dict[int, int]:
+        """Quantity at every price level."""
+        return dict(zip(self.prices, (b - a for a, b in zip([0] + self.quantities, self.quantities))))
+
+    @classmethod
+    def from_levels(cls, levels: dict[int, int], descending: bool) -> 'OrderBookSide':
+        prices = sorted((k for k, v in levels.items() if v), reverse=descending)
+        return cls(prices, list(accumulate(levels[i] for i in prices)))
+
+    def delta(self, previous: 'OrderBookSide') -> tuple[list[int], list[int]]:
+        """Levels whose quantity differs from the previous snapshot, removed levels have quantity 0."""
+        levels, previous_levels = self.levels, previous.levels
+        changed = {k: v for k, v in levels.items() if previous_levels.get(k) != v}
+        changed |= {k: 0 for k in previous_levels.keys() - levels.keys()}
+        return list(changed), list(changed.values())
+
+    def apply_delta(self, prices: list[int], quantities: list[int], descending: bool) -> 'OrderBookSide':
+        return self.from_levels(self.levels | dict(zip(prices, quantities)), descending)
+
+
+@dataclass
+class OrderBook:
+    item_id: int
+    ts: int  # epoch seconds
+    buy: OrderBookSide = field(default_factory=OrderBookSide)
+    sell: OrderBookSide = field(default_factory=OrderBookSide)
+
+    @classmethod
+    def from_histogram(cls, item_id: int, ts: int, histogram: dict) -> 'OrderBook':
+        """Order book from the `/market/itemordershistogram` response."""
+        return cls(item_id, ts, OrderBookSide.from_graph(histogram.get('buy_order_graph')),
+                   OrderBookSide.from_graph(histogram.get('sell_order_graph')))
+
+
+@dataclass
+class OrderBookStorageBase(ABC):
+    table_name: str = 'order_book_table'
+
+    @abstractmethod
+    def save(self, order_books: list[OrderBook]) -> None:
+        pass
+
+
+@dataclass
+class OrderBookStorage(OrderBookStorageBase):
+    """Compact storage of order book snapshots.
+
+    Every `keyframe_interval`-th snapshot of an item (and the first one after start) is a keyframe with all prices
+    in cents and cumulative quantities packed as int32 arrays. Other snapshots only store the price levels whose
+    quantity changed since the previous snapshot, which are usually a handful. Replay starts from the nearest
+    keyframe and applies the deltas.
+    """
+    keyframe_interval: int = 48
+
+    def __post_init__(self) -> None:
+        self.db_manipulator = DataBaseManipulator()
+        self._last: dict[int, tuple[OrderBook, int]] = {}  # item id - last snapshot, snapshots since keyframe
+
+    def create_order_book_table(self) -> None:
+        db_fields = {
+            'item_id': 'INTEGER', 'ts': 'INTEGER', 'keyframe': 'INTEGER',
+            'buy_prices': 'BLOB', 'buy_quantities': 'BLOB', 'sell_prices': 'BLOB', 'sell_quantities': 'BLOB',
+        }
+        self.db_manipulator.create_table(self.table_name, db_fields, unique_keys=('item_id', 'ts'))
+
+    def last_snapshot(self, item_id: int) -> Optional[OrderBook]:
+        """Last snapshot of the item saved by this storage, None if there is none since start."""
+        return self._last.get(item_id, (None, 0))[0]
+
+    def encode(self, order_book: OrderBook, pending: dict[int, tuple[OrderBook, int]]) -> dict:
+        """Row of the snapshot, a keyframe or a delta against the previous snapshot of the item.
+
+        Args:
+            order_book: snapshot.
+            pending: snapshots of the batch being encoded, they become the previous ones only once stored.
+
+        Returns:
+            Table row.
+        """
+        previous, count = pending.get(order_book.item_id) or self._last.get(order_book.item_id, (None, 0))
+        keyframe = previous is None or previous.ts == order_book.ts or count + 1 >= self.keyframe_interval
+        pending[order_book.item_id] = (order_book, 0 if keyframe else count + 1)
+
+        if keyframe:
+            sides = (order_book.buy.prices, order_book.buy.quantities,
+                     order_book.sell.prices, order_book.sell.quantities)
+        else:
+            sides = order_book.buy.delta(previous.buy) + order_book.sell.delta(previous.sell)
+
+        return {
+            'item_id': order_book.item_id,
+            'ts': order_book.ts,
+            'keyframe': int(keyframe),
+            **dict(zip(('buy_prices', 'buy_quantities', 'sell_prices', 'sell_quantities'), map(pack, sides))),
+        }
+
+    def save(self, order_books: list[OrderBook]) -> None:
+        """Save snapshots, one statement for the whole batch.
+
+        Args:
+            order_books: snapshots in chronological order per item.
+        """
+        if not order_books:
+            return
+
+        pending = {}
+        rows = [self.encode(i, pending) for i in order_books]
+        self.create_order_book_table()
+        self.db_manipulator.bulk_upsert(self.table_name, rows, ('item_id', 'ts'))
+        self._last.update(pending)  # if the write fails, the next snapshots are encoded against the stored ones
+
+    def replay(self, item_id: int, limit: int = 100000) -> Iterator[OrderBook]:
+        """Restore the most recent snapshots of the item in chronological order.
+
+        Args:
+            item_id: item id.
+            limit: maximum number of the most recent stored rows to read, deltas preceding the first keyframe
+                among them are skipped.
+
+        Returns:
+            Generator of snapshots.
+        """
+        order_book: Optional[OrderBook] = None
+        rows = self.db_manipulator.get_table_data(
+            self.table_name, {'item_id': item_id}, limit=limit, order_by='ts DESC',
+            columns=['ts', 'keyframe', 'buy_prices', 'buy_quantities', 'sell_prices', 'sell_quantities'])
+        for ts, keyframe, buy_prices, buy_quantities, sell_prices, sell_quantities in reversed(rows):
+            if keyframe:
+                order_book = OrderBook(item_id, ts, OrderBookSide(unpack(buy_prices), unpack(buy_quantities)),
+                                       OrderBookSide(unpack(sell_prices), unpack(sell_quantities)))
+            elif order_book is not None:
+                order_book = OrderBook(
+                    item_id, ts,
+                    order_book.buy.apply_delta(unpack(buy_prices), unpack(buy_quantities), descending=True),
+                    order_book.sell.apply_delta(unpack(sell_prices), unpack(sell_quantities), descending=False),
+                )
+            else:
+                continue  # deltas without a keyframe can't be restored
+            yield order_book
+
+
+@dataclass
+class OrderBookPollerBase(ABC):
+    item_ids: list[int]
+
+    @abstractmethod
+    def exec(self):
+        pass
+
+
+@dataclass
+class OrderBookPoller(OrderBookPollerBase):
+    """Class for polling buy/sell order histograms of many items on a schedule.
+
+    Histograms are fetched concurrently over one keep-alive session and saved in one batch per round.
+    """
+    interval: int = 300  # seconds between polls
+    max_workers: int = 8
+    currency: int = 1
+    language: str = 'english'
+    country: str = 'US'
+    session: Optional[Session] = None
+    market_url: str = STEAM_MAIN
+    storage: OrderBookStorage = field(default_factory=OrderBookStorage)
+    errors: dict[int, Exception] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if self.session is None:
+            self.session = get_session(pool_size=self.max_workers)
+
+    @classmethod
+    def for_items(cls, items: list[tuple[CategoryTrade, str]], **kwargs) -> 'OrderBookPoller':
+        """Poller for items given by category and name, ids are resolved through the item registry.
+
+        Args:
+            items: category and name of every item.
+            kwargs: poller parameters.
+
+        Returns:
+            Poller instance.
+        """
+        registry = get_item_registry()
+        item_ids = [registry.resolve(category, name, fetch_missing=True) for category, name in items]
+        return cls([i for i in item_ids if i is not None], **kwargs)
+
+    def get_histogram_link(self, item_id: int) -> str:
+        return (f'{self.market_url}/market/itemordershistogram?country={self.country}&language={self.language}'
+                f'&currency={self.currency}&item_nameid={item_id}&two_factor=0')
+
+    def fetch(self, item_id: int) -> OrderBook:
+        response = self.session.get(self.get_histogram_link(item_id), timeout=http_settings['timeout'])
+        response.raise_for_status()
+        histogram = response.json()
+        if histogram.get('success') != 1:
+            raise ValueError(f'Order book of the item {item_id} is not available')
+        return OrderBook.from_histogram(item_id, int(time.time()), histogram)
+
+    def poll_item(self, item_id: int) -> bool:
+        """Fetch and save the order book of one item, meant to be the task of `PollScheduler`.
+
+        Args:
+            item_id: item id.
+
+        Returns:
+            True - the order book differs from the previous snapshot.
+        """
+        order_book = self.fetch(item_id)
+        previous = self.storage.last_snapshot(item_id)
+        self.storage.save([order_book])
+        return previous is None or (previous.buy, previous.sell) != (order_book.buy, order_book.sell)
+
+    def poll_once(self) -> list[int]:
+        """Fetch and save the order books of all items once.
+
+        Returns:
+            Items that were not polled, the reasons are stored in `errors`.
+        """
+        self.errors.clear()
+        order_books = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch, i): i for i in self.item_ids}
+            for future in as_completed(futures):
+                try:
+                    order_books.append(future.result())
+                except (RequestException, ValueError) as e:
+                    self.errors[futures[future]] = e
+
+        self.storage.save(order_books)
+        return list(self.errors)
+
+    def exec(self, iterations: Optional[int] = None) -> None:
+        """Poll the order books every `interval` seconds.
+
+        Args:
+            iterations: number of polls, endless if not passed.
+        """
+        iteration = 0
+        while iterations is None or iteration < iterations:
+            start = time.monotonic()
+            self.poll_once()
+            iteration += 1
+            if iterations is None or iteration < iterations:
+                time.sleep(max(0.0, self.interval - (time.monotonic() - start)))
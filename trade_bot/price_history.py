@@ -0,0 +1,165 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+
+from pandas import DataFrame
+
+from lib.database_manipulator import DataBaseManipulator
+from trade_bot.rollup import HistoryRollup
+
+HISTORY_FIELDS = {'item_id': 'INTEGER NOT NULL', 'ts': 'INTEGER NOT NULL', 'price': 'INTEGER', 'volume': 'INTEGER'}
+#  ts - epoch seconds (UTC), price - cents
+
+
+@dataclass
+class PriceHistoryStorageBase(ABC):
+    global_table_name: str = 'global_history_table'
+    local_table_name: str = 'local_history_table'
+    rollup_table_name: str = 'history_rollup_table'
+
+    @abstractmethod
+    def save(self, item_id: int, df: DataFrame, df_recent_month_hourly: DataFrame) -> None:
+        pass
+
+
+@dataclass
+class PriceHistoryStorage(PriceHistoryStorageBase):
+    """Storage of item price history.
+
+    Rows are kept in WITHOUT ROWID tables clustered by the (item_id, ts) primary key, with epoch-second timestamps
+    and integer-cent prices, so the history of an item is one contiguous range of the table. The global table
+    holds the history older than 31 days, the local table the rolling 31-day hourly window.
+    """
+
+    def __post_init__(self) -> None:
+        self.db_manipulator = DataBaseManipulator()
+
+    def create_history_tables(self) -> None:
+        """Create the history tables, tables of the previous schema (date text, price float) are migrated.
+
+        The migrated history is rolled up once, it was stored before the rollup table existed.
+        """
+        migrated = False
+        for table_name in (self.global_table_name, self.local_table_name):
+            if 'date' in self.db_manipulator.get_table_columns(table_name):
+                self.migrate_table(table_name)
+                migrated = True
+            elif (not self.db_manipulator.check_table_exist(table_name)
+                  and self.db_manipulator.check_table_exist(f'{table_name}_compact')):
+                # complete copy left by a migration that was interrupted before it was made atomic
+                self.db_manipulator.db_manager.execute(f'ALTER TABLE {table_name}_compact RENAME TO {table_name}')
+                migrated = True
+            else:
+                self.create_history_table(table_name)
+
+        if migrated:
+            self.backfill_rollup()
+
+    def create_history_table(self, table_name: str) -> None:
+        self.db_manipulator.create_table(table_name, HISTORY_FIELDS, primary_key=('item_id', 'ts'),
+                                         without_rowid=True)
+
+    def migrate_table(self, table_name: str) -> None:
+        """Copy a table of the previous schema (date, price, volume, item_id) into the compact one.
+
+        Data is copied into a new table that replaces the old one, all in one transaction (DDL included),
+        so an interrupted migration leaves the old table untouched and is restarted on the next call.
+
+        Args:
+            table_name: table name.
+        """
+        compact_table_name = f'{table_name}_compact'
+        with self.db_manipulator.transaction():
+            self.db_manipulator.delete_table(compact_table_name)
+            self.create_history_table(compact_table_name)
+            self.db_manipulator.db_manager.execute(f'''
+                INSERT OR REPLACE INTO {compact_table_name} (item_id, ts, price, volume)
+                SELECT item_id, CAST(strftime('%s', date) AS INTEGER), CAST(ROUND(price * 100) AS INTEGER), volume
+                FROM {table_name}
+                WHERE item_id IS NOT NULL AND date IS NOT NULL
+            ''')
+            self.db_manipulator.delete_table(table_name)
+            self.db_manipulator.db_manager.execute(f'ALTER TABLE {compact_table_name} RENAME TO {table_name}')
+
+    def backfill_rollup(self) -> None:
+        """Roll up the whole history of every item in one transaction."""
+        rollup = HistoryRollup(self.rollup_table_name)
+        with self.db_manipulator.transaction():
+            item_ids = set()
+            for table_name in (self.global_table_name, self.local_table_name):
+                item_ids.update(i for i, in self.db_manipulator.db_manager.execute(
+                    f'SELECT DISTINCT item_id FROM {table_name}'))
+            for item_id in sorted(item_ids):
+                rows = [dict(zip(('ts', 'price', 'volume'), i)) for i in self.get_history(item_id)]
+                rollup.update(item_id, rows)
+
+    @staticmethod
+    def to_rows(df: DataFrame) -> list[dict]:
+        """Convert a history dataframe (date, price, volume, item_id) into table rows.
+
+        Args:
+            df: history dataframe, dates are naive UTC.
+
+        Returns:
+            Rows with epoch-second timestamps and integer-cent prices.
+        """
+        return DataFrame({
+            'item_id': df.item_id.astype('int64'),
+            'ts': df.date.astype('datetime64[s]').astype('int64'),
+            'price': (df.price * 100).round().astype('int64'),
+            'volume': df.volume.astype('int64'),
+        }).to_dict('records')
+
+    def get_last_ts(self, item_id: int) -> Optional[int]:
+        return self.db_manipulator.get_table_max_value(self.global_table_name, 'ts', {'item_id': item_id})
+
+    def save(self, item_id: int, df: DataFrame, df_recent_month_hourly: DataFrame, incremental: bool = True
+             ) -> list[dict]:
+        """Save the price history of the item.
+
+        In incremental mode only rows newer than the last stored timestamp of the item are appended to the global
+        history, and the item rows of the local history are replaced by the new window. History of other items
+        is kept. Otherwise all data in both tables is replaced.
+
+        Args:
+            item_id: item id.
+            df: history older than 31 days.
+            df_recent_month_hourly: hourly history for the last 31 days.
+            incremental: incremental mode.
+
+        Returns:
+            Written rows.
+        """
+        self.create_history_tables()
+        rows, recent_rows = self.to_rows(df), self.to_rows(df_recent_month_hourly)
+        with self.db_manipulator.transaction():
+            if not incremental:
+                self.db_manipulator.delete_table_data(self.global_table_name)
+                self.db_manipulator.delete_table_data(self.local_table_name)
+            elif (last_ts := self.get_last_ts(item_id)) is not None:
+                rows = [i for i in rows if i['ts'] > last_ts]
+
+            self.db_manipulator.bulk_upsert(self.global_table_name, rows, ('item_id', 'ts'))
+            self.db_manipulator.delete_table_data(self.local_table_name, {'item_id': item_id})
+            self.db_manipulator.bulk_upsert(self.local_table_name, recent_rows, ('item_id', 'ts'))
+
+        return rows + recent_rows
+
+    def get_history(self, item_id: int, start: Optional[int] = None, end: Optional[int] = None) -> list[tuple]:
+        """Get the price history of the item from both tables.
+
+        Args:
+            item_id: item id.
+            start: first timestamp, epoch seconds.
+            end: last timestamp, epoch seconds.
+
+        Returns:
+            List of (ts, price in cents, volume) ordered by time.
+        """
+        search_condition = {'item_id': item_id, 'ts': ('BETWEEN', (
+            -2 ** 63 if start is None else start, 2 ** 63 - 1 if end is None else end))}
+        records = []
+        for table_name in (self.global_table_name, self.local_table_name):
+            records += self.db_manipulator.get_table_data(table_name, search_condition, limit=-1,
+                                                          columns=['ts', 'price', 'volume'], order_by='ts')
+        return sorted(records)
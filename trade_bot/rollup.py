@@ -0,0 +1,157 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, astuple
+
+from lib.database_manipulator import DataBaseManipulator
+
+PERIODS = {'hour': 3600, 'day': 86400, 'week': 604800}
+WEEK_OFFSET = 4 * 86400  # 1970-01-01 is Thursday, weeks start on Monday
+
+
+@dataclass
+class Bar:
+    ts: int  # start of the bar, epoch seconds
+    open: int  # prices in cents
+    high: int
+    low: int
+    close: int
+    volume: int
+    last_ts: int  # timestamp of the last history row in the bar
+
+    def merge(self, bar: 'Bar') -> 'Bar':
+        """Merge a later bar of the same period into this one."""
+        return Bar(self.ts, self.open, max(self.high, bar.high), min(self.low, bar.low), bar.close,
+                   self.volume + bar.volume, bar.last_ts)
+
+
+def get_bucket(ts: int, period: int) -> int:
+    """Start of the bar that contains the timestamp."""
+    offset = WEEK_OFFSET if period == PERIODS['week'] else 0
+    return (ts - offset) // period * period + offset
+
+
+@dataclass
+class HistoryRollupBase(ABC):
+    table_name: str = 'history_rollup_table'
+
+    @abstractmethod
+    def update(self, item_id: int, rows: list[dict]) -> None:
+        pass
+
+
+@dataclass
+class HistoryRollup(HistoryRollupBase):
+    """Hourly, daily and weekly OHLCV bars of the item price history.
+
+    Every bar in the time range of the written history rows is rebuilt: hourly bars from the rows themselves,
+    daily and weekly bars from the hourly ones, so the raw history is never re-read. Rows revised by a later save
+    (e.g. the volume of the current hour in the 31-day window) replace the values rolled up before.
+    """
+
+    def __post_init__(self) -> None:
+        self.db_manipulator = DataBaseManipulator()
+
+    def create_rollup_table(self) -> None:
+        db_fields = {
+            'item_id': 'INTEGER NOT NULL', 'period': 'INTEGER NOT NULL', 'ts': 'INTEGER NOT NULL',
+            'open': 'INTEGER', 'high': 'INTEGER', 'low': 'INTEGER', 'close': 'INTEGER', 'volume': 'INTEGER',
+            'last_ts': 'INTEGER',
+        }
+        self.db_manipulator.create_table(self.table_name, db_fields, primary_key=('item_id', 'period', 'ts'),
+                                         without_rowid=True)
+
+    def get_hour_bars(self, item_id: int, start: int, end: int) -> list[Bar]:
+        records = self.db_manipulator.get_table_data(
+            self.table_name, {'item_id': item_id, 'period': PERIODS['hour'], 'ts': ('BETWEEN', (start, end))},
+            limit=-1, columns=['ts', 'open', 'high', 'low', 'close', 'volume', 'last_ts'], order_by='ts')
+        return [Bar(*i) for i in records]
+
+    @staticmethod
+    def aggregate(rows: list[dict], period: int) -> list[Bar]:
+        """Aggregate history rows sorted by time into bars.
+
+        Args:
+            rows: history rows (ts, price, volume).
+            period: bar length in seconds.
+
+        Returns:
+            Bars in chronological order.
+        """
+        bars: list[Bar] = []
+        for row in rows:
+            bar = Bar(get_bucket(row['ts'], period), row['price'], row['price'], row['price'], row['price'],
+                      row['volume'], row['ts'])
+            if bars and bars[-1].ts == bar.ts:
+                bars[-1] = bars[-1].merge(bar)
+            else:
+                bars.append(bar)
+        return bars
+
+    @staticmethod
+    def regroup(bars: list[Bar], period: int) -> list[Bar]:
+        """Merge bars sorted by time into bars of a longer period.
+
+        Args:
+            bars: bars of a shorter period.
+            period: bar length in seconds.
+
+        Returns:
+            Bars in chronological order.
+        """
+        result: list[Bar] = []
+        for bar in bars:
+            bar = Bar(get_bucket(bar.ts, period), *astuple(bar)[1:])
+            if result and result[-1].ts == bar.ts:
+                result[-1] = result[-1].merge(bar)
+            else:
+                result.append(bar)
+        return result
+
+    def update(self, item_id: int, rows: list[dict]) -> None:
+        """Rebuild the bars of the item in the time range of the history rows.
+
+        Args:
+            item_id: item id.
+            rows: history rows (ts, price in cents, volume), all rows of the range, e.g. the whole 31-day window.
+        """
+        self.create_rollup_table()
+        rows = sorted(rows, key=lambda i: i['ts'])
+        if not rows:
+            return
+
+        fields = ('ts', 'open', 'high', 'low', 'close', 'volume', 'last_ts')
+        with self.db_manipulator.transaction():
+            for name, period in PERIODS.items():
+                start = get_bucket(rows[0]['ts'], period)
+                end = get_bucket(rows[-1]['ts'], period) + period - 1
+                if name == 'hour':
+                    bars = self.aggregate(rows, period)
+                else:  # the range may begin before the rows, e.g. the week of the oldest row of the window
+                    bars = self.regroup(self.get_hour_bars(item_id, start, end), period)
+
+                # bars of the range without rows (e.g. hours that left the window) are dropped as well
+                self.db_manipulator.delete_table_data(
+                    self.table_name, {'item_id': item_id, 'period': period, 'ts': ('BETWEEN', (start, end))})
+                self.db_manipulator.bulk_upsert(
+                    self.table_name,
+                    [{'item_id': item_id, 'period': period, **dict(zip(fields, astuple(i)))} for i in bars],
+                    ('item_id', 'period', 'ts'),
+                )
+
+    def get_bars(self, item_id: int, period: str = 'day', limit: int = 100) -> list[Bar]:
+        """Get the latest bars of the item.
+
+        Args:
+            item_id: item id.
+            period: 'hour', 'day' or 'week'.
+            limit: number of bars.
+
+        Returns:
+            Bars in chronological order.
+        """
+        if not self.db_manipulator.check_table_exist(self.table_name):
+            return []
+
+        records = self.db_manipulator.get_table_data(
+            self.table_name, {'item_id': item_id, 'period': PERIODS[period]}, limit=limit,
+            columns=['ts', 'open', 'high', 'low', 'close', 'volume', 'last_ts'], order_by='ts DESC')
+        return [Bar(*i) for i in reversed(records)]
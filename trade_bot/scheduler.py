@@ -0,0 +1,272 @@
+import heapq
+import math
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from dataclasses import dataclass, field
+from itertools import count
+from threading import Event, Lock
+from time import monotonic
+from typing import Callable, Optional
+
+from settings import scheduler_settings
+from trade_bot.analytics import Candidate
+
+
+@dataclass
+class PollState:
+    """Polling state of one item of the watchlist."""
+    item_id: int
+    interval: float  # seconds between polls
+    next_run: float  # monotonic time
+    weight: float = 1.0  # importance of the item, the poll interval is divided by it
+    last_run: Optional[float] = None
+    runs: int = 0
+    failures: int = 0
+    version: int = 0  # heap entries of older versions are stale
+    in_flight: bool = False  # the item is being polled, it is pushed back to the heap when the poll completes
+
+
+@dataclass
+class PollSchedulerBase(ABC):
+    task: Callable[[int], Optional[bool]]  # polls the item, returns whether it changed, None - unknown
+
+    @abstractmethod
+    def exec(self):
+        pass
+
+
+@dataclass
+class PollScheduler(PollSchedulerBase):
+    """Scheduler of item polls with adaptive intervals.
+
+    Every item of the watchlist gets its own interval: volatile and liquid items (see `set_stats`) are polled
+    more often, and the interval shrinks when a poll finds changes and grows when it does not. Due items are kept
+    in a heap by their due time, so a free worker always takes the most overdue item, and the fetch capacity
+    goes to the items that change instead of a flat sweep over everything.
+
+    Example:
+        scheduler = PollScheduler(OrderBookPoller([]).poll_item, max_workers=4)
+        scheduler.add_many(item_ids)
+        scheduler.set_stats(MarketAnalytics().rank(item_ids, top=None))
+        scheduler.exec()
+    """
+    base_interval: float = scheduler_settings['base_interval']
+    min_interval: float = scheduler_settings['min_interval']
+    max_interval: float = scheduler_settings['max_interval']
+    speed_up: float = 0.5  # interval factor after a poll that found changes
+    slow_down: float = 1.5  # interval factor after a poll without changes
+    max_workers: int = scheduler_settings['max_workers']
+    clock: Callable[[], float] = monotonic
+    errors: dict[int, Exception] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.states: dict[int, PollState] = {}
+        self._heap: list[tuple[float, int, int, int]] = []  # next run, sequence, item id, version
+        self._sequence = count()
+        self._lock = Lock()
+        self._stop = Event()
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _push(self, state: PollState) -> None:
+        state.version += 1
+        heapq.heappush(self._heap, (state.next_run, next(self._sequence), state.item_id, state.version))
+
+    def add(self, item_id: int, interval: Optional[float] = None, weight: float = 1.0) -> None:
+        """Add an item to the watchlist, it is due immediately.
+
+        Args:
+            item_id: item id.
+            interval: poll interval in seconds, `base_interval` if not passed.
+            weight: importance of the item.
+        """
+        with self._lock:
+            if item_id in self.states:
+                return
+            interval = self.clamp((interval or self.base_interval) / weight)
+            state = self.states[item_id] = PollState(item_id, interval, self.clock(), weight)
+            self._push(state)
+
+    def add_many(self, item_ids: list[int]) -> None:
+        for item_id in item_ids:
+            self.add(item_id)
+
+    def remove(self, item_id: int) -> None:
+        with self._lock:
+            self.states.pop(item_id, None)  # its heap entries are skipped when popped
+
+    def reschedule(self, item_id: int, interval: Optional[float] = None, weight: Optional[float] = None) -> None:
+        """Change the interval or the weight of an item, the next poll is moved accordingly.
+
+        An item that is being polled only gets the new interval, its next poll is scheduled when the poll completes.
+
+        Args:
+            item_id: item id.
+            interval: new interval in seconds.
+            weight: new importance of the item.
+        """
+        with self._lock:
+            if (state := self.states.get(item_id)) is None:
+                return
+            if weight is not None:
+                state.interval *= state.weight / weight
+                state.weight = weight
+            if interval is not None:
+                state.interval = interval / state.weight
+            state.interval = self.clamp(state.interval)
+            if state.in_flight:
+                return
+            if state.last_run is not None:
+                state.next_run = state.last_run + state.interval
+            self._push(state)
+
+    def set_stats(self, candidates: list[Candidate]) -> None:
+        """Weigh the items by their market statistics, volatile and frequently traded items are polled more often.
+
+        Args:
+            candidates: statistics of the items (see `MarketAnalytics.rank`).
+        """
+        for candidate in candidates:
+            volatility = 0.0 if math.isnan(candidate.volatility) else candidate.volatility
+            weight = (1 + 10 * volatility) * (1 + math.log1p(max(candidate.velocity, 0.0)))
+            self.reschedule(candidate.item_id, weight=weight)
+
+    def pop_due(self, limit: int) -> list[PollState]:
+        """Take the most overdue items.
+
+        Args:
+            limit: maximum number of items.
+
+        Returns:
+            Items to poll now.
+        """
+        due = []
+        with self._lock:
+            now = self.clock()
+            while self._heap and len(due) < limit and self._heap[0][0] <= now:
+                _, _, item_id, version = heapq.heappop(self._heap)
+                if (state := self.states.get(item_id)) is not None and state.version == version:
+                    state.in_flight = True
+                    due.append(state)
+        return due
+
+    def get_next_run(self) -> Optional[float]:
+        """Monotonic time when the next item is due, None if the watchlist is empty."""
+        with self._lock:
+            while self._heap:
+                _, _, item_id, version = self._heap[0]
+                if (state := self.states.get(item_id)) is not None and state.version == version:
+                    return state.next_run
+                heapq.heappop(self._heap)
+        return None
+
+    def complete(self, state: PollState, changed: Optional[bool], error: Optional[Exception] = None) -> None:
+        """Adapt the interval of an item to the result of its poll and schedule the next one.
+
+        Args:
+            state: polled item.
+            changed: the poll found changes, None - unknown.
+            error: error of the poll, the item is retried with exponential backoff.
+        """
+        with self._lock:
+            state.in_flight = False
+            state.last_run = self.clock()
+            state.runs += 1
+            if error is not None:
+                state.failures += 1
+                delay = min(state.interval * 2 ** state.failures, self.max_interval)
+            else:
+                state.failures = 0
+                if changed is not None:
+                    state.interval = self.clamp(state.interval * (self.speed_up if changed else self.slow_down))
+                delay = state.interval
+            state.next_run = state.last_run + delay
+            if state.item_id in self.states:
+                self._push(state)
+
+    def finish(self, state: PollState, future: Future) -> None:
+        """Complete the poll of an item with the result of its future."""
+        try:
+            changed = future.result()
+        except Exception as e:
+            self.errors[state.item_id] = e
+            self.complete(state, None, e)
+        else:
+            self.errors.pop(state.item_id, None)
+            self.complete(state, changed)
+
+    def submit(self, executor: Executor, running: dict[Future, PollState], limit: int) -> int:
+        """Start the polls of the most overdue items.
+
+        Args:
+            executor: executor running the polls.
+            running: polls in progress, the started ones are added.
+            limit: maximum number of polls to start.
+
+        Returns:
+            Number of started polls.
+        """
+        due = self.pop_due(limit) if limit > 0 else []
+        for state in due:
+            running[executor.submit(self.task, state.item_id)] = state
+        return len(due)
+
+    def run_once(self) -> int:
+        """Poll the due items, at most `max_workers` of them, and wait until all of them are done.
+
+        Meant for a single synchronous round, `exec` keeps the workers busy instead.
+
+        Returns:
+            Number of polled items.
+        """
+        running: dict[Future, PollState] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            started = self.submit(executor, running, self.max_workers)
+            for future in as_completed(running):
+                self.finish(running[future], future)
+        return started
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def exec(self, iterations: Optional[int] = None) -> None:
+        """Poll the watchlist until `stop` is called, sleeping while nothing is due.
+
+        One pool of `max_workers` workers is kept for the whole run, and the next due item is started as soon
+        as any poll finishes, so a slow or backing-off item does not hold back the others.
+
+        Args:
+            iterations: number of polls, endless if not passed.
+        """
+        self._stop.clear()
+        started = 0
+        running: dict[Future, PollState] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while not self._stop.is_set():
+                limit = self.max_workers - len(running)
+                if iterations is not None:
+                    limit = min(limit, iterations - started)
+                started += self.submit(executor, running, limit)
+
+                timeout = None  # wait for a free worker
+                if len(running) < self.max_workers and (iterations is None or started < iterations):
+                    if (next_run := self.get_next_run()) is None and not running:
+                        break
+                    if next_run is not None:
+                        timeout = max(next_run - self.clock(), 0.0)  # wait for the next due item as well
+                elif not running:
+                    break
+
+                if not running:
+                    self._stop.wait(timeout)
+                    continue
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.finish(running.pop(future), future)
+
+            for future in as_completed(running):  # polls started before `stop`
+                self.finish(running[future], future)
@@ -1,12 +1,18 @@
 from abc import ABC
 from typing import Union, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from selenium.webdriver.remote.webdriver import WebDriver
 
 from settings import DEBUG
-from lib.authorization import AuthorizationManager
-from lib.webdriver import Driver
+from lib.driver_pool import DriverPool
+from lib.metrics import get_metrics
+from lib.webdriver import Driver, get_http_session
+from trade_bot.analytics import MarketAnalytics
+from trade_bot.authorization import AuthorizationManager
+from trade_bot.item_registry import get_item_registry
+from trade_bot.order_book import OrderBookPoller
+from trade_bot.scheduler import PollScheduler
 
 
 @dataclass
@@ -16,6 +22,9 @@ class TradeBotBase(ABC):
 
 @dataclass
 class TradeBot(TradeBotBase):
+    item_ids: list[int] = field(default_factory=list)  # watchlist, all registered items if empty
+    iterations: Optional[int] = None  # number of polls, endless if not passed
+    metrics_port: Optional[int] = None  # port of the metrics endpoint (/metrics, /stats), not served if None
 
     # def __post_init__(self) -> None:
     #     db_name = ''
@@ -26,13 +35,34 @@ class TradeBot(TradeBotBase):
     #     if self.db_manager is None:
     #         raise Exception('DB Manager is missing')
 
+    def get_scheduler(self, poller: OrderBookPoller) -> PollScheduler:
+        """Scheduler of the watchlist, items are weighed by their market statistics.
+
+        Args:
+            poller: order book poller.
+
+        Returns:
+            Scheduler instance.
+        """
+        scheduler = PollScheduler(poller.poll_item)
+        scheduler.add_many(poller.item_ids)
+        scheduler.set_stats(MarketAnalytics().rank(poller.item_ids, top=None))
+        return scheduler
+
     def exec(self):
-        driver: Union[Driver, WebDriver] = AuthorizationManager().exec()
-        print(driver.current_url)
-        x = driver.get('https://steamcommunity.com/market/')
-        print(x)
+        if self.metrics_port is not None:
+            get_metrics().serve(port=self.metrics_port)
 
-        import time
-        time.sleep(30)
+        with DriverPool(size=1, factory=AuthorizationManager().exec) as pool:  # drivers are authorized on launch
+            with pool.lease() as driver:
+                driver: Union[Driver, WebDriver]
+                session = get_http_session(driver)  # the browser is only needed for login
 
+        item_ids = self.item_ids
+        if not item_ids:
+            registry = get_item_registry()
+            registry.preload()
+            item_ids = registry.item_ids
 
+        poller = OrderBookPoller(item_ids, session=session)
+        self.get_scheduler(poller).exec(self.iterations)
@@ -1,14 +1,20 @@
-LOGIN_FIELD = '//*[@id="responsive_page_template_content"]/div[1]/div[1]/div/div/div/div[2]/div/form/div[1]/input'
+from selenium.webdriver.common.by import By
+
+#  locators are short CSS selectors anchored on stable ids, they are matched natively by the browser and do not
+#  break when the wrapping markup of the page changes
+
+LOGIN_FIELD = (By.CSS_SELECTOR, '#responsive_page_template_content form input[type="text"]')
 #  login input field
 
-PASSWORD_FIELD = '//*[@id="responsive_page_template_content"]/div[1]/div[1]/div/div/div/div[2]/div/form/div[2]/input'
+PASSWORD_FIELD = (By.CSS_SELECTOR, '#responsive_page_template_content form input[type="password"]')
 # password input field
 
-AUTH_BUTTON = '//*[@id="responsive_page_template_content"]/div[1]/div[1]/div/div/div/div[2]/div/form/div[4]/button'
+AUTH_BUTTON = (By.CSS_SELECTOR, '#responsive_page_template_content form button[type="submit"]')
 # login button field
 
-AUTH_CODE_BLOCK = '//*[@id="responsive_page_template_content"]/div[3]/div[1]/div/div/div/div[2]/form/div/div[2]/div[1]/div'
-# confirmation code entry fields
+AUTH_CODE_BLOCK = (By.CSS_SELECTOR, '#responsive_page_template_content > div:nth-of-type(3) form > div > '
+                                    'div:nth-of-type(2) > div:nth-of-type(1) > div')
+# block of the confirmation code entry fields
 
-GLOBAL_LOGIN_BUTTON = '//*[@id="global_action_menu"]/a[2]'
+GLOBAL_LOGIN_BUTTON = (By.CSS_SELECTOR, '#global_action_menu > a:nth-of-type(2)')
 # global login button